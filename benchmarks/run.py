@@ -0,0 +1,387 @@
+"""Run the CLAII benchmark suite against local stub servers.
+
+Usage::
+
+    python -m benchmarks.run                      # run everything, compare to baselines
+    python -m benchmarks.run --only gen_reply     # run one benchmark
+    python -m benchmarks.run --update-baseline    # store the current numbers as the baseline
+
+Everything runs offline: backends are pointed at the stub servers in
+:mod:`benchmarks.stub_servers` and CLAII's config, history and stats live in a
+throwaway home directory. The exit status is 1 if any metric regressed by more
+than the threshold.
+
+Metric names end in ``_seconds``, ``_bytes`` or ``_tokens`` (lower is better)
+or ``_per_second`` (higher is better).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.stub_servers import OllamaStub, OpenAIStub, StubBehavior
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_THRESHOLD = 0.25
+
+PLUGIN_TEMPLATE = '''
+from claii.plugins.base import CLAIIPlugin
+
+class BenchPlugin{index}(CLAIIPlugin):
+    @property
+    def name(self):
+        return "bench{index}"
+
+    @property
+    def description(self):
+        return "Benchmark plugin {index}"
+'''
+
+
+class BenchContext:
+    """Shared state for one benchmark run: the isolated home and the stub servers."""
+
+    def __init__(self, home: Path, repeat: int):
+        self.home = home
+        self.repeat = repeat
+        self.ollama = OllamaStub(StubBehavior(latency=0, token_rate=0)).start()
+        self.openai = OpenAIStub(StubBehavior(latency=0, token_rate=0)).start()
+
+    def close(self):
+        self.ollama.stop()
+        self.openai.stop()
+
+
+def isolate_home(home: Path) -> None:
+    """Make CLAII keep its config, history, stats and plugins under ``home``.
+
+    Must run before anything from ``claii`` is imported, since paths are
+    resolved at import time.
+    """
+    os.environ["HOME"] = str(home)
+    os.environ["USERPROFILE"] = str(home)
+    os.environ["APPDATA"] = str(home / "AppData")
+    os.environ.pop("CLAII_TRACE", None)
+
+
+def write_config(ctx: BenchContext) -> None:
+    from claii.config import save_config
+    save_config({
+        "ollama_model": "mistral",
+        "openai_api_key": "stub",
+        "deepseek_api_key": "stub",
+        "mistral_api_key": "stub",
+        "openai_compatible_base_url": ctx.openai.base_url,
+        "plugins": {
+            "enabled": ["groq"],
+            "settings": {"groq": {"api_key": "stub", "base_url": ctx.openai.base_url}},
+        },
+    })
+    os.environ["OLLAMA_HOST"] = ctx.ollama.url
+    os.environ["OPENAI_BASE_URL"] = ctx.openai.base_url
+    os.environ["DEEPSEEK_API_BASE"] = ctx.openai.base_url
+    os.environ["MISTRAL_BASE_URL"] = ctx.openai.base_url
+
+
+def disable_coalescing() -> None:
+    """The benchmarks send identical prompts concurrently and must measure every upstream call."""
+    import claii.coalesce
+    claii.coalesce.ENABLED = False
+
+
+def patch_ollama_checks() -> None:
+    """The stub has no ``ollama`` binary for the local install/running checks."""
+    import claii.models.ollama
+    claii.models.ollama.is_ollama_installed = lambda: True
+    claii.models.ollama.is_ollama_running = lambda: True
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of ``fn`` over ``repeat`` runs."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def bench_cold_start(ctx: BenchContext) -> dict:
+    """Time ``claii --help`` in a fresh interpreter."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    command = [sys.executable, "-m", "claii.app", "--help"]
+
+    def run():
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    run()  # warm the OS file cache and bytecode
+    return {"cli_cold_start_seconds": timed(run, max(3, ctx.repeat // 4))}
+
+
+def bench_completion(ctx: BenchContext) -> dict:
+    """Shell completion latency: the cached fast path vs the full Typer app, and a bare interpreter for scale."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "_CLAII_COMPLETE": "complete_bash",
+           "COMP_WORDS": "claii chat list --tool ", "COMP_CWORD": "4"}
+    commands = {
+        "completion_fast_seconds": [sys.executable, "-c", "from claii.completion import main; main()"],
+        "completion_full_app_seconds": [sys.executable, "-m", "claii.app"],
+        "interpreter_start_seconds": [sys.executable, "-c", "pass"],
+    }
+    first = subprocess.run(commands["completion_fast_seconds"], env=env, capture_output=True, text=True, check=True)
+    if "openai-compatible" not in first.stdout.split():  # also builds the completion cache
+        raise RuntimeError(f"completion returned {first.stdout!r}")
+
+    results = {}
+    for metric, command in commands.items():
+        def run():
+            subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        results[metric] = timed(run, max(3, ctx.repeat // 4))
+    return results
+
+
+BACKEND_START_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from claii.ai import gen_reply
+reply = gen_reply("list files", sys.argv[1])
+elapsed = time.perf_counter() - start
+try:
+    # ru_maxrss survives exec on Linux, so it would include the forked benchmark process
+    with open("/proc/self/status") as f:
+        rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+print(json.dumps({"reply": reply, "seconds": elapsed, "rss": rss}))
+"""
+
+
+def bench_backend_cold_start(ctx: BenchContext) -> dict:
+    """First request in a fresh interpreter and its peak RSS: LangChain OpenAI vs the plain HTTP backend."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    results = {}
+    for tool, label in (("openai", "langchain_openai"), ("openai-compatible", "openai_compatible")):
+        samples = []
+        for _ in range(max(3, ctx.repeat // 4)):
+            output = subprocess.run([sys.executable, "-c", BACKEND_START_SCRIPT, tool], env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            sample = json.loads(output.strip().splitlines()[-1])
+            if sample["reply"] != "ls -la":
+                raise RuntimeError(f"{tool} backend returned {sample['reply']!r} from the stub")
+            samples.append(sample)
+        results[f"backend_cold_start_{label}_seconds"] = statistics.median(s["seconds"] for s in samples)
+        results[f"backend_peak_rss_{label}_bytes"] = statistics.median(s["rss"] for s in samples)
+    return results
+
+
+def bench_gen_reply(ctx: BenchContext) -> dict:
+    """End-to-end ``gen_reply`` latency per backend with an instant stub (i.e. CLAII's own overhead)."""
+    from claii.ai import gen_reply
+    from claii.plugins.manager import plugin_manager
+    if "groq" not in plugin_manager.plugins:
+        plugin_manager.load_plugins()
+
+    results = {}
+    for tool in ("ollama", "openai", "deepseek", "mistral", "openai-compatible", "groq"):
+        reply = gen_reply("list files", tool)
+        if reply != "ls -la":
+            raise RuntimeError(f"{tool} backend returned {reply!r} from the stub")
+        results[f"gen_reply_{tool}_seconds"] = timed(lambda: gen_reply("list files", tool), ctx.repeat)
+    return results
+
+
+def bench_plugin_discovery(ctx: BenchContext) -> dict:
+    """Plugin discovery time as the number of user plugins grows."""
+    from claii.plugins.manager import PluginManager
+    plugins_dir = ctx.home / ".config" / "CLAII" / "plugins"
+    results = {}
+    for count in (0, 10, 50):
+        for index in range(count):
+            plugin_dir = plugins_dir / f"bench{index}"
+            plugin_dir.mkdir(parents=True, exist_ok=True)
+            (plugin_dir / "__init__.py").write_text(PLUGIN_TEMPLATE.format(index=index))
+        manager = PluginManager()
+        results[f"plugin_discovery_{count}_seconds"] = timed(manager.discover_plugins, max(3, ctx.repeat // 4))
+    for plugin_dir in plugins_dir.glob("bench*"):
+        for file in plugin_dir.iterdir():
+            file.unlink()
+        plugin_dir.rmdir()
+    return results
+
+
+def bench_history(ctx: BenchContext) -> dict:
+    """History append throughput and ``claii history`` read throughput."""
+    import claii.history
+    from claii.commands.history import history
+    entries = 2000
+    start = time.perf_counter()
+    for i in range(entries):
+        claii.history.log_history(f"list files in directory {i}", f"ls -la /tmp/dir{i}")
+    write_time = time.perf_counter() - start
+    read_time = timed(lambda: history(slow=False, failed=False, min_seconds=0, limit=entries), 3)
+    os.remove(claii.history.HISTORY_PATH)
+    return {
+        "history_write_entries_per_second": entries / write_time,
+        "history_read_entries_per_second": entries / read_time,
+    }
+
+
+def bench_concurrency(ctx: BenchContext) -> dict:
+    """Throughput of concurrent ``gen_reply`` calls against a stub with fixed latency."""
+    from claii.ai import gen_reply
+    ctx.ollama.behavior.latency = 0.05
+    results = {}
+    try:
+        for workers in (1, 4, 16):
+            requests_count = workers * 8
+            start = time.perf_counter()
+            with ThreadPoolExecutor(workers) as pool:
+                list(pool.map(lambda _: gen_reply("list files", "ollama"), range(requests_count)))
+            results[f"concurrency_{workers}_requests_per_second"] = requests_count / (time.perf_counter() - start)
+    finally:
+        ctx.ollama.behavior.latency = 0
+    return results
+
+
+PROMPT_QUERIES = ("list files", "find all python files modified in the last week and count their lines")
+
+
+def bench_prompts(ctx: BenchContext) -> dict:
+    """Size, build time and prompt-evaluation time of each prompt template.
+
+    Prompt evaluation is timed on a real Ollama model when ``CLAII_BENCH_OLLAMA_URL``
+    (and optionally ``CLAII_BENCH_OLLAMA_MODEL``) is set; the stub can't measure it.
+    """
+    import requests
+    from claii.prompts.registry import COMPILED, TEMPLATES
+
+    url = os.environ.get("CLAII_BENCH_OLLAMA_URL")
+    model = os.environ.get("CLAII_BENCH_OLLAMA_MODEL", "qwen2.5-coder:1.5b")
+    query = PROMPT_QUERIES[-1]
+    results = {}
+    for name in TEMPLATES:
+        template = COMPILED[(name, "posix")]
+        results[f"prompt_{name}_tokens"] = template.tokens(query)
+        results[f"prompt_build_{name}_per_second"] = 1000 / timed(lambda: [template.messages(q) for q in PROMPT_QUERIES * 500], 5)
+        if not url:
+            continue
+
+        def prompt_eval(run):
+            messages = [{"role": role, "content": content} for role, content in template.messages(query)]
+            # Different first bytes each run, so Ollama can't reuse the previous run's prompt cache
+            messages[0]["content"] = f"{run}. {messages[0]['content']}"
+            response = requests.post(f"{url.rstrip('/')}/api/chat", json={
+                "model": model, "messages": messages, "stream": False,
+                "options": {"num_predict": 1, "temperature": 0}, "keep_alive": "5m",
+            }, timeout=300).json()
+            return response.get("prompt_eval_duration", 0) / 1e9, response.get("prompt_eval_count")
+
+        prompt_eval(-1)  # load the model
+        samples = [prompt_eval(run) for run in range(max(3, ctx.repeat // 4))]
+        results[f"prompt_eval_{name}_seconds"] = statistics.median(seconds for seconds, _ in samples)
+        if samples[-1][1]:
+            results[f"prompt_eval_{name}_tokens"] = samples[-1][1]
+    return results
+
+
+BENCHMARKS = {
+    "cold_start": bench_cold_start,
+    "backend_cold_start": bench_backend_cold_start,
+    "completion": bench_completion,
+    "gen_reply": bench_gen_reply,
+    "plugin_discovery": bench_plugin_discovery,
+    "history": bench_history,
+    "concurrency": bench_concurrency,
+    "prompts": bench_prompts,
+}
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> list:
+    """Return ``(metric, baseline, value, change)`` for metrics that regressed beyond the threshold."""
+    regressions = []
+    for metric, value in results.items():
+        baseline = baselines.get(metric)
+        if not baseline:
+            continue
+        change = (value - baseline) / baseline
+        if metric.endswith("_per_second"):
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        if regressed:
+            regressions.append((metric, baseline, value, change))
+    return regressions
+
+
+def format_value(metric: str, value: float) -> str:
+    if metric.endswith("_per_second"):
+        return f"{value:,.1f}/s"
+    if metric.endswith("_bytes"):
+        return f"{value / 2 ** 20:,.1f} MiB"
+    if metric.endswith("_tokens"):
+        return f"{value:,.0f} tok"
+    return f"{value * 1000:,.2f} ms"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only this benchmark (repeatable).")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per timed measurement.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative regression (0.25 = 25%%).")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline file to compare against.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="claii-bench-") as tmp:
+        home = Path(tmp)
+        isolate_home(home)
+        ctx = BenchContext(home, args.repeat)
+        try:
+            write_config(ctx)
+            patch_ollama_checks()
+            disable_coalescing()
+            results = {}
+            for name in args.only or BENCHMARKS:
+                print(f"Running {name}...", file=sys.stderr)
+                # Rich consoles write to the current sys.stdout; buffer it so printing doesn't skew timings
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.update(BENCHMARKS[name](ctx))
+        finally:
+            ctx.close()
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, baselines, args.threshold)
+    regressed = {metric for metric, *_ in regressions}
+
+    print(f"{'metric':<48} {'baseline':>14} {'current':>14} {'change':>8}")
+    for metric, value in results.items():
+        baseline = baselines.get(metric)
+        change = f"{(value - baseline) / baseline:+.0%}" if baseline else "new"
+        flag = "  REGRESSION" if metric in regressed else ""
+        baseline_text = format_value(metric, baseline) if baseline else "-"
+        print(f"{metric:<48} {baseline_text:>14} {format_value(metric, value):>14} {change:>8}{flag}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({**baselines, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Local stand-ins for LLM servers, used by the benchmarks.
+
+Two servers are provided, both built on ``http.server`` so they need nothing
+beyond the standard library:
+
+* :class:`OllamaStub` speaks the subset of the Ollama HTTP API CLAII uses
+  (``/api/chat``, ``/api/generate``, ``/api/tags``, ``/api/ps``, ``/api/version``).
+* :class:`OpenAIStub` speaks the OpenAI-compatible API (``/v1/chat/completions``,
+  ``/v1/completions``, ``/v1/models``), which also covers DeepSeek, Mistral,
+  Groq and local vLLM/llama.cpp servers.
+
+Latency, token rate, streaming and error injection are set through
+:class:`StubBehavior`, and can be changed while a server is running.
+"""
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+@dataclass
+class StubBehavior:
+    """How a stub server responds."""
+
+    reply: str = "ls -la"
+    latency: float = 0.05  # seconds before the first token
+    token_rate: float = 200.0  # tokens per second after the first one (0 = instant)
+    error_rate: float = 0.0  # probability of answering with ``error_status``
+    error_status: int = 500
+    models: List[str] = field(default_factory=lambda: ["mistral", "qwen2.5-coder:1.5b"])
+    loaded_models: List[str] = field(default_factory=lambda: ["mistral"])
+    seed: Optional[int] = 0
+
+    def tokens(self) -> List[str]:
+        """Split the reply into word-sized tokens, keeping whitespace attached."""
+        words = self.reply.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+class _StubServer:
+    """Runs a handler class on a background thread."""
+
+    handler_class = None
+
+    def __init__(self, behavior: Optional[StubBehavior] = None, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior or StubBehavior()
+        self.requests: List[Dict] = []
+        self._random = random.Random(self.behavior.seed)
+        self._lock = threading.Lock()
+        handler = type("Handler", (self.handler_class,), {"stub": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.behavior.error_rate > 0 and self._random.random() < self.behavior.error_rate
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    stub: _StubServer = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        payload = json.loads(body) if body else {}
+        self.stub.requests.append({"path": self.path, "payload": payload})
+        return payload
+
+    def _send_json(self, data, status: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _paced_tokens(self):
+        """Yield reply tokens with the configured latency and token rate."""
+        behavior = self.stub.behavior
+        time.sleep(behavior.latency)
+        for i, token in enumerate(behavior.tokens()):
+            if i and behavior.token_rate:
+                time.sleep(1 / behavior.token_rate)
+            yield token
+
+    def _maybe_fail(self) -> bool:
+        if self.stub.should_fail():
+            self._send_json({"error": "injected failure"}, self.stub.behavior.error_status)
+            return True
+        return False
+
+    def _not_found(self) -> None:
+        self._send_json({"error": f"unknown path {self.path}"}, 404)
+
+
+class OllamaHandler(_StubHandler):
+
+    def do_GET(self):
+        behavior = self.stub.behavior
+        if self.path == "/api/tags":
+            self._send_json({"models": [
+                {"name": name, "model": name, "size": 4_000_000_000,
+                 "details": {"parameter_size": "7B", "quantization_level": "Q4_0"}}
+                for name in behavior.models
+            ]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": [{"name": name, "model": name} for name in behavior.loaded_models]})
+        elif self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-stub"})
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.path not in ("/api/chat", "/api/generate"):
+            return self._not_found()
+        if self._maybe_fail():
+            return
+        model = payload.get("model", "mistral")
+        chat = self.path == "/api/chat"
+        prompt = json.dumps(payload.get("messages") if chat else payload.get("prompt"))
+        prompt_tokens = max(1, len(prompt) // 4)
+        started = time.perf_counter()
+
+        def message(text):
+            if chat:
+                return {"message": {"role": "assistant", "content": text}}
+            return {"response": text}
+
+        tokens = []
+        if payload.get("stream", True):
+            self._start_stream("application/x-ndjson")
+            for token in self._paced_tokens():
+                tokens.append(token)
+                self._write_chunk((json.dumps({"model": model, "created_at": "1970-01-01T00:00:00Z",
+                                               **message(token), "done": False}) + "\n").encode())
+        else:
+            tokens = list(self._paced_tokens())
+        duration = int((time.perf_counter() - started) * 1e9)
+        final = {"model": model, "created_at": "1970-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+                 "total_duration": duration, "load_duration": 0, "prompt_eval_count": prompt_tokens,
+                 "prompt_eval_duration": 1_000_000, "eval_count": len(tokens), "eval_duration": max(duration, 1)}
+        if payload.get("stream", True):
+            self._write_chunk((json.dumps({**final, **message("")}) + "\n").encode())
+            self._end_stream()
+        else:
+            self._send_json({**final, **message("".join(tokens))})
+
+
+class OpenAIHandler(_StubHandler):
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [
+                {"id": name, "object": "model", "owned_by": "stub"} for name in self.stub.behavior.models
+            ]})
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        payload = self._read_json()
+        chat = self.path.endswith("/chat/completions")
+        if not chat and not self.path.endswith("/completions"):
+            return self._not_found()
+        if self._maybe_fail():
+            return
+        model = payload.get("model", "stub")
+        prompt = json.dumps(payload.get("messages") if chat else payload.get("prompt"))
+        prompt_tokens = max(1, len(prompt) // 4)
+        n = int(payload.get("n") or 1)
+        base = {"id": "cmpl-stub", "created": int(time.time()), "model": model,
+                "object": "chat.completion.chunk" if chat else "text_completion"}
+
+        def choice(text, index=0, finish=None):
+            if chat:
+                return {"index": index, "delta": {"content": text} if text else {}, "finish_reason": finish}
+            return {"index": index, "text": text, "finish_reason": finish, "logprobs": None}
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(self.stub.behavior.tokens()) * n,
+                 "total_tokens": prompt_tokens + len(self.stub.behavior.tokens()) * n}
+
+        if payload.get("stream"):
+            self._start_stream("text/event-stream")
+            for token in self._paced_tokens():
+                for index in range(n):
+                    self._write_chunk(f"data: {json.dumps({**base, 'choices': [choice(token, index)]})}\n\n".encode())
+            final = {**base, "choices": [choice("", index, "stop") for index in range(n)]}
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                final["usage"] = usage
+            self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+            return
+
+        text = "".join(self._paced_tokens())
+        if chat:
+            choices = [{"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                       for i in range(n)]
+            obj = "chat.completion"
+        else:
+            choices = [{"index": i, "text": text, "finish_reason": "stop", "logprobs": None} for i in range(n)]
+            obj = "text_completion"
+        self._send_json({**base, "object": obj, "choices": choices, "usage": usage})
+
+
+class OllamaStub(_StubServer):
+    """Stub of the Ollama HTTP API."""
+
+    handler_class = OllamaHandler
+
+
+class OpenAIStub(_StubServer):
+    """Stub of an OpenAI-compatible chat-completions API (base URL is ``<url>/v1``)."""
+
+    handler_class = OpenAIHandler
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
@@ -0,0 +1,227 @@
+"""Tool-calling loop for ``gen_reply``.
+
+Plugins register tools through ``CLAIIPlugin.get_tools``. When tool calling is
+enabled the model is told which tools exist and may answer with::
+
+    TOOL_CALLS: [{"name": "current_time", "arguments": {}}]
+
+CLAII then runs the requested tools concurrently (a thread per synchronous
+handler, one event loop for ``async def`` handlers), each with its own timeout,
+and sends the results back to the model. Identical calls are only executed
+once per request; tools that declare ``cache_ttl`` (seconds) are also cached
+across requests in the same process.
+
+The protocol is plain text so it works with every backend, including plugin
+models that only accept a string.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from claii.prompts.concise import raw_prompts
+from claii.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOOL_TIMEOUT = 10.0
+DEFAULT_MAX_ROUNDS = 3
+TOOL_CALLS_MARKER = "TOOL_CALLS:"
+FOLLOW_UP = "Call more tools if you need to, otherwise answer the query. If it asks for a command, reply with only the command."
+FINAL_ROUND = "Answer the query now using the tool results above. Do not call any more tools."
+
+# Results of tools with a cache_ttl, shared across requests: key -> (expires_at, result)
+_ttl_cache: Dict[str, tuple] = {}
+_ttl_lock = threading.Lock()
+
+
+def describe_tools(tools: Dict[str, Dict[str, Any]]) -> str:
+    """Instructions telling the model which tools it may call and how."""
+    lines = [
+        "You can call tools to gather information before answering.",
+        f"To call tools, reply with only a line starting with {TOOL_CALLS_MARKER} followed by a JSON list, e.g.",
+        f'{TOOL_CALLS_MARKER} [{{"name": "tool_name", "arguments": {{}}}}]',
+        "Request every tool you need at once; independent calls run in parallel.",
+        "Available tools:",
+    ]
+    for name, tool in tools.items():
+        line = f"- {name}: {tool.get('description', '')}"
+        if tool.get("parameters"):
+            line += f" Arguments: {json.dumps(tool['parameters'])}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_tool_calls(reply: Optional[str]) -> List[Dict[str, Any]]:
+    """Extract tool calls from a model reply; an empty list means a final answer."""
+    if not reply or TOOL_CALLS_MARKER not in reply:
+        return []
+    payload = reply.split(TOOL_CALLS_MARKER, 1)[1].strip()
+    payload = re.sub(r"^```(?:json)?|```$", "", payload.strip()).strip()
+    try:
+        calls, _ = json.JSONDecoder().raw_decode(payload)
+    except json.JSONDecodeError:
+        logger.warning(f"Could not parse tool calls: {payload[:200]}")
+        return []
+    if isinstance(calls, dict):
+        calls = [calls]
+    parsed = []
+    for call in calls if isinstance(calls, list) else []:
+        if isinstance(call, dict) and isinstance(call.get("name"), str):
+            arguments = call.get("arguments") or {}
+            parsed.append({"name": call["name"], "arguments": arguments if isinstance(arguments, dict) else {}})
+    return parsed
+
+
+def _call_key(name: str, arguments: Dict[str, Any]) -> str:
+    return f"{name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+
+def _run_sync(handler: Callable, arguments: Dict[str, Any], future: Future) -> None:
+    try:
+        future.set_result(handler(**arguments))
+    except BaseException as e:
+        future.set_exception(e)
+
+
+def _run_async(jobs: List[tuple]) -> None:
+    """Run coroutine tool handlers on one event loop, each with its own timeout."""
+    async def run_one(handler, arguments, timeout, future):
+        try:
+            future.set_result(await asyncio.wait_for(handler(**arguments), timeout))
+        except BaseException as e:
+            future.set_exception(e)
+
+    async def run_all():
+        await asyncio.gather(*(run_one(*job) for job in jobs))
+
+    asyncio.run(run_all())
+
+
+def execute_tool_calls(
+    calls: List[Dict[str, Any]],
+    tools: Dict[str, Dict[str, Any]],
+    memo: Optional[Dict[str, Any]] = None,
+    default_timeout: float = DEFAULT_TOOL_TIMEOUT,
+) -> List[Dict[str, Any]]:
+    """Run tool calls concurrently and return one result dict per call.
+
+    ``memo`` caches results for the current request. Handlers run on daemon
+    threads, so a tool that overruns its timeout is reported as failed
+    without holding up the reply (or interpreter exit).
+    """
+    memo = {} if memo is None else memo
+    results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+    futures: Dict[str, tuple] = {}
+    async_jobs = []
+    now = time.monotonic()
+
+    with span("tools.execute", calls=len(calls)):
+        for index, call in enumerate(calls):
+            name, arguments = call["name"], call["arguments"]
+            key = _call_key(name, arguments)
+            tool = tools.get(name)
+            if tool is None or not callable(tool.get("handler")):
+                results[index] = {"name": name, "arguments": arguments, "error": f"unknown tool '{name}'"}
+                continue
+            if key in memo:
+                results[index] = {"name": name, "arguments": arguments, "result": memo[key], "cached": True}
+                continue
+            with _ttl_lock:
+                cached = _ttl_cache.get(key)
+            if cached and cached[0] > now:
+                memo[key] = cached[1]
+                results[index] = {"name": name, "arguments": arguments, "result": cached[1], "cached": True}
+                continue
+            if key in futures:
+                continue
+
+            handler = tool["handler"]
+            timeout = float(tool.get("timeout") or default_timeout)
+            future = Future()
+            futures[key] = (future, timeout, tool)
+            if inspect.iscoroutinefunction(handler):
+                async_jobs.append((handler, arguments, timeout, future))
+            else:
+                threading.Thread(target=_run_sync, args=(handler, arguments, future), daemon=True,
+                                 name=f"claii-tool-{name}").start()
+
+        if async_jobs:
+            threading.Thread(target=_run_async, args=(async_jobs,), daemon=True, name="claii-tools-async").start()
+
+        for index, call in enumerate(calls):
+            if results[index] is not None:
+                continue
+            name, arguments = call["name"], call["arguments"]
+            key = _call_key(name, arguments)
+            future, timeout, tool = futures[key]
+            remaining = max(0.0, now + timeout - time.monotonic())
+            try:
+                value = future.result(timeout=remaining)
+            except (TimeoutError, FuturesTimeoutError, asyncio.TimeoutError):
+                results[index] = {"name": name, "arguments": arguments, "error": f"timed out after {timeout:g}s"}
+                continue
+            except Exception as e:
+                results[index] = {"name": name, "arguments": arguments, "error": f"{type(e).__name__}: {e}"}
+                continue
+            memo[key] = value
+            ttl = float(tool.get("cache_ttl") or 0)
+            if ttl > 0:
+                with _ttl_lock:
+                    _ttl_cache[key] = (time.monotonic() + ttl, value)
+            results[index] = {"name": name, "arguments": arguments, "result": value}
+
+    return results
+
+
+def format_tool_results(results: List[Dict[str, Any]]) -> str:
+    lines = ["Tool results:"]
+    for result in results:
+        arguments = json.dumps(result["arguments"], default=str)
+        if "error" in result:
+            lines.append(f"- {result['name']}({arguments}) failed: {result['error']}")
+        else:
+            lines.append(f"- {result['name']}({arguments}) -> {json.dumps(result['result'], default=str)}")
+    return "\n".join(lines)
+
+
+def run_tool_loop(
+    message: str,
+    ask: Callable[[str], Optional[str]],
+    tools: Dict[str, Dict[str, Any]],
+    max_rounds: int = DEFAULT_MAX_ROUNDS,
+    default_timeout: float = DEFAULT_TOOL_TIMEOUT,
+) -> Optional[str]:
+    """Ask the model, run any tools it requests and feed the results back until it answers.
+
+    Only the first turn goes through the provider's prompt template; later
+    turns carry tool results for the model to reason over, so they are sent as
+    they are (see :func:`claii.prompts.concise.raw_prompts`).
+    """
+    memo: Dict[str, Any] = {}
+    transcript = [message, "", describe_tools(tools)]
+    reply = None
+    for round_number in range(max_rounds + 1):
+        prompt = "\n".join(transcript + [FOLLOW_UP] if round_number else transcript)
+        with span("tools.round", round=round_number), raw_prompts() if round_number else nullcontext():
+            reply = ask(prompt)
+        calls = parse_tool_calls(reply)
+        if not calls:
+            return reply
+        if round_number == max_rounds:
+            break
+        results = execute_tool_calls(calls, tools, memo, default_timeout)
+        transcript += ["", f"{TOOL_CALLS_MARKER} {json.dumps(calls)}", format_tool_results(results)]
+
+    # Out of rounds: ask once more for an answer without tools
+    transcript += ["", FINAL_ROUND]
+    with raw_prompts():
+        return ask("\n".join(transcript))
@@ -1,66 +1,314 @@
+import asyncio
 import json
-from rich.console import Console
-from langchain_openai import OpenAI
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import PromptTemplate
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 from claii.config import load_config
 from claii.history import log_history
-import requests
-from claii.models.openai import chat_openai
-from claii.models.ollama import chat_ollama
-from claii.models.mistral import chat_mistral
-from claii.models.perplexity import chat_perplexity
-from claii.models.gemini import chat_gemini
-from claii.models.deepseek import chat_deepseek
+from claii.models.common import streaming_to, token_callback
 from claii.plugins.manager import plugin_manager
+from claii.tracing import span
+from claii.errors import ErrorReply
+from claii import agent, coalesce, history, ollama_pool, probe, stats
+from claii.output import LazyConsole
 
 
-console = Console()
+# "Using <provider>" and errors are status messages: stderr in the machine output formats
+console = LazyConsole(status=True)
 
-def gen_reply(message: str, tool: str = "auto"):
-    """Select AI tool dynamically and chat based on user preferences or system availability."""
-    config = load_config()
+DEFAULT_BATCH_CONCURRENCY = 4
 
-    # Load models from config
-    ollama_model = config.get("ollama_model", "mistral")
-    openai_model = config.get("openai_model", "gpt-4")
-    deepseek_model = config.get("deepseek_model", "deepseek-chat")
-    perplexity_model = config.get("perplexity_model", "pplx-7b-chat")
-    mistral_model = config.get("mistral_model", "mistral-medium")
-    gemini_model = config.get("gemini_model", "gemini-pro")
+_local = threading.local()
+
+def _announce(text: str):
+    """Print which backend answers, unless this thread is one of several sampling the same query."""
+    if not getattr(_local, "quiet", False):
+        console.print(text)
+
+@contextmanager
+def quiet():
+    """Don't print which backend answers for requests made on this thread inside the block."""
+    previous = getattr(_local, "quiet", False)
+    _local.quiet = True
+    try:
+        yield
+    finally:
+        _local.quiet = previous
+
+def _call_backend(provider: str, model: str, call, config, message=None):
+    """Run a backend call while recording its latency, tokens and errors in the stats store.
+
+    With ``message``, identical requests already in flight are joined instead of
+    calling the backend again (see :mod:`claii.coalesce`).
+    """
+    with stats.track(provider, model, save=config.get("stats_enabled", True)) as record:
+        if message is not None and config.get("coalesce_requests", True):
+            key = coalesce.request_key(message, provider, model)
+            reply = coalesce.run(key, call, config.get("coalesce_timeout", coalesce.DEFAULT_WAIT_TIMEOUT))
+        else:
+            reply = call()
+        record.error = _error_code(reply)
+        return reply
+
+def _error_code(reply):
+    if reply is None:
+        return "no_reply"
+    if isinstance(reply, ErrorReply):
+        return reply.code
+    return None
+
+def _reply(provider: str, model: str, chat, message: str, config, use_tools, on_token=None):
+    """Get a reply from a backend, running the plugin tool-calling loop if enabled."""
+    if use_tools is None:
+        use_tools = config.get("tool_calling", False)
+    if not use_tools or not plugin_manager.tools:
+        with streaming_to(on_token):
+            return _call_backend(provider, model, lambda: chat(message), config, message)
+
+    # Intermediate rounds carry tool instructions and results; only the final answer goes to history
+    with history.paused():
+        reply = agent.run_tool_loop(
+            message,
+            lambda prompt: _call_backend(provider, model, lambda: chat(prompt), config),
+            plugin_manager.tools,
+            max_rounds=config.get("tool_max_rounds", agent.DEFAULT_MAX_ROUNDS),
+            default_timeout=config.get("tool_timeout", agent.DEFAULT_TOOL_TIMEOUT),
+        )
+    if reply and not isinstance(reply, ErrorReply):
+        log_history(message, reply)
+    return reply
+
+def _consume_stream(chunks, on_token=None):
+    """Join a plugin model's streamed reply, reporting the first token to the stats store."""
+    parts = []
+    for chunk in chunks:
+        if isinstance(chunk, ErrorReply):
+            return chunk
+        if not chunk:
+            continue
+        if not parts:
+            stats.mark_first_token()
+        parts.append(chunk)
+        if on_token:
+            on_token(chunk)
+    return "".join(parts).strip()
+
+def _plugin_chat(name: str) -> Optional[Callable[[str], Optional[str]]]:
+    """Pick the most efficient way to get one reply from a plugin model.
+
+    Streaming comes first, since it reports time-to-first-token and lets tokens be
+    shown as they arrive; then the plain handler, then the async and batch handlers.
+    """
+    model_info = plugin_manager.models[name]
+    capabilities = plugin_manager.get_model_capabilities(name)
+    if capabilities["stream"]:
+        return lambda message: _consume_stream(model_info["stream_handler"](message), token_callback())
+    if model_info.get("handler"):
+        return model_info["handler"]
+    if capabilities["async"]:
+        return lambda message: asyncio.run(model_info["async_handler"](message))
+    if capabilities["batch"]:
+        return lambda message: model_info["batch_handler"]([message])[0]
+    return None
+
+def _auto_tool(config) -> str:
+    """The provider for ``--tool auto``: the first configured one not recently found down by ``claii tools list``."""
+    status = probe.load_status()
+    ttl = config.get("provider_status_ttl", probe.DEFAULT_STATUS_TTL)
+    for name in probe.AUTO_ORDER:
+        if name != "ollama" and not config.get(f"{name}_api_key"):
+            continue
+        down = probe.known_down(status, name, ttl)
+        if down is None:
+            return name
+        _announce(f"[dim]Skipping {name}: {down.get('detail') or 'down'} "
+                  f"(checked {time.time() - down['checked_at']:.0f}s ago)[/dim]")
+    return "ollama"
+
+def gen_reply(message: str, tool: str = "auto", use_tools=None, on_token=None):
+    """Select AI tool dynamically and chat based on user preferences or system availability.
+
+    With ``use_tools`` (default: the ``tool_calling`` config option) the model may call
+    tools registered by plugins before answering. ``on_token`` is called with each
+    chunk of the reply as it streams in (not when tools are in use).
+    """
+    with span("gen_reply", tool=tool):
+        config = load_config()
+
+        # Load models from config
+        ollama_model = config.get("ollama_model", "mistral")
+        openai_model = config.get("openai_model", "gpt-4")
+        deepseek_model = config.get("deepseek_model", "deepseek-chat")
+        perplexity_model = config.get("perplexity_model", "pplx-7b-chat")
+        mistral_model = config.get("mistral_model", "mistral-medium")
+        gemini_model = config.get("gemini_model", "gemini-pro")
     
-    # Check if we should use a plugin model first
-    if tool != "auto" and tool in plugin_manager.models:
-        model_handler = plugin_manager.get_model_handler(tool)
-        if model_handler:
-            console.print(f"[yellow]Using plugin model: {tool}[/yellow]")
-            return model_handler(message)
-
-    # AI model selection logic
-    if tool == "ollama" or (tool == "auto"):
-        console.print(f"[yellow]Using Ollama ({ollama_model})[/yellow]")
-        return chat_ollama(message, ollama_model)
+        # Check if we should use a plugin model first
+        if tool != "auto" and tool in plugin_manager.models:
+            model_handler = _plugin_chat(tool)
+            if model_handler:
+                _announce(f"[yellow]Using plugin model: {tool}[/yellow]")
+                return _reply(tool, tool, model_handler, message, config, use_tools, on_token)
+
+        # AI model selection logic
+        if tool == "auto":
+            tool = _auto_tool(config)
+        # Backends are imported when selected, so a request only pays for its own provider's imports
+        if tool == "ollama":
+            if ollama_model == "auto":
+                from claii.model_select import auto_model
+                ollama_model = auto_model(config, on_calibrate=lambda name: console.print(
+                    f"[yellow]Measuring how fast {name} runs here (once per model)...[/yellow]"))
+            _announce(f"[yellow]Using Ollama ({ollama_model})[/yellow]")
+            from claii.models.ollama import chat_ollama
+            return _reply("ollama", ollama_model, lambda m: chat_ollama(m, ollama_model), message, config, use_tools, on_token)
     
-    elif tool == "openai" or (tool == "auto"):
-        console.print(f"[yellow]Using OpenAI ({openai_model})[/yellow]")
-        return chat_openai(message)
+        elif tool == "openai":
+            _announce(f"[yellow]Using OpenAI ({openai_model})[/yellow]")
+            from claii.models.openai import chat_openai
+            return _reply("openai", openai_model, chat_openai, message, config, use_tools, on_token)
     
-    elif tool == "deepseek" or tool == "auto":
-        console.print(f"[yellow]Using DeepSeek ({deepseek_model})[/yellow]")
-        return chat_deepseek(message)
+        elif tool == "deepseek":
+            _announce(f"[yellow]Using DeepSeek ({deepseek_model})[/yellow]")
+            from claii.models.deepseek import chat_deepseek
+            return _reply("deepseek", deepseek_model, chat_deepseek, message, config, use_tools, on_token)
     
-    elif tool == "perplexity" or tool == "auto":
-        console.print(f"[yellow]Using Perplexity ({perplexity_model})[/yellow]")
-        return chat_perplexity(message)
+        elif tool == "perplexity":
+            _announce(f"[yellow]Using Perplexity ({perplexity_model})[/yellow]")
+            from claii.models.perplexity import chat_perplexity
+            return _reply("perplexity", perplexity_model, chat_perplexity, message, config, use_tools, on_token)
     
-    elif tool == "mistral" or tool == "auto":
-        console.print(f"[yellow]Using Mistral ({mistral_model})[/yellow]")
-        return chat_mistral(message)
+        elif tool == "mistral":
+            _announce(f"[yellow]Using Mistral ({mistral_model})[/yellow]")
+            from claii.models.mistral import chat_mistral
+            return _reply("mistral", mistral_model, chat_mistral, message, config, use_tools, on_token)
     
-    elif tool == "gemini" or tool == "auto":
-        console.print(f"[yellow]Using Gemini ({gemini_model})[/yellow]")
-        return chat_gemini(message)
+        elif tool == "gemini":
+            _announce(f"[yellow]Using Gemini ({gemini_model})[/yellow]")
+            from claii.models.gemini import chat_gemini
+            return _reply("gemini", gemini_model, chat_gemini, message, config, use_tools, on_token)
+
+        elif tool == "openai-compatible":
+            from claii.models.openai_compatible import chat_openai_compatible, DEFAULT_MODEL
+            model = config.get("openai_compatible_model", DEFAULT_MODEL)
+            _announce(f"[yellow]Using OpenAI-compatible server ({model})[/yellow]")
+            return _reply("openai-compatible", model, chat_openai_compatible, message, config, use_tools, on_token)
+
+        else:
+            console.print("[red]No AI tools available or invalid selection![/red]")
+            return None
+
+
+def gen_candidates(message: str, tool: str = "auto", n: int = 3, use_tools=None):
+    """Get ``n`` candidate replies to one message, or an error reply if none could be generated.
+
+    OpenAI-compatible servers return all of them from one request (the ``n``
+    parameter); other backends are sampled ``n`` times in parallel. Candidates
+    aren't logged to history: the caller logs the one it picks.
+    """
+    with span("gen_candidates", tool=tool, n=n):
+        config = load_config()
+        if tool == "openai-compatible" and not (use_tools if use_tools is not None else config.get("tool_calling", False)):
+            from claii.models.openai_compatible import candidates_openai_compatible, DEFAULT_MODEL
+            model = config.get("openai_compatible_model", DEFAULT_MODEL)
+            console.print(f"[yellow]Using OpenAI-compatible server ({model}), {n} candidates[/yellow]")
+            return _call_backend("openai-compatible", model, lambda: candidates_openai_compatible(message, n), config)
+
+        console.print(f"[yellow]Sampling {n} candidates from {tool}[/yellow]")
+        records = []
+
+        def sample(_):
+            # Identical requests would otherwise be coalesced into one sample
+            with quiet(), history.paused(), coalesce.bypassed():
+                reply = gen_reply(message, tool, use_tools=use_tools)
+            records.append(stats.last_record())
+            return reply
+
+        with ThreadPoolExecutor(n) as pool:
+            replies = list(pool.map(sample, range(n)))
+        records = [record for record in records if record is not None]
+        if records:
+            stats.remember(max(records, key=lambda record: record.latency or 0))
+        candidates = [reply for reply in replies if reply and not isinstance(reply, ErrorReply)]
+        return candidates or next((reply for reply in replies if reply is not None), None)
+
+
+def _batch_replies(name: str, batch_handler, messages: List[str], batch_size, concurrency: int, config):
+    """Send messages to a plugin model's batch handler, ``batch_size`` at a time."""
+    batch_size = batch_size or len(messages)
+    batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+
+    def run(batch):
+        try:
+            with stats.track(name, name, save=config.get("stats_enabled", True)) as record:
+                replies = list(batch_handler(batch))
+                if len(replies) != len(batch):
+                    raise ValueError(f"{name} returned {len(replies)} replies for a batch of {len(batch)}")
+                record.error = next(filter(None, map(_error_code, replies)), None)
+                return replies
+        except Exception as e:
+            console.print(f"[red]Batch request to {name} failed: {e}[/red]")
+            return [None] * len(batch)
+
+    with ThreadPoolExecutor(max(1, min(concurrency, len(batches)))) as pool:
+        return [reply for replies in pool.map(run, batches) for reply in replies]
+
+def _async_replies(name: str, async_handler, messages: List[str], concurrency: int, config):
+    """Run a plugin model's async handler on one event loop, ``concurrency`` requests at a time."""
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(message):
+            async with semaphore:
+                record = stats.RequestRecord(name, name)
+                try:
+                    reply = await async_handler(message)
+                    record.error = _error_code(reply)
+                    return reply
+                except Exception as e:
+                    record.error = type(e).__name__
+                    return None
+                finally:
+                    stats.finish(record, save=config.get("stats_enabled", True))
+
+        return await asyncio.gather(*(run(message) for message in messages))
+
+    return asyncio.run(run_all())
+
+def gen_replies(messages: List[str], tool: str = "auto", use_tools=None) -> List[Optional[str]]:
+    """Get replies for many messages, in the same order.
+
+    Plugin models with a batch handler get the messages in batches (at most
+    ``max_batch_size`` each), async models are driven from one event loop, and
+    everything else goes through ``gen_reply`` on a thread pool. Concurrency is the
+    model's ``max_concurrency``, or the ``batch_concurrency`` config option (for
+    Ollama, by default at least as many requests as a pool of servers can take).
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    with span("gen_replies", tool=tool, messages=len(messages)):
+        config = load_config()
+        concurrency = config.get("batch_concurrency", DEFAULT_BATCH_CONCURRENCY)
+        if tool in ("ollama", "auto") and "batch_concurrency" not in config:
+            concurrency = max(concurrency, ollama_pool.pool_concurrency(config) or 0)
+        if use_tools is None:
+            use_tools = config.get("tool_calling", False)
+
+        # The tool-calling loop needs one conversation per message
+        if tool in plugin_manager.models and not (use_tools and plugin_manager.tools):
+            model_info = plugin_manager.models[tool]
+            capabilities = plugin_manager.get_model_capabilities(tool)
+            concurrency = capabilities["max_concurrency"] or concurrency
+            if capabilities["batch"]:
+                console.print(f"[yellow]Using plugin model: {tool} (batches)[/yellow]")
+                return _batch_replies(tool, model_info["batch_handler"], messages,
+                                      capabilities["max_batch_size"], concurrency, config)
+            if capabilities["async"]:
+                console.print(f"[yellow]Using plugin model: {tool} (async)[/yellow]")
+                return _async_replies(tool, model_info["async_handler"], messages, concurrency, config)
 
-    else:
-        console.print("[red]No AI tools available or invalid selection![/red]")
-        return None
+        with ThreadPoolExecutor(max(1, min(concurrency, len(messages)))) as pool:
+            return list(pool.map(lambda message: gen_reply(message, tool, use_tools=use_tools), messages))
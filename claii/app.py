@@ -1,17 +1,53 @@
-import typer
-from rich.console import Console
-from claii.commands import config, generate, tools, system
-from claii.plugins.manager import plugin_manager
+import sys
+from claii import replay, tracing
 
-console = Console()
+# Enable --profile before the heavy imports below so they show up in the trace
+tracing.configure_from_argv(sys.argv[1:])
+_startup_span = tracing.span("startup")
+
+with tracing.span("startup.imports"):
+    import typer
+    from claii.commands import config, generate, tools, system, stats, bench, cookbook, compare, repl, history, shell_init
+    from claii.plugins.manager import plugin_manager
+    from claii.output import LazyConsole
+
+console = LazyConsole()
 app = typer.Typer()
 
+
+@app.callback()
+def main(
+    profile: bool = typer.Option(False, "--profile", help="Print a per-phase timing tree when the command finishes."),
+    profile_output: str = typer.Option(None, "--profile-output", help="Also write the trace to this file (implies --profile)."),
+    profile_format: str = typer.Option("chrome", "--profile-format", help="Trace file format: chrome (chrome://tracing, Perfetto) or json."),
+    record: str = typer.Option(None, "--record", help="Record provider traffic (with timings) to this cassette file."),
+    replay_path: str = typer.Option(None, "--replay", help="Serve provider traffic from this cassette file instead of the network."),
+    replay_scale: float = typer.Option(None, "--replay-scale", help="Multiply replayed delays (1 = original timing, 0 = instant)."),
+):
+    """Command Line Artificial Intelligence Interface, an AI for your CLI."""
+    if profile or profile_output:
+        tracing.enable(profile_output, profile_format)
+    if record or replay_path or replay_scale is not None:
+        try:
+            replay.configure(record=record, replay=replay_path, scale=replay_scale)
+        except (ValueError, FileNotFoundError) as e:
+            console.print(f"[red]{e}[/red]")
+            raise typer.Exit(1)
+
+
 # Register CLI commands from different files
 # app.add_typer(chat.app, name="chat")
 app.add_typer(config.app, name="config")
 app.add_typer(tools.app, name="tools")
 app.add_typer(system.app, name="system")
+app.add_typer(cookbook.app, name="cookbook")
 app.command()(generate.chat)
+app.command()(stats.stats)
+app.command()(bench.bench)
+app.command()(compare.compare)
+app.command()(repl.repl)
+app.command()(history.history)
+app.command("shell-init")(shell_init.shell_init)
 
 # Initialize plugin system
 plugin_manager.load_plugins()
@@ -22,5 +58,7 @@ for cmd_name, cmd_info in plugin_manager.commands.items():
     if handler:
         app.add_typer(handler(), name=cmd_name)
 
+_startup_span.finish()
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,190 @@
+"""Rank candidate commands locally, without asking the model again.
+
+When several candidates are generated for one query, each is checked for
+problems that make it likely to fail:
+
+- it doesn't lex as a shell command (unbalanced quotes or brackets, a dangling
+  ``|`` or ``&&``, Markdown fences);
+- a program it runs isn't on ``$PATH``;
+- it is written for the wrong shell (PowerShell cmdlets when a POSIX command was
+  asked for, or the other way round; see :func:`claii.prompts.concise.target_shell`).
+
+Candidates with fewer and lighter problems rank first. Among equally good ones,
+a command that several samples agreed on wins, then the shorter one.
+"""
+
+import os
+import re
+import shlex
+import shutil
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from claii.prompts.concise import target_shell
+
+SYNTAX_PENALTY = 10.0
+PLATFORM_PENALTY = 5.0
+MISSING_PROGRAM_PENALTY = 3.0
+AGREEMENT_BONUS = 1.0
+LENGTH_PENALTY = 0.005  # per character
+
+# Tokens that separate one command from the next
+_CONTROL = {"|", "||", "&&", ";", "&", "(", ")", "|&", ";;", "\n"}
+# Words that run the command after them (their options are skipped)
+_WRAPPERS = {"sudo", "env", "nohup", "time", "nice", "xargs", "exec", "command", "doas", "watch", "timeout"}
+_WRAPPER_VALUE_OPTIONS = {"-u", "-g", "-n", "-I", "-P", "-s", "-d"}
+_KEYWORDS = {"if", "then", "else", "elif", "fi", "do", "done", "while", "until", "!", "{", "}", "esac"}
+_BUILTINS = {
+    "cd", "echo", "export", "set", "unset", "source", ".", "alias", "read", "printf", "test", "[", "[[", "true",
+    "false", "exit", "return", "eval", "shift", "trap", "type", "umask", "wait", "local", "declare", "let", "ulimit",
+    "pushd", "popd", "history", "jobs", "fg", "bg", "kill", "hash", "builtin", "shopt", "getopts", "break", "continue",
+}
+_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+_CMDLET = re.compile(r"\b(?:Get|Set|New|Remove|Select|Where|ForEach|Invoke|Start|Stop|Test|Write|Out|Copy|Move|Rename|Measure|Sort)-[A-Z][A-Za-z]+")
+# Programs and paths that don't exist in PowerShell on Windows
+_POSIX_ONLY = {"grep", "sed", "awk", "sudo", "chmod", "chown", "xargs", "apt", "apt-get", "yum", "dnf", "pacman", "brew", "lsof"}
+
+
+@dataclass
+class Candidate:
+    command: str
+    score: float = 0.0
+    votes: int = 1
+    issues: List[str] = field(default_factory=list)
+
+    def as_dict(self):
+        return {"command": self.command, "score": round(self.score, 3), "votes": self.votes, "issues": self.issues}
+
+
+def normalize(reply: str) -> str:
+    """The command in a reply, without surrounding whitespace or a Markdown code fence."""
+    text = reply.strip()
+    fenced = re.fullmatch(r"```[\w-]*\n?(.*?)\n?```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+    if len(text) > 1 and text[0] == text[-1] == "`" and "`" not in text[1:-1]:
+        text = text[1:-1].strip()
+    return text
+
+
+def _tokens(command: str) -> List[str]:
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    return list(lexer)
+
+
+def programs(tokens: Iterable[str]) -> List[str]:
+    """The programs a lexed POSIX command line runs."""
+    found = []
+    expect_command = True
+    skip_value = False
+    for token in tokens:
+        if token in _CONTROL:
+            expect_command = True
+        elif not expect_command:
+            continue
+        elif skip_value:
+            skip_value = False
+        elif _ASSIGNMENT.match(token) or token in _KEYWORDS:
+            continue
+        elif token in ("for", "case", "select", "function"):
+            expect_command = False
+        elif token in _WRAPPERS:
+            found.append(token)
+        elif token.startswith("-") and found and found[-1] in _WRAPPERS:
+            skip_value = token in _WRAPPER_VALUE_OPTIONS
+        elif token.startswith(("<", ">")) or token == "$":
+            continue
+        else:
+            found.append(token)
+            expect_command = False
+    return found
+
+
+def _missing(program: str) -> bool:
+    if program in _BUILTINS or "$" in program:
+        return False
+    if "/" in program:
+        # Relative paths may only exist once earlier steps ran
+        return os.path.isabs(program) and not os.access(program, os.X_OK)
+    return shutil.which(program) is None
+
+
+def _balanced(command: str) -> bool:
+    """Quotes and brackets are closed (for PowerShell, which shlex can't lex)."""
+    stack = []
+    pairs = {"(": ")", "{": "}", "[": "]"}
+    quote = None
+    for char in command:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in pairs:
+            stack.append(pairs[char])
+        elif char in pairs.values():
+            if not stack or stack.pop() != char:
+                return False
+    return quote is None and not stack
+
+
+def check(command: str, shell: Optional[str] = None) -> List[str]:
+    """Problems found in one candidate command (empty if none)."""
+    shell = shell or target_shell()
+    if not command:
+        return ["empty"]
+    if "```" in command:
+        return ["contains a Markdown code fence"]
+    issues = []
+    if shell == "powershell":
+        if not _balanced(command):
+            issues.append("unbalanced quotes or brackets")
+        segments = [segment.strip() for segment in re.split(r"\||;", command) if segment.strip()]
+        words = [segment.split()[0] for segment in segments]
+        if any(word in _POSIX_ONLY for word in words) or "/dev/null" in command:
+            issues.append("uses POSIX-only programs")
+        issues += [f"'{word}' not found on PATH" for word in words
+                   if not _CMDLET.fullmatch(word) and not word.startswith(("$", "(")) and _missing(word)]
+        return issues
+
+    try:
+        tokens = _tokens(command)
+    except ValueError:
+        return ["unbalanced quotes"]
+    if tokens and (tokens[0] in _CONTROL - {"("} or tokens[-1] in {"|", "||", "&&", "|&"}):
+        issues.append("starts or ends with an operator")
+    if tokens.count("(") != tokens.count(")"):
+        issues.append("unbalanced parentheses")
+    if _CMDLET.search(command):
+        issues.append("uses PowerShell cmdlets")
+    issues += [f"'{program}' not found on PATH" for program in dict.fromkeys(programs(tokens)) if _missing(program)]
+    return issues
+
+
+def _penalty(issue: str) -> float:
+    if "not found on PATH" in issue:
+        return MISSING_PROGRAM_PENALTY
+    if issue.startswith("uses "):
+        return PLATFORM_PENALTY
+    return SYNTAX_PENALTY
+
+
+def rank(replies: Iterable[str], shell: Optional[str] = None) -> List[Candidate]:
+    """Score and sort candidate replies, best first. Duplicates are merged and counted as votes."""
+    candidates = {}
+    for reply in replies:
+        command = normalize(reply or "")
+        if command in candidates:
+            candidates[command].votes += 1
+        else:
+            candidates[command] = Candidate(command)
+    for candidate in candidates.values():
+        candidate.issues = check(candidate.command, shell)
+        candidate.score = (
+            (candidate.votes - 1) * AGREEMENT_BONUS
+            - sum(map(_penalty, candidate.issues))
+            - len(candidate.command) * LENGTH_PENALTY
+        )
+    return sorted(candidates.values(), key=lambda candidate: -candidate.score)
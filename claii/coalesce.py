@@ -0,0 +1,188 @@
+"""Single-flight coalescing of identical concurrent requests.
+
+When a query is sent to a provider and model while an identical request is
+already in flight, the later callers wait for the first one and receive its
+reply instead of making their own upstream call. Requests are identical when
+their normalized query, provider, model and prompt version match.
+
+Coalescing works between threads of one process and, through a lock file per
+request under ``~/.config/CLAII/coalesce``, between processes on the same host
+(POSIX only). Only requests that overlap in time are coalesced: a reply is
+never reused for a request that starts after it finished.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from claii import stats
+from claii.config import CONFIG_DIR
+from claii.errors import ErrorReply
+from claii.prompts.concise import PROMPT_VERSION
+from claii.tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COALESCE_DIR = CONFIG_DIR / "coalesce"
+DEFAULT_WAIT_TIMEOUT = 300.0
+POLL_INTERVAL = 0.02
+STALE_AFTER = 24 * 3600
+
+# Set to False to send every request upstream (e.g. during load tests)
+ENABLED = True
+
+_local = threading.local()
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+_swept = False
+
+
+@contextmanager
+def bypassed():
+    """Send requests made on this thread inside the block upstream, e.g. samples that should differ"""
+    previous = getattr(_local, "bypassed", False)
+    _local.bypassed = True
+    try:
+        yield
+    finally:
+        _local.bypassed = previous
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query match."""
+    return " ".join(query.split())
+
+
+def request_key(query: str, provider: str, model: str, prompt_version: int = PROMPT_VERSION) -> str:
+    body = json.dumps([normalize_query(query), provider, model, prompt_version])
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def run(key: str, call: Callable[[], Optional[str]], wait_timeout: float = DEFAULT_WAIT_TIMEOUT) -> Optional[str]:
+    """Return ``call()``, or the reply of an identical request already in flight.
+
+    Waiting callers are marked as ``coalesced`` in the request stats. If the
+    request they wait for raises or takes longer than ``wait_timeout``, they
+    make their own call.
+    """
+    if not ENABLED or getattr(_local, "bypassed", False):
+        return call()
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        with span("coalesce.wait", scope="thread"):
+            try:
+                reply = future.result(timeout=wait_timeout)
+            except Exception:
+                return call()
+        stats.annotate(cache="coalesced")
+        return reply
+
+    try:
+        reply = _run_across_processes(key, call, wait_timeout)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(reply)
+        return reply
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _run_across_processes(key: str, call: Callable[[], Optional[str]], wait_timeout: float) -> Optional[str]:
+    """Hold the request's lock file while calling; other processes wait for it and read the result file."""
+    if fcntl is None:
+        return call()
+    try:
+        os.makedirs(COALESCE_DIR, exist_ok=True)
+        lock_file = open(COALESCE_DIR / f"{key}.lock", "a+")
+    except OSError as e:
+        logger.warning(f"Could not coalesce across processes: {e}")
+        return call()
+
+    result_path = COALESCE_DIR / f"{key}.json"
+    started = time.time()
+    try:
+        if not _try_lock(lock_file):
+            with span("coalesce.wait", scope="process"):
+                deadline = time.monotonic() + wait_timeout
+                while not _try_lock(lock_file):
+                    if time.monotonic() > deadline:
+                        return call()
+                    time.sleep(POLL_INTERVAL)
+            found, reply = _read_result(result_path, started)
+            if found:
+                stats.annotate(cache="coalesced")
+                return reply
+        # Either nobody else was asking, or they failed without a result: make the call ourselves
+        reply = call()
+        _write_result(result_path, reply)
+        return reply
+    finally:
+        lock_file.close()
+        _sweep()
+
+
+def _read_result(path, since: float):
+    try:
+        with open(path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return False, None
+    if result.get("finished", 0) < since:
+        return False, None
+    if result.get("code"):
+        return True, ErrorReply(result["reply"], result["code"])
+    return True, result.get("reply")
+
+
+def _write_result(path, reply: Optional[str]) -> None:
+    code = reply.code if isinstance(reply, ErrorReply) else None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"finished": time.time(), "reply": reply, "code": code}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not share coalesced reply: {e}")
+
+
+def _sweep() -> None:
+    """Once per process, remove lock and result files of requests not seen for a day."""
+    global _swept
+    if _swept:
+        return
+    _swept = True
+    cutoff = time.time() - STALE_AFTER
+    try:
+        for entry in os.scandir(COALESCE_DIR):
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    except OSError:
+        pass
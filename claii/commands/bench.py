@@ -0,0 +1,97 @@
+import contextlib
+import io
+import json
+import typer
+from claii import coalesce, history, loadgen, stats
+from claii.ai import gen_reply
+from claii.output import LazyConsole
+
+console = LazyConsole(stderr=True)
+
+
+def _fmt_seconds(value):
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def bench(
+    tool: str = typer.Option("auto", help="Provider or plugin model to load-test."),
+    concurrency: int = typer.Option(4, min=1, help="Number of concurrent requests."),
+    requests: int = typer.Option(50, min=1, help="Number of measured requests."),
+    prompts: str = typer.Option(None, help="File with one prompt per line (default: a few built-in prompts)."),
+    warmup: int = typer.Option(None, min=0, help="Unmeasured warm-up requests (default: one per worker)."),
+    ramp_up: float = typer.Option(0.0, min=0, help="Seconds over which workers are started."),
+    json_output: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+    output: str = typer.Option(None, help="Also write the JSON report to this file."),
+    record: bool = typer.Option(False, help="Keep the requests in history and `claii stats`."),
+):
+    """Load-test a provider through the same code path as `claii chat`"""
+    prompt_list = loadgen.DEFAULT_PROMPTS
+    if prompts:
+        with open(prompts) as f:
+            prompt_list = [line.strip() for line in f if line.strip()]
+        if not prompt_list:
+            console.print(f"[red]No prompts found in {prompts}[/red]")
+            raise typer.Exit(1)
+
+    if warmup is None:
+        warmup = concurrency
+
+    history.LOGGING_ENABLED = record
+    stats.RECORDING_ENABLED = record
+    # Identical prompts sent concurrently would otherwise share one upstream call
+    coalesce.ENABLED = False
+
+    console.print(f"[yellow]Benchmarking {tool}: {requests} requests, concurrency {concurrency}, "
+                  f"{warmup} warm-up, {ramp_up:g}s ramp-up[/yellow]")
+    from rich.progress import Progress
+    with Progress(console=console, transient=True) as progress:
+        task = progress.add_task("Requests", total=requests)
+        # Backends print a "Using ..." line per request; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = loadgen.run_load_test(
+                lambda prompt: gen_reply(prompt, tool),
+                prompt_list,
+                requests=requests,
+                concurrency=concurrency,
+                warmup=warmup,
+                ramp_up=ramp_up,
+                tool=tool,
+                on_result=lambda result: progress.advance(task),
+            )
+
+    data = report.as_dict()
+    if output:
+        with open(output, "w") as f:
+            json.dump(data, f, indent=2)
+    if json_output:
+        typer.echo(json.dumps(data, indent=2))
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+    out = Console()
+    summary = Table(title=f"claii bench: {tool}", show_header=False)
+    summary.add_column("Metric", style="cyan")
+    summary.add_column("Value", style="yellow")
+    summary.add_row("Requests", f"{data['requests']} ({data['successful']} ok)")
+    summary.add_row("Wall time", _fmt_seconds(data["wall_time_seconds"]))
+    summary.add_row("Throughput", "-" if data["requests_per_second"] is None else f"{data['requests_per_second']:.2f} req/s")
+    summary.add_row("Tokens/sec", "-" if data["tokens_per_second"] is None else f"{data['tokens_per_second']:.1f}")
+    summary.add_row("Error rate", f"{data['error_rate']:.1%}")
+    out.print(summary)
+
+    latency = Table(title="Latency")
+    for column in ("", "mean", "p50", "p90", "p99", "max"):
+        latency.add_column(column, justify="right" if column else "left")
+    for label, key in (("Total", "latency_seconds"), ("Time to first token", "ttft_seconds")):
+        dist = data[key]
+        latency.add_row(label, *(_fmt_seconds(dist[q]) for q in ("mean", "p50", "p90", "p99", "max")))
+    out.print(latency)
+
+    if data["errors"]:
+        errors = Table(title="Errors")
+        errors.add_column("Error", style="red")
+        errors.add_column("Count", justify="right")
+        for error, count in sorted(data["errors"].items(), key=lambda item: -item[1]):
+            errors.add_row(error, str(count))
+        out.print(errors)
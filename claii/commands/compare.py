@@ -0,0 +1,153 @@
+import contextlib
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import typer
+
+from claii import compare as comparison
+from claii.output import LazyConsole
+from claii.plugins.manager import plugin_manager
+
+console = LazyConsole()
+
+
+def _fmt_seconds(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def _result_cell(result: comparison.CompareResult):
+    from rich.console import Group
+    from rich.text import Text
+    if result.error and result.reply:
+        body = Text.from_markup(result.reply)
+    elif result.error:
+        body = Text(result.error, style="red")
+    else:
+        body = Text(result.text or ("…" if not result.done else ""))
+    if not result.done:
+        return Group(body, Text("waiting…" if not result.text else "streaming…", style="dim"))
+    tokens = "-" if result.tokens_out is None else str(result.tokens_out)
+    footer = f"latency {_fmt_seconds(result.latency)} · TTFT {_fmt_seconds(result.ttft)} · {tokens} tokens"
+    return Group(body, Text(footer, style="dim"))
+
+
+def _side_by_side(results: List[comparison.CompareResult]):
+    from rich.table import Table
+    table = Table(expand=True, show_lines=True)
+    for result in results:
+        table.add_column(result.tool, ratio=1, overflow="fold")
+    table.add_row(*(_result_cell(result) for result in results))
+    return table
+
+
+def _aggregate_table(summaries, prompts: int, wall_time: float):
+    from rich.table import Table
+    table = Table(title=f"{prompts} prompts in {wall_time:.1f}s")
+    table.add_column("Tool")
+    table.add_column("Requests", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p90", justify="right")
+    table.add_column("TTFT p50", justify="right")
+    table.add_column("Tokens/s", justify="right")
+    for tool, summary in summaries.items():
+        tokens_per_second = summary["tokens_per_second"]
+        table.add_row(
+            tool,
+            str(summary["requests"]),
+            str(summary["errors"]),
+            _fmt_seconds(summary["latency_p50"]),
+            _fmt_seconds(summary["latency_p90"]),
+            _fmt_seconds(summary["ttft_p50"]),
+            "-" if tokens_per_second is None else f"{tokens_per_second:.1f}",
+        )
+    return table
+
+
+def _compare_live(query: str, tools: List[str]) -> List[comparison.CompareResult]:
+    results = [comparison.CompareResult(tool) for tool in tools]
+    from rich.live import Live
+    with Live(_side_by_side(results), console=console, refresh_per_second=10, redirect_stdout=False) as live:
+        with ThreadPoolExecutor(len(tools)) as pool:
+            futures = [pool.submit(comparison.ask, query, result) for result in results]
+            while not all(future.done() for future in futures):
+                live.update(_side_by_side(results))
+                time.sleep(0.1)
+        live.update(_side_by_side(results))
+    return results
+
+
+def compare(
+    query: Optional[str] = typer.Argument(None, help="Query to send to every tool."),
+    tools: str = typer.Option(None, help="Comma-separated providers or plugin models (default: all configured)."),
+    prompts: str = typer.Option(None, help="Compare over the prompts in this file (one per line) and show aggregate stats."),
+    json_output: bool = typer.Option(False, "--json", help="Print results as JSON."),
+):
+    """Send the same query to several providers at once and compare their answers"""
+    if (query is None) == (prompts is None):
+        console.print("[red]Give either a query or --prompts FILE.[/red]")
+        raise typer.Exit(1)
+
+    if tools:
+        selected = [tool.strip() for tool in tools.split(",") if tool.strip()]
+    else:
+        selected = comparison.available_tools()
+    unknown = [tool for tool in selected if tool not in comparison.BUILTIN_TOOLS and tool not in plugin_manager.models]
+    if unknown:
+        console.print(f"[red]Unknown tools: {', '.join(unknown)}[/red]")
+        raise typer.Exit(1)
+    if not selected:
+        console.print("[red]No AI tools configured; pass --tools.[/red]")
+        raise typer.Exit(1)
+
+    # Backends print a "Using ..." line per request; keep it out of the comparison
+    output = sys.stdout
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    if query is not None:
+        start = time.perf_counter()
+        if json_output:
+            with quiet:
+                results = comparison.run(query, selected)
+            wall_time = time.perf_counter() - start
+            print(json.dumps({"query": query, "wall_time": wall_time,
+                              "results": [result.as_dict() for result in results]}, indent=2), file=output)
+            return
+        console.file = output
+        with quiet:
+            _compare_live(query, selected)
+        if not console.is_terminal:
+            console.line()  # Live leaves its last render unterminated when not on a terminal
+        console.print(f"[dim]Wall time {time.perf_counter() - start:.2f}s[/dim]")
+        return
+
+    try:
+        with open(prompts) as f:
+            prompt_list = [line.strip() for line in f if line.strip()]
+    except OSError as e:
+        console.print(f"[red]Could not read prompts: {e}[/red]")
+        raise typer.Exit(1)
+
+    runs = []
+    start = time.perf_counter()
+    with quiet:
+        for index, prompt in enumerate(prompt_list, 1):
+            runs.append(comparison.run(prompt, selected))
+            print(f"[{index}/{len(prompt_list)}] {prompt}", file=sys.stderr)
+    wall_time = time.perf_counter() - start
+
+    summaries = comparison.summarize(runs)
+    if json_output:
+        print(json.dumps({
+            "prompts": len(prompt_list),
+            "wall_time": wall_time,
+            "summary": summaries,
+            "results": [{"query": prompt, "results": [r.as_dict() for r in results]}
+                        for prompt, results in zip(prompt_list, runs)],
+        }, indent=2), file=output)
+    else:
+        console.print(_aggregate_table(summaries, len(prompt_list), wall_time))
@@ -1,10 +1,15 @@
+import json
 import typer
-from rich.console import Console
+from claii.completion import complete_models
 from claii.config import save_config, load_config
+from claii.output import LazyConsole
 
-console = Console()
+console = LazyConsole()
 app = typer.Typer()
 
+VALID_PARAMS = ["key", "model", "tool", "url", "headers"]
+VALID_PROVIDERS = ["openai", "deepseek", "perplexity", "mistral", "gemini", "ollama", "openai-compatible"]
+
 @app.command()
 def set_key(api_key: str):
     """DEPRECATED: Set OpenAI API Key"""
@@ -14,7 +19,7 @@ def set_key(api_key: str):
     console.print("[green]API key saved successfully![/green]")
 
 @app.command()
-def set_model(model: str = "mistral"):
+def set_model(model: str = typer.Argument("mistral", autocompletion=complete_models)):
     """DEPRECATED: Set default Ollama model"""
     config = load_config()
     config["ollama_model"] = model
@@ -22,7 +27,11 @@ def set_model(model: str = "mistral"):
     console.print(f"[green]Ollama model set to '{model}'[/green]")
 
 @app.command()
-def set(param: str, provider: str, value: str):
+def set(
+    param: str = typer.Argument(..., autocompletion=lambda: VALID_PARAMS),
+    provider: str = typer.Argument(..., autocompletion=lambda: VALID_PROVIDERS),
+    value: str = typer.Argument(...),
+):
     """Set various configuration options (API keys, models, tools)"""
     
     # Handle plugin settings
@@ -72,31 +81,48 @@ def set(param: str, provider: str, value: str):
         return
     
     # Handle regular settings
-    valid_params = ["key", "model", "tool"]
-    valid_providers = ["openai", "deepseek", "perplexity", "mistral", "gemini", "ollama"]
-
-    if param not in valid_params:
-        console.print(f"[red]Invalid parameter! Choose from {', '.join(valid_params)}[/red]")
+    if param not in VALID_PARAMS:
+        console.print(f"[red]Invalid parameter! Choose from {', '.join(VALID_PARAMS)}[/red]")
         raise typer.Exit()
 
-    if provider not in valid_providers:
-        console.print(f"[red]Invalid provider! Choose from {', '.join(valid_providers)}[/red]")
+    if provider not in VALID_PROVIDERS:
+        console.print(f"[red]Invalid provider! Choose from {', '.join(VALID_PROVIDERS)}[/red]")
         raise typer.Exit()
     
     if param == "key" and provider == "ollama":
         console.print("[red]Ollama API key is not required! Use `claii set model ollama <model>` instead[/red]")
         raise typer.Exit()
 
+    if param in ("url", "headers") and provider != "openai-compatible":
+        console.print(f"[red]Only the openai-compatible provider takes a {param}![/red]")
+        raise typer.Exit()
+
     config = load_config()
+    prefix = provider.replace("-", "_")
 
     if param == "key":
-        config[f"{provider}_api_key"] = value
+        config[f"{prefix}_api_key"] = value
         console.print(f"[green]{provider.capitalize()} API key set successfully![/green]")
 
     elif param == "model":
-        config[f"{provider}_model"] = value
+        config[f"{prefix}_model"] = value
         console.print(f"[green]{provider.capitalize()} model set to '{value}'[/green]")
 
+    elif param == "url":
+        config[f"{prefix}_base_url"] = value
+        console.print(f"[green]{provider.capitalize()} base URL set to '{value}'[/green]")
+
+    elif param == "headers":
+        try:
+            headers = json.loads(value)
+        except json.JSONDecodeError:
+            headers = None
+        if not isinstance(headers, dict):
+            console.print('[red]Headers must be a JSON object, e.g. \'{"X-Org": "my-org"}\'[/red]')
+            raise typer.Exit()
+        config[f"{prefix}_headers"] = headers
+        console.print(f"[green]{provider.capitalize()} headers set: {', '.join(headers) or 'none'}[/green]")
+
     elif param == "tool":
         config["default_tool"] = provider
         console.print(f"[green]Default AI tool set to '{provider}'[/green]")
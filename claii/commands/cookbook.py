@@ -0,0 +1,47 @@
+import typer
+from claii import cookbook as local_cookbook, history
+from claii.config import load_config
+from claii.output import LazyConsole, escape
+
+console = LazyConsole()
+app = typer.Typer(help="Instant answers for recurring queries.")
+
+
+@app.command("list")
+def list_entries():
+    """Show the commands the cookbook answers with"""
+    config = load_config()
+    index = local_cookbook.load(
+        refresh=config.get("cookbook_refresh", local_cookbook.DEFAULT_REFRESH),
+        min_count=config.get("cookbook_min_count", local_cookbook.DEFAULT_MIN_COUNT),
+    )
+    if not index["entries"]:
+        console.print("[yellow]The cookbook is empty. Commands run successfully with --run (or accepted "
+                      "with 'claii cookbook add') are added automatically.[/yellow]")
+        return
+    from rich.table import Table
+    table = Table(title="Cookbook")
+    table.add_column("Query")
+    table.add_column("Command", style="cyan")
+    table.add_column("Source")
+    table.add_column("Confirmed", justify="right")
+    for entry in sorted(index["entries"], key=lambda e: (e["source"] != "curated", -e["count"])):
+        table.add_row(entry["query"], entry["command"], entry["source"], str(entry["count"] or "-"))
+    console.print(table)
+
+
+@app.command()
+def compact(rebuild: bool = typer.Option(False, help="Re-read the whole history instead of only new entries.")):
+    """Fold new history entries into the cookbook now"""
+    config = load_config()
+    index = local_cookbook.compact(rebuild, config.get("cookbook_min_count", local_cookbook.DEFAULT_MIN_COUNT))
+    console.print(f"[green]Cookbook compacted: {len(index['entries'])} entries.[/green]")
+
+
+@app.command()
+def add(query: str, command: str):
+    """Accept a command as the answer to a query"""
+    history.log_accept(query, command)
+    config = load_config()
+    local_cookbook.compact(min_count=config.get("cookbook_min_count", local_cookbook.DEFAULT_MIN_COUNT))
+    console.print(f"[green]Accepted for '{escape(query)}'.[/green]")
@@ -1,21 +1,422 @@
 import typer
-from rich.console import Console
-from claii.ai import gen_reply
-import subprocess
+from claii.ai import gen_candidates, gen_reply
+from claii.config import load_config
+from claii import candidates as ranking, cookbook, history, output, plan as planning, stats
+from claii.completion import complete_tools
+from claii.errors import ErrorReply
+from claii.execution import run_command
+from claii.mapreduce import CHARS_PER_TOKEN, DEFAULT_CHUNK_TOKENS, DEFAULT_CONCURRENCY, MapReduce
+from claii.output import LazyConsole, escape
+import contextlib
+import os
+import stat
+import sys
+import threading
+import time
+from typing import Optional
 
-console = Console()
+# Status messages; with --output json/ndjson/plain they go to stderr and results are printed separately
+console = LazyConsole(status=True)
+err_console = LazyConsole(stderr=True)
 app = typer.Typer()
 
+
+def _ask_in_background(text: str, tool: str, use_tools: Optional[bool]):
+    """Ask the model on a daemon thread (without logging to history); returns a dict filled with the reply."""
+    result = {}
+
+    def ask():
+        with history.paused():
+            result["reply"] = gen_reply(text, tool, use_tools=use_tools)
+
+    thread = threading.Thread(target=ask, daemon=True, name="claii-cookbook-verify")
+    thread.start()
+    result["thread"] = thread
+    return result
+
+
+def _cookbook_match(text: str, config):
+    try:
+        return cookbook.lookup(
+            text,
+            threshold=config.get("cookbook_threshold", cookbook.DEFAULT_THRESHOLD),
+            refresh=config.get("cookbook_refresh", cookbook.DEFAULT_REFRESH),
+            min_count=config.get("cookbook_min_count", cookbook.DEFAULT_MIN_COUNT),
+            fuzzy=config.get("cookbook_fuzzy", False),
+        )
+    except Exception as e:
+        console.print(f"[red]Cookbook lookup failed: {e}[/red]")
+        return None
+
+
+def _map_reduce_limits(tool: str, config):
+    """Chunk size (in characters) and concurrency for map-reduce on ``tool``."""
+    from claii.plugins.manager import plugin_manager
+    chunk_tokens = config.get("chunk_tokens", DEFAULT_CHUNK_TOKENS)
+    concurrency = config.get("map_concurrency")
+    if tool in plugin_manager.models:
+        capabilities = plugin_manager.get_model_capabilities(tool)
+        if capabilities["context_window"]:
+            # Leave room for the instructions and the reply
+            chunk_tokens = min(chunk_tokens, capabilities["context_window"] // 2)
+        concurrency = concurrency or capabilities["max_concurrency"]
+    elif tool in ("ollama", "auto") and not concurrency:
+        from claii.ollama_pool import pool_concurrency
+        concurrency = max(DEFAULT_CONCURRENCY, pool_concurrency(config) or 0)
+    return chunk_tokens * CHARS_PER_TOKEN, concurrency or DEFAULT_CONCURRENCY
+
+
+def _answer_stdin(text: str, tool: str, config, max_chunks: Optional[int]):
+    """Answer ``text`` about the piped input with map-reduce; None if the input is empty."""
+    chunk_chars, concurrency = _map_reduce_limits(tool, config)
+    stream = sys.stdin.buffer
+    try:
+        size = os.fstat(stream.fileno()).st_size if stat.S_ISREG(os.fstat(stream.fileno()).st_mode) else None
+    except (OSError, ValueError):
+        size = None
+
+    if output.is_machine() and not sys.stderr.isatty():
+        progress, show_progress = contextlib.nullcontext(), None
+    else:
+        from rich.progress import BarColumn, DownloadColumn, Progress, TextColumn, TimeElapsedColumn
+        progress = Progress(
+            TextColumn("[cyan]Reading input"),
+            BarColumn(),
+            DownloadColumn(),
+            TextColumn("{task.fields[status]}"),
+            TimeElapsedColumn(),
+            console=err_console,
+            transient=True,
+        )
+        task = progress.add_task("input", total=size, status="")
+
+        def show_progress(p):
+            status = f"{p.chunks_done}/{p.chunks_read} parts answered, {p.in_flight} in flight"
+            if p.reduces_done:
+                status += f", {p.reduces_done} merges"
+            progress.update(task, completed=p.bytes_read, status=status)
+
+    mr = MapReduce(
+        text,
+        lambda prompt: gen_reply(prompt, tool, use_tools=False),
+        chunk_chars=chunk_chars,
+        concurrency=concurrency,
+        max_chunks=max_chunks,
+        on_progress=show_progress,
+    )
+    with progress:
+        reply = mr.run(stream)
+    if reply is not None and mr.progress.chunks_read > 1:
+        note = " (stopped early)" if mr.truncated else ""
+        err_console.print(f"[dim]Answered from {mr.progress.chunks_read} parts of the input{note}.[/dim]")
+    return reply, mr
+
+
+STEP_COLORS = ["cyan", "magenta", "green", "yellow", "blue", "bright_red"]
+
+
+def _plan_table(steps):
+    from rich.table import Table
+    table = Table(title="Plan")
+    table.add_column("Step")
+    table.add_column("Command", overflow="fold")
+    table.add_column("Needs")
+    for step in steps:
+        table.add_row(step.id, escape(step.command), ", ".join(step.needs) or "-")
+    return table
+
+
+def _results_table(results):
+    from rich.table import Table
+    table = Table(title="Results")
+    table.add_column("Step")
+    table.add_column("Status")
+    table.add_column("Start", justify="right")
+    table.add_column("Time", justify="right")
+    styles = {"ok": "green", "failed": "red", "skipped": "yellow"}
+    for result in results:
+        timing = (f"{result.start:.2f}s", f"{result.duration:.2f}s") if result.duration is not None else ("-", "-")
+        table.add_row(result.step.id, f"[{styles[result.status]}]{result.status}[/]", *timing)
+    return table
+
+
+def _step_dict(step, result=None):
+    data = {"id": step.id, "command": step.command, "needs": step.needs, "description": step.description}
+    if result is not None:
+        data.update(status=result.status, returncode=result.returncode, start=result.start,
+                    duration=result.duration, reason=result.reason or None)
+    return data
+
+
+def _run_plan(text: str, tool: str, config, yes: bool):
+    machine = output.is_machine()
+    try:
+        if machine:
+            steps = planning.generate_plan(text, tool)
+        else:
+            with console.status("Planning..."):
+                steps = planning.generate_plan(text, tool)
+    except planning.PlanError as e:
+        if machine and output.FORMAT != "plain":
+            output.emit({"event": "error", "error": "invalid_plan", "message": output.strip_markup(str(e))}
+                        if output.FORMAT == "ndjson" else {"query": text, "error": "invalid_plan", "message": output.strip_markup(str(e))})
+        console.print(f"[red]Could not make a plan: {e}[/red]")
+        raise typer.Exit(1)
+
+    if output.FORMAT == "ndjson":
+        output.emit({"event": "plan", "steps": [_step_dict(step) for step in steps]})
+    elif output.FORMAT == "plain":
+        for step in steps:
+            print(f"{step.id}\t{','.join(step.needs)}\t{step.command}")
+    elif not machine:
+        console.print(_plan_table(steps))
+    if machine and not yes:  # no one to confirm: just print the plan
+        if output.FORMAT == "json":
+            output.emit({"query": text, "steps": [_step_dict(step) for step in steps]})
+        return
+    if not machine and not yes and not typer.confirm("Run these steps?"):
+        return
+
+    colors = {step.id: STEP_COLORS[i % len(STEP_COLORS)] for i, step in enumerate(steps)}
+    width = max((len(step.id) for step in steps), default=0)
+
+    def show_output(step, line: str):
+        if output.FORMAT == "ndjson":
+            output.emit({"event": "output", "step": step.id, "line": line})
+        elif machine:
+            print(f"{step.id.ljust(width)} | {line}", file=sys.stderr)
+        else:
+            console.print(f"[{colors[step.id]}]{escape(step.id.ljust(width))} |[/] {escape(line)}", highlight=False)
+
+    def show_status(result):
+        if output.FORMAT == "ndjson":
+            if result.status != "running":
+                output.emit({"event": "step", **_step_dict(result.step, result)})
+        elif result.status == "failed":
+            console.print(f"[red]{escape(result.step.id)} failed (exit {result.returncode})[/red]")
+        elif result.status == "skipped":
+            console.print(f"[yellow]{escape(result.step.id)} skipped: {result.reason}[/yellow]")
+
+    try:
+        results = planning.execute(steps, config.get("plan_concurrency", planning.DEFAULT_CONCURRENCY),
+                                   on_output=show_output, on_status=show_status)
+    except KeyboardInterrupt:
+        console.print("[red]Cancelled.[/red]")
+        raise typer.Exit(130)
+
+    ok = all(result.status == "ok" for result in results)
+    if output.FORMAT == "json":
+        output.emit({"query": text, "ok": ok, "steps": [_step_dict(r.step, r) for r in results]})
+    elif output.FORMAT == "ndjson":
+        output.emit({"event": "done", "ok": ok})
+    elif output.FORMAT == "plain":
+        print(planning.summary(results))
+    else:
+        console.print(_results_table(results))
+    history.log_history(f"{text} [plan]", planning.summary(results))
+    if not ok:
+        raise typer.Exit(1)
+
+
+def _candidates_list(ranked) -> str:
+    lines = ["[dim]Alternatives:[/dim]"]
+    for number, candidate in enumerate(ranked[1:], 2):
+        issues = f"  [dim]({escape('; '.join(candidate.issues))})[/dim]" if candidate.issues else ""
+        lines.append(f"  {number}. {escape(candidate.command)}{issues}")
+    return "\n".join(lines)
+
+
+def _choose_candidate(count: int) -> Optional[int]:
+    """Ask which candidate to run; returns its index, or None to run nothing."""
+    while True:
+        choice = typer.prompt(f"Run which candidate? (1-{count}, 0 to cancel)", default=1, type=int)
+        if 0 <= choice <= count:
+            return choice - 1 if choice else None
+        console.print(f"[red]Choose a number from 0 to {count}.[/red]")
+
+
+def _result(text: str, reply, record, start: float) -> dict:
+    """The fields --output json/ndjson report for a reply."""
+    result = {
+        "query": text,
+        "reply": None,
+        "provider": None,
+        "model": None,
+        "latency": time.perf_counter() - start,
+        "ttft": None,
+        "tokens_in": None,
+        "tokens_out": None,
+        "cache": None,
+        "error": None,
+        "message": None,
+    }
+    if record is not None and record.start >= start:
+        result.update(provider=record.provider, model=record.model, ttft=record.ttft, tokens_in=record.tokens_in,
+                      tokens_out=record.tokens_out, cache=record.cache, error=record.error)
+    if reply is None:
+        result["error"] = result["error"] or "no_reply"
+    elif isinstance(reply, ErrorReply):
+        result.update(error=reply.code, message=output.strip_markup(reply))
+    else:
+        result["reply"] = reply
+    return result
+
+
 @app.command()
-def chat(text: str, tool: str = "auto", run: bool = False):
+def chat(
+    text: str,
+    tool: str = typer.Option("auto", autocompletion=complete_tools, help="AI tool or plugin model to use."),
+    run: bool = False,
+    use_tools: Optional[bool] = typer.Option(None, "--use-tools/--no-tools", help="Let the model call plugin tools (default: `tool_calling` config)."),
+    stream: bool = typer.Option(False, "--stream", help="Print the reply as it is generated."),
+    use_cookbook: Optional[bool] = typer.Option(None, "--cookbook/--no-cookbook", help="Answer recurring queries instantly from the local cookbook (default: `cookbook` config)."),
+    verify: bool = typer.Option(False, "--verify", help="On a cookbook answer, also ask the model and show its answer if it differs."),
+    use_stdin: bool = typer.Option(False, "--stdin/--no-stdin", help="Answer the question about input piped to stdin."),
+    max_chunks: Optional[int] = typer.Option(None, "--max-chunks", help="Read at most this many chunks of piped input."),
+    plan: bool = typer.Option(False, "--plan", help="Ask for a plan of steps and run independent steps in parallel."),
+    yes: bool = typer.Option(False, "--yes", "-y", help="Run the plan without asking for confirmation."),
+    show_time: bool = typer.Option(False, "--time", help="With --run, show the command's wall time, CPU time, peak memory and exit status."),
+    n_candidates: Optional[int] = typer.Option(None, "--candidates", "-n", min=1, help="Generate this many candidate commands and pick the best locally (default: `candidates` config, 1)."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: list(output.FORMATS), help=output.OUTPUT_HELP),
+):
     """Send a message to AI"""
-    reply = gen_reply(text, tool)
-    if reply:
-        console.print(f"[cyan]AI:[/cyan] {reply}")
-    
-    if run:
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    machine = output.is_machine()
+    config = load_config()
+    if plan:
+        _run_plan(text, tool, config, yes)
+        return
+    if use_cookbook is None:
+        # Cookbook answers aren't tied to a model, so an explicit --tool or tool calling asks the model
+        tools_on = use_tools if use_tools is not None else config.get("tool_calling", False)
+        use_cookbook = config.get("cookbook", True) and tool == "auto" and not tools_on
+    if use_stdin and sys.stdin.isatty():
+        console.print("[red]--stdin reads piped input, but stdin is a terminal.[/red]")
+        raise typer.Exit(1)
+    if n_candidates is None:
+        n_candidates = config.get("candidates", 1)
+
+    start = time.perf_counter()
+    stdin_reply = None
+    if use_stdin:
         try:
-            console.print("[green]Executing command...[/green]")
-            subprocess.run(reply, shell=True, check=True)
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]Error running command:[/red] {e}")
+            stdin_reply, mr = _answer_stdin(text, tool, config, max_chunks)
+        except KeyboardInterrupt:
+            console.print("[red]Cancelled.[/red]")
+            raise typer.Exit(130)
+
+    match = _cookbook_match(text, config) if use_cookbook and not use_stdin else None
+    streamed = []
+    ranked = []
+    if stdin_reply is not None:
+        verification = None
+        reply = stdin_reply
+        result = _result(text, reply, stats.last_record(), start)
+        result.update(parts=mr.progress.chunks_read, truncated=mr.truncated)
+        # Tagged so the cookbook doesn't learn an answer that depended on the input
+        history.log_history(f"{text} [stdin]", reply)
+    elif match:
+        verification = _ask_in_background(text, tool, use_tools) if verify else None
+        with stats.track("cookbook", match.source, save=config.get("stats_enabled", True)) as record:
+            record.cache = "hit"
+        reply = match.command
+        result = _result(text, reply, record, start)
+        result.update(latency=match.elapsed, cookbook={"query": match.query, "exact": match.exact, "score": match.score})
+    elif n_candidates > 1:
+        verification = None
+        replies = gen_candidates(text, tool, n_candidates, use_tools=use_tools)
+        if isinstance(replies, list):
+            ranked = ranking.rank(replies)
+            reply = ranked[0].command or None if ranked else None
+        else:
+            reply = replies
+        result = _result(text, reply, stats.last_record(), start)
+        result["candidates"] = [candidate.as_dict() for candidate in ranked]
+    else:
+        verification = None
+
+        def show_token(token: str):
+            if output.FORMAT == "ndjson":
+                output.emit({"event": "token", "text": token})
+            elif output.FORMAT == "plain":
+                sys.stdout.write(token)
+                sys.stdout.flush()
+            elif not machine:
+                if not streamed:
+                    console.print("[cyan]AI:[/cyan] ", end="")
+                console.out(token, end="", highlight=False)
+            streamed.append(token)
+
+        reply = gen_reply(text, tool, use_tools=use_tools, on_token=show_token if stream else None)
+        result = _result(text, reply, stats.last_record(), start)
+
+    if not machine:
+        if streamed:
+            console.print()
+        elif match and match.exact:
+            console.print(f"[cyan]AI:[/cyan] {reply}  [dim](from cookbook, {match.elapsed * 1000:.2f} ms)[/dim]")
+        elif match:
+            console.print(f"[cyan]AI:[/cyan] {reply}  [dim](from cookbook, for the similar query \"{escape(match.query)}\")[/dim]")
+        elif reply:
+            console.print(f"[cyan]AI:[/cyan] {reply}")
+        if len(ranked) > 1:
+            console.print(_candidates_list(ranked), highlight=False)
+    elif output.FORMAT == "plain":
+        if result["error"]:
+            print(result["message"] or result["error"], file=sys.stderr)
+        elif streamed:
+            print()
+        else:
+            print(reply)
+    elif output.FORMAT == "ndjson":
+        output.emit({"event": "reply", **result})
+
+    if ranked and not result["error"]:
+        if run and not machine and len(ranked) > 1 and sys.stdin.isatty():
+            choice = _choose_candidate(len(ranked))
+            if choice is None:
+                run = False
+            else:
+                reply = result["reply"] = ranked[choice].command
+        history.log_history(text, reply)
+
+    if run and match and not match.exact and not result["error"]:
+        # Word overlap can't tell "larger" from "smaller", so a fuzzy match only runs once confirmed
+        if machine or not sys.stdin.isatty():
+            console.print("[yellow]Not running a cookbook answer for a similar query without confirmation.[/yellow]")
+            run = False
+        else:
+            run = typer.confirm(f"This is the cookbook answer for \"{match.query}\". Run it?", default=False)
+
+    if run and not result["error"]:
+        console.print("[green]Executing command...[/green]")
+        # In the machine formats stdout carries only the result
+        telemetry = run_command(reply, stdout=sys.stderr if machine else None)
+        if telemetry.returncode:
+            console.print(f"[red]Error running command:[/red] Command '{reply}' returned non-zero exit status {telemetry.returncode}.")
+        if show_time:
+            console.print(f"[dim]{escape(telemetry.describe())}[/dim]")
+        history.log_run(text, telemetry.as_dict())
+        result["run"] = telemetry.as_dict()
+        if output.FORMAT == "ndjson":
+            output.emit({"event": "run", **result["run"]})
+
+    if verification:
+        verification["thread"].join()
+        model_reply = verification.get("reply")
+        result["model_reply"] = model_reply
+        if output.FORMAT == "ndjson":
+            output.emit({"event": "verification", "model_reply": model_reply, "agrees": model_reply is not None and model_reply.strip() == reply})
+        elif model_reply and model_reply.strip() != reply:
+            console.print(f"[yellow]The model suggests a different command:[/yellow] {model_reply}")
+        elif model_reply:
+            console.print("[dim]The model agrees with the cookbook.[/dim]")
+
+    if output.FORMAT == "json":
+        output.emit(result)
+    if machine and (result["error"] or result.get("run", {}).get("returncode")):
+        raise typer.Exit(1)
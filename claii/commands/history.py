@@ -1,18 +1,120 @@
-import os
-import subprocess
-from rich.console import Console
+import time
 import typer
+from claii import history as conversation_history, output
+from claii.execution import RunTelemetry, format_bytes
+from claii.output import LazyConsole, escape
 
-console = Console()
+console = LazyConsole()
 app = typer.Typer()
 
-HISTORY_PATH = os.path.expanduser("~/.ai-cli-history.log")
+DEFAULT_SLOW_SECONDS = 5.0
+
+
+def _fmt_seconds(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def _telemetry(run) -> RunTelemetry:
+    return RunTelemetry(**{key: value for key, value in run.items() if key != "query"})
+
+
+def _runs_table(runs, title: str):
+    from rich.table import Table
+    table = Table(title=title)
+    table.add_column("When")
+    table.add_column("Query", overflow="fold")
+    table.add_column("Command", overflow="fold")
+    table.add_column("Exit", justify="right")
+    table.add_column("Wall", justify="right")
+    table.add_column("User", justify="right")
+    table.add_column("Sys", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    for run in runs:
+        exit_style = "red" if run["returncode"] else "green"
+        table.add_row(
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(run.get("started", 0))),
+            escape(run.get("query", "")),
+            escape(run["command"]),
+            f"[{exit_style}]{run['returncode']}[/]",
+            _fmt_seconds(run.get("wall_time")),
+            _fmt_seconds(run.get("user_time")),
+            _fmt_seconds(run.get("system_time")),
+            "-" if run.get("max_rss") is None else format_bytes(run["max_rss"]),
+        )
+    return table
+
 
 @app.command()
-def history():
-    """Show previous AI conversations"""
-    if not os.path.exists(HISTORY_PATH):
+def history(
+    slow: bool = typer.Option(False, "--slow", help="Only show executed commands that took at least --min-seconds, slowest first."),
+    failed: bool = typer.Option(False, "--failed", help="Only show executed commands that exited with an error."),
+    min_seconds: float = typer.Option(DEFAULT_SLOW_SECONDS, help="Wall time that counts as slow for --slow."),
+    limit: int = typer.Option(20, help="Show at most this many entries."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: list(output.FORMATS), help=output.OUTPUT_HELP),
+):
+    """Show previous AI conversations, or the generated commands that were slow or failed"""
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    entries = conversation_history.load_log()
+    if not entries and not output.is_machine():
         console.print("[yellow]No history found.[/yellow]")
         return
-    with open(HISTORY_PATH, "r") as f:
-        console.print(f.read())
+
+    if slow or failed:
+        runs = [dict(run, query=entry["query"]) for entry in entries for run in entry["runs"]]
+        if failed:
+            runs = [run for run in runs if run["returncode"]]
+        if slow:
+            runs = sorted((run for run in runs if run["wall_time"] >= min_seconds), key=lambda run: -run["wall_time"])
+        else:
+            runs.reverse()  # most recent first
+        runs = runs[:limit]
+        if output.FORMAT == "json":
+            output.emit({"runs": runs})
+            return
+        if output.is_machine():
+            for run in runs:
+                if output.FORMAT == "ndjson":
+                    output.emit(run)
+                else:
+                    print(f"{run['returncode']}\t{run['wall_time']:.2f}\t{run['command']}")
+            return
+        if not runs:
+            console.print("[yellow]No matching commands.[/yellow]")
+            return
+        kinds = " and ".join(kind for kind, on in (("slow", slow), ("failed", failed)) if on)
+        console.print(_runs_table(runs, f"{kinds.capitalize()} commands"))
+        return
+
+    entries = entries[-limit:]
+    if output.FORMAT == "json":
+        output.emit({"entries": entries})
+        return
+    if output.FORMAT == "ndjson":
+        for entry in entries:
+            output.emit(entry)
+        return
+
+    plain = output.FORMAT == "plain"
+    lines = []
+    for entry in entries:
+        if plain:
+            lines += [f"Q: {entry['query']}", f"A: {entry['reply']}"]
+            lines += [f"ran: {_telemetry(run).describe()}" for run in entry["runs"]]
+            lines.append("---")
+            continue
+        lines.append(f"[bold]Q:[/bold] {escape(entry['query'])}")
+        lines.append(f"[cyan]A:[/cyan] {escape(entry['reply'])}")
+        for run in entry["runs"]:
+            telemetry = _telemetry(run)
+            style = "red" if telemetry.returncode else "dim"
+            lines.append(f"[{style}]ran: {escape(telemetry.describe())}[/{style}]")
+        lines.append("---")
+    if plain:
+        if lines:
+            print("\n".join(lines))
+    else:
+        console.print("\n".join(lines), highlight=False)
@@ -0,0 +1,110 @@
+import os
+import sys
+from typing import Optional
+
+import typer
+
+from claii.ai import gen_reply
+from claii.completion import complete_tools
+from claii.config import load_config
+from claii.output import LazyConsole, escape
+from claii.shell import DEFAULT_SHELL, ShellError, ShellSession
+
+console = LazyConsole()
+
+HELP = (
+    "Type a request to get a command, then confirm to run it in this session's shell.\n"
+    "!<command> runs a command directly, 'exit' or Ctrl-D quits. "
+    "cd and exported variables carry over between commands."
+)
+
+
+def _run(session: ShellSession, command: str, timeout: Optional[float]) -> None:
+    def show(chunk: str):
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+
+    try:
+        result = session.run(command, timeout=timeout, on_output=show)
+    except ShellError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    if result.output and not result.output.endswith("\n"):
+        print()
+    if result.timed_out:
+        console.print(f"[red]Timed out after {timeout:g}s; the shell was restarted.[/red]")
+    elif result.restarted:
+        console.print("[yellow]The shell exited and was restarted.[/yellow]")
+    elif result.returncode:
+        console.print(f"[red]Exit status {result.returncode}[/red]")
+
+
+def repl(
+    tool: str = typer.Option("auto", autocompletion=complete_tools, help="AI tool or plugin model to use."),
+    use_tools: Optional[bool] = typer.Option(None, "--use-tools/--no-tools", help="Let the model call plugin tools (default: `tool_calling` config)."),
+    run: bool = typer.Option(False, "--run", help="Run every suggested command without asking."),
+    timeout: Optional[float] = typer.Option(None, help="Kill commands that run longer than this many seconds (default: `run_timeout` config)."),
+    reload: Optional[bool] = typer.Option(None, "--reload/--no-reload", help="Reload plugins when their files or the plugin config change (default: `plugin_hot_reload` config, on)."),
+):
+    """Ask for commands interactively and run them in one long-lived shell"""
+    config = load_config()
+    timeout = timeout if timeout is not None else config.get("run_timeout")
+    reload = reload if reload is not None else config.get("plugin_hot_reload", True)
+    try:
+        session = ShellSession(config.get("run_shell", DEFAULT_SHELL))
+        session.start()
+    except (ShellError, OSError) as e:
+        console.print(f"[red]Could not start a shell: {e}[/red]")
+        raise typer.Exit(1)
+
+    # Plugin changes are reported before the next prompt rather than over the current output
+    plugin_changes = []
+    watcher = None
+    if reload:
+        from claii.plugins.watcher import PluginWatcher
+        watcher = PluginWatcher(on_change=plugin_changes.append).start()
+
+    console.print(f"[dim]{HELP}[/dim]")
+    with session:
+        cwd = os.getcwd()
+        while True:
+            while plugin_changes:
+                for name, change in plugin_changes.pop(0).items():
+                    console.print(f"[dim]Plugin {escape(name)} {change}[/dim]")
+            try:
+                line = console.input(f"[bold cyan]claii[/bold cyan] [dim]{escape(os.path.basename(cwd) or cwd)}[/dim]> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                console.print()
+                break
+            if line in ("exit", "quit"):
+                break
+            if not line:
+                continue
+
+            if line.startswith("!"):
+                command = line[1:].strip()
+            else:
+                reply = gen_reply(line, tool, use_tools=use_tools)
+                if not reply:
+                    continue
+                console.print(f"[cyan]AI:[/cyan] {reply}")
+                if getattr(reply, "code", None):  # an error reply, not a command
+                    continue
+                try:
+                    if not run and not typer.confirm("Run it?", default=False):
+                        continue
+                except typer.Abort:
+                    console.print()
+                    break
+                command = reply.strip()
+
+            try:
+                _run(session, command, timeout)
+            except KeyboardInterrupt:
+                session.close()
+                console.print("\n[red]Interrupted; the shell was restarted.[/red]")
+            pwd = session.run("pwd")
+            if pwd.returncode == 0 and pwd.output.strip():
+                cwd = pwd.output.strip()
+    if watcher is not None:
+        watcher.stop()
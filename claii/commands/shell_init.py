@@ -0,0 +1,200 @@
+"""Shell integration: turn the description on the command line into a command.
+
+``eval "$(claii shell-init zsh)"`` binds a key that sends the current line to
+``claii chat`` in the background. The shell stays usable while the command is
+generated: zsh streams the reply under the prompt and puts the command on the
+line when it is ready; bash (whose line editor can't be updated from the
+background) shows progress above the prompt, and the key inserts the command
+once it is ready. Pressing the key while a command is being generated cancels it.
+"""
+
+import re
+import shlex
+import shutil
+
+import typer
+
+from claii.output import LazyConsole
+
+console = LazyConsole(stderr=True)
+
+SHELLS = ("bash", "zsh")
+
+# @CLAII@: the claii executable, @KEY@: the key in the shell's notation, @KEY_NAME@: as given to --key
+ZSH_SCRIPT = r"""# CLAII shell integration for zsh. Add to ~/.zshrc:  eval "$(claii shell-init zsh)"
+# Type what you want, press @KEY_NAME@, keep editing; the command replaces the description when it is ready.
+# Press @KEY_NAME@ again to cancel.
+zmodload zsh/system 2>/dev/null || return 0
+
+typeset -g _claii_fd= _claii_pid= _claii_query= _claii_output= _claii_errors=
+
+_claii_stop() {
+  if [[ -n $_claii_fd ]]; then
+    zle -F $_claii_fd 2>/dev/null
+    exec {_claii_fd}<&-
+  fi
+  [[ -n $_claii_pid ]] && kill $_claii_pid 2>/dev/null
+  [[ -n $_claii_errors ]] && rm -f -- $_claii_errors
+  _claii_fd= _claii_pid= _claii_errors=
+}
+
+_claii_widget() {
+  if [[ -n $_claii_fd ]]; then
+    _claii_stop
+    zle -M "claii: cancelled"
+    return
+  fi
+  [[ -z ${BUFFER//[[:space:]]/} ]] && return
+  _claii_query=$BUFFER _claii_output= _claii_pid=
+  _claii_errors=$(mktemp "${TMPDIR:-/tmp}/claii.XXXXXX") || return
+  # The first line is the process id, so the request can be cancelled
+  exec {_claii_fd}< <(sh -c 'echo $$; exec "$@"' claii @CLAII@ chat "$_claii_query" \
+    --output plain --stream --no-stdin </dev/null 2>$_claii_errors)
+  zle -F -w $_claii_fd _claii_ready
+  zle -M "claii: generating..."
+}
+
+_claii_ready() {
+  local chunk
+  if sysread -i $1 chunk 2>/dev/null; then
+    _claii_output+=$chunk
+    if [[ -z $_claii_pid ]]; then
+      [[ $_claii_output != *$'\n'* ]] && return
+      _claii_pid=${_claii_output%%$'\n'*}
+      _claii_output=${_claii_output#*$'\n'}
+    fi
+    zle -M "claii: ${_claii_output//$'\n'/ }"
+    return
+  fi
+
+  local reply=${_claii_output%$'\n'} error=
+  [[ -z $reply && -s $_claii_errors ]] && error=$(tail -n 1 -- $_claii_errors)
+  _claii_pid=  # already exited
+  _claii_stop
+  if [[ -z $reply ]]; then
+    zle -M "claii: ${error:-no reply}"
+  elif [[ $BUFFER == "$_claii_query" ]]; then
+    BUFFER=$reply
+    CURSOR=$#BUFFER
+    zle -M ""
+  else
+    LBUFFER+=$reply
+    zle -M ""
+  fi
+}
+
+# A request still running when the line is accepted would land on the next one
+_claii_line_finish() {
+  [[ -n $_claii_fd ]] && _claii_stop
+  return 0
+}
+
+zle -N _claii_widget
+zle -N _claii_ready
+autoload -Uz add-zle-hook-widget 2>/dev/null && add-zle-hook-widget line-finish _claii_line_finish
+bindkey '@KEY@' _claii_widget
+"""
+
+BASH_SCRIPT = r"""# CLAII shell integration for bash. Add to ~/.bashrc:  eval "$(claii shell-init bash)"
+# Type what you want and press @KEY_NAME@; keep editing while progress is shown above the prompt.
+# When it says the command is ready, press @KEY_NAME@ again to put it on the line.
+# Pressing @KEY_NAME@ while the command is still being generated cancels it.
+_claii_pid= _claii_query= _claii_out= _claii_err=
+
+_claii_status() {
+  # The line above the prompt: readline doesn't notice, so editing isn't disturbed
+  printf '\e7\e[1A\r\e[2K%s\e8' "${1:0:$((${COLUMNS:-80} - 1))}" >/dev/tty 2>/dev/null
+}
+
+_claii_watch() {
+  local child line
+  @CLAII@ chat "$_claii_query" --output plain --stream --no-stdin </dev/null >"$_claii_out" 2>"$_claii_err" &
+  child=$!
+  trap 'kill "$child" 2>/dev/null; exit 0' TERM
+  while kill -0 "$child" 2>/dev/null; do
+    line=$(tr '\n' ' ' <"$_claii_out")
+    _claii_status "claii: ${line:-generating...}"
+    sleep 0.2
+  done
+  : >"$_claii_out.done"
+  if [[ -s $_claii_out ]]; then
+    _claii_status "claii: ready (@KEY_NAME@ to insert): $(tr '\n' ' ' <"$_claii_out")"
+  else
+    _claii_status "claii: $(tail -n 1 "$_claii_err" 2>/dev/null)"
+  fi
+}
+
+_claii_cleanup() {
+  rm -f -- "$_claii_out" "$_claii_out.done" "$_claii_err"
+  _claii_pid= _claii_out= _claii_err=
+}
+
+_claii_widget() {
+  if [[ -n $_claii_pid ]]; then
+    # Not "kill -0": the watcher may linger as a zombie once it is done
+    if [[ ! -e $_claii_out.done ]]; then
+      kill "$_claii_pid" 2>/dev/null
+      _claii_cleanup
+      _claii_status "claii: cancelled"
+      return
+    fi
+    local reply
+    reply=$(<"$_claii_out")
+    _claii_cleanup
+    [[ -z $reply ]] && return
+    if [[ $READLINE_LINE == "$_claii_query" ]]; then
+      READLINE_LINE=$reply
+      READLINE_POINT=${#reply}
+    else
+      READLINE_LINE=${READLINE_LINE:0:READLINE_POINT}$reply${READLINE_LINE:READLINE_POINT}
+      READLINE_POINT=$((READLINE_POINT + ${#reply}))
+    fi
+    _claii_status ""
+    return
+  fi
+  [[ -z ${READLINE_LINE//[[:space:]]/} ]] && return
+  _claii_query=$READLINE_LINE
+  _claii_out=$(mktemp "${TMPDIR:-/tmp}/claii.XXXXXX") || return
+  _claii_err=$(mktemp "${TMPDIR:-/tmp}/claii.XXXXXX") || return
+  # Started from a command substitution, so it isn't a job of this shell and nothing is printed
+  _claii_pid=$(_claii_watch >/dev/null 2>&1 & echo $!)
+}
+
+bind -x '"@KEY@": _claii_widget'
+"""
+
+_KEY = re.compile(r"^(ctrl|alt)-([a-z])$")
+
+
+def _key(spec: str, shell: str) -> str:
+    """``ctrl-g``/``alt-g`` in bash's (``\\C-g``) or zsh's (``^G``) key notation."""
+    match = _KEY.match(spec.lower())
+    if not match:
+        raise ValueError(f"Unsupported key '{spec}'. Use ctrl-<letter> or alt-<letter>")
+    modifier, letter = match.groups()
+    if shell == "bash":
+        return f"\\C-{letter}" if modifier == "ctrl" else f"\\e{letter}"
+    return f"^{letter.upper()}" if modifier == "ctrl" else f"^[{letter}"
+
+
+def script(shell: str, key: str = "ctrl-g", executable: str = None) -> str:
+    """The integration script for ``shell``."""
+    if shell not in SHELLS:
+        raise ValueError(f"Unsupported shell '{shell}'. Choose from {', '.join(SHELLS)}")
+    template = BASH_SCRIPT if shell == "bash" else ZSH_SCRIPT
+    executable = executable or shutil.which("claii") or "claii"
+    return (template.replace("@CLAII@", shlex.quote(executable))
+            .replace("@KEY_NAME@", key.lower())
+            .replace("@KEY@", _key(key, shell)))
+
+
+def shell_init(
+    shell: str = typer.Argument(..., autocompletion=lambda: list(SHELLS), help="bash or zsh."),
+    key: str = typer.Option("ctrl-g", help="Key that turns the line into a command: ctrl-<letter> or alt-<letter>."),
+):
+    """Print a bash or zsh key binding that generates commands without blocking the shell"""
+    try:
+        typer.echo(script(shell, key), nl=False)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
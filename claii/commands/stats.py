@@ -0,0 +1,75 @@
+import time
+import typer
+from claii import stats as request_stats
+from claii.output import LazyConsole
+
+console = LazyConsole()
+
+
+def _fmt_seconds(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def stats(
+    window: str = typer.Option("24h", help="Time window to report, e.g. 30m, 24h, 7d, 4w or all."),
+    provider: str = typer.Option(None, help="Only report this provider."),
+    format: str = typer.Option("table", help="Output format: table or openmetrics."),
+    textfile: str = typer.Option(None, help="Write OpenMetrics to this file (e.g. for node exporter's textfile collector)."),
+):
+    """Show latency percentiles, throughput and error rates per provider and model"""
+    try:
+        seconds = request_stats.parse_window(window)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    since = time.time() - seconds if seconds else None
+    summaries = request_stats.summarize(request_stats.load_records(since, provider))
+
+    if textfile or format == "openmetrics":
+        metrics = request_stats.to_openmetrics(summaries, window)
+        if textfile:
+            request_stats.write_textfile(textfile, metrics)
+            console.print(f"[green]Metrics written to {textfile}[/green]")
+        else:
+            typer.echo(metrics, nl=False)
+        return
+
+    if not summaries:
+        console.print(f"[yellow]No requests recorded in the last {window}.[/yellow]")
+        return
+
+    from rich.table import Table
+    table = Table(title=f"Request stats (last {window})")
+    table.add_column("Provider", style="cyan")
+    table.add_column("Model", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("p50", justify="right", style="green")
+    table.add_column("p90", justify="right", style="yellow")
+    table.add_column("p99", justify="right", style="red")
+    table.add_column("TTFT p50", justify="right")
+    table.add_column("Tokens/s", justify="right")
+    table.add_column("Cached", justify="right")
+
+    for s in summaries:
+        table.add_row(
+            s["provider"],
+            s["model"],
+            str(s["requests"]),
+            f"{s['errors']} ({s['error_rate']:.0%})",
+            _fmt_seconds(s["latency_p50"]),
+            _fmt_seconds(s["latency_p90"]),
+            _fmt_seconds(s["latency_p99"]),
+            _fmt_seconds(s["ttft_p50"]),
+            "-" if s["tokens_per_second"] is None else f"{s['tokens_per_second']:.1f}",
+            f"{s['cache_hit_ratio']:.0%}",
+        )
+    console.print(table)
+
+    errors = {}
+    for s in summaries:
+        for error, count in s["error_classes"].items():
+            errors[f"{s['provider']}/{error}"] = errors.get(f"{s['provider']}/{error}", 0) + count
+    if errors:
+        console.print("[bold yellow]Errors:[/bold yellow] " + ", ".join(f"{key} x{count}" for key, count in sorted(errors.items())))
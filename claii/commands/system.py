@@ -1,10 +1,11 @@
 import typer
 import subprocess
-from rich.console import Console
-from rich.table import Table
-from claii.plugins.manager import plugin_manager
+from claii import output
+from claii.completion import complete_plugins
+from claii.output import LazyConsole
+from claii.plugins.manager import DEFAULT_INIT_TIMEOUT, plugin_manager
 
-console = Console()
+console = LazyConsole()
 app = typer.Typer()
 
 @app.command()
@@ -19,11 +20,37 @@ def version():
     console.print("[bold green]CLAII v0.1.0[/bold green]")
 
 @app.command("list-plugins")
-def list_plugins():
+def list_plugins(output_format: str = typer.Option("text", "--output", autocompletion=lambda: list(output.FORMATS), help=output.OUTPUT_HELP)):
     """List all available plugins."""
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
     available_plugins = plugin_manager.get_available_plugin_names()
     enabled_plugins = plugin_manager.config["plugins"]["enabled"]
-    
+
+    if output.is_machine():
+        plugins = []
+        for plugin_name in available_plugins:
+            plugin_instance = plugin_manager.get_plugin(plugin_name)
+            plugins.append({
+                "name": str(plugin_name),
+                "enabled": plugin_name in enabled_plugins,
+                "loaded": plugin_instance is not None,
+                "description": plugin_instance.description if plugin_instance else None,
+            })
+        if output.FORMAT == "json":
+            output.emit({"plugins": plugins})
+        for plugin in plugins if output.FORMAT != "json" else []:
+            if output.FORMAT == "ndjson":
+                output.emit(plugin)
+            else:
+                status = "enabled" if plugin["enabled"] else "disabled"
+                print(f"{plugin['name']}\t{status}\t{plugin['description'] or 'Not loaded'}")
+        return
+
+    from rich.table import Table
     table = Table(title="Available Plugins")
     table.add_column("Name", style="cyan")
     table.add_column("Status", style="green")
@@ -38,7 +65,7 @@ def list_plugins():
     console.print(table)
 
 @app.command("enable-plugin")
-def enable_plugin(name: str):
+def enable_plugin(name: str = typer.Argument(..., autocompletion=complete_plugins)):
     """Enable a plugin."""
     if plugin_manager.enable_plugin(name):
         console.print(f"[green]Plugin '{name}' enabled successfully[/green]")
@@ -46,10 +73,62 @@ def enable_plugin(name: str):
         console.print(f"[red]Failed to enable plugin '{name}'[/red]")
 
 @app.command("disable-plugin")
-def disable_plugin(name: str):
+def disable_plugin(name: str = typer.Argument(..., autocompletion=complete_plugins)):
     """Disable a plugin."""
     if plugin_manager.disable_plugin(name):
         console.print(f"[green]Plugin '{name}' disabled successfully[/green]")
     else:
         console.print(f"[red]Failed to disable plugin '{name}'[/red]")
 
+
+@app.command("plugin-timings")
+def plugin_timings(
+    run_lazy: bool = typer.Option(False, "--run-lazy", help="Also run and time the on_load of lazy plugins."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: list(output.FORMATS), help=output.OUTPUT_HELP),
+):
+    """Show how long each plugin took to import, initialize and load in this start-up."""
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    if run_lazy:
+        for name in list(plugin_manager.plugins):
+            plugin_manager.ensure_loaded(name)
+    enabled_plugins = plugin_manager.config["plugins"]["enabled"]
+    timings = sorted(plugin_manager.timings.values(), key=lambda timing: -timing.total_seconds)
+    rows = []
+    for timing in timings:
+        row = timing.as_dict()
+        if timing.name not in enabled_plugins and timing.status == "discovered":
+            row["status"] = "disabled"
+        rows.append(row)
+
+    if output.is_machine():
+        if output.FORMAT == "json":
+            output.emit({"plugins": rows})
+        for row in rows if output.FORMAT != "json" else []:
+            if output.FORMAT == "ndjson":
+                output.emit(row)
+            else:
+                print(f"{row['name']}\t{row['status']}\t{row['total_seconds']:.4f}")
+        return
+
+    def ms(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+    from rich.table import Table
+    styles = {"loaded": "green", "deferred": "cyan", "disabled": "dim", "failed": "red", "timed out": "red"}
+    table = Table(title="Plugin Start-up Time")
+    table.add_column("Plugin", style="cyan")
+    table.add_column("Status")
+    for column in ("Import", "Init", "on_load", "Total"):
+        table.add_column(column, justify="right")
+    table.add_column("Error", style="red")
+    for row in rows:
+        table.add_row(row["name"], f"[{styles.get(row['status'], 'white')}]{row['status']}[/]",
+                      ms(row["import_seconds"]), ms(row["init_seconds"]), ms(row["on_load_seconds"]),
+                      ms(row["total_seconds"]), output.escape(row["error"] or ""))
+    console.print(table)
+    console.print(f"[dim]Plugins initialize in parallel; each has {DEFAULT_INIT_TIMEOUT:g}s unless "
+                  f"`plugins.init_timeout` or the plugin's `init_timeout` setting says otherwise.[/dim]")
@@ -1,16 +1,169 @@
 import typer
-from rich.console import Console
-from claii.utils import is_ollama_installed, is_openai_configured
+from claii import output
+from claii.config import load_config, save_config
+from claii.output import LazyConsole
 
-console = Console()
+console = LazyConsole()
 app = typer.Typer()
 
 @app.command()
-def list():
-    """List available AI tools"""
-    console.print("[bold yellow]AI Tools Detection:[/bold yellow]")
-    console.print(f"🔹 Ollama Installed: {'✅ Yes' if is_ollama_installed() else '❌ No'}")
-    console.print(f"🔹 OpenAI Configured: {'✅ Yes' if is_openai_configured() else '❌ No'}")
-
-    if not is_ollama_installed() and not is_openai_configured():
-        console.print("[red]No AI tools detected![/red]")
+def list(
+    timeout: float = typer.Option(None, help="Seconds to wait for all probes (default: `probe_timeout` config, 3)."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: [*output.FORMATS], help=output.OUTPUT_HELP),
+):
+    """Check which AI tools and plugin models are reachable, and how fast"""
+    from claii import probe
+    from claii.plugins.manager import plugin_manager
+
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    results = probe.probe_all(load_config(), plugin_manager.models, timeout)
+    try:
+        probe.save_status(results)
+    except OSError as e:
+        LazyConsole(status=True).print(f"[yellow]Could not save provider status: {e}[/yellow]")
+
+    if output.FORMAT in ("json", "ndjson"):
+        items = [result.as_dict() for result in results]
+        if output.FORMAT == "json":
+            output.emit({"tools": items})
+        for item in items if output.FORMAT == "ndjson" else []:
+            output.emit(item)
+        return
+    if output.FORMAT == "plain":
+        for result in results:
+            print(f"{result.name}\t{'available' if result.available else 'unavailable'}\t{result.status}")
+        return
+
+    from rich.table import Table
+    styles = {"up": "green", "down": "red", "unconfigured": "dim", "unknown": "yellow"}
+    table = Table(title="AI Tools")
+    table.add_column("Tool")
+    table.add_column("Status")
+    table.add_column("Connect", justify="right")
+    table.add_column("Round trip", justify="right")
+    table.add_column("Detail")
+    for result in results:
+        table.add_row(
+            result.name + (" (plugin)" if result.kind == "plugin" else ""),
+            f"[{styles[result.status]}]{result.status}[/]",
+            "-" if result.connect_ms is None else f"{result.connect_ms:.0f} ms",
+            "-" if result.round_trip_ms is None else f"{result.round_trip_ms:.0f} ms",
+            output.escape(result.detail),
+        )
+    console.print(table)
+    if not any(result.status == "up" for result in results):
+        console.print("[red]No AI tools reachable![/red]")
+
+
+@app.command()
+def recommend(
+    target: float = typer.Option(None, help="Seconds a typical answer may take (default: `latency_target` config, 10)."),
+    calibrate: bool = typer.Option(True, "--calibrate/--no-calibrate", help="Measure the models the choice depends on (each takes a few seconds)."),
+    recalibrate: bool = typer.Option(False, "--recalibrate", help="Forget stored measurements and measure again."),
+    apply: bool = typer.Option(False, "--set", help="Save the recommended model as `ollama_model`."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: [*output.FORMATS], help=output.OUTPUT_HELP),
+):
+    """Recommend the largest local Ollama model that answers within the latency target"""
+    from claii import model_select
+    import requests
+
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    config = load_config()
+    target = target if target is not None else config.get("latency_target", model_select.DEFAULT_LATENCY_TARGET)
+    url = model_select.ollama_url(config)
+    status = LazyConsole(status=True)
+    try:
+        selector = model_select.Selector(url, target, on_calibrate=lambda name: status.print(f"[yellow]Measuring {name}...[/yellow]"))
+    except requests.RequestException as e:
+        console.print(f"[red]Could not reach Ollama at {url}: {e}[/red]")
+        raise typer.Exit(1)
+    if not selector.models:
+        console.print(f"[red]No models installed on {url}. Try `ollama pull qwen2.5-coder:1.5b`.[/red]")
+        raise typer.Exit(1)
+    if recalibrate:
+        selector.calibration["models"] = {}
+    best = selector.recommend(calibrate=calibrate or recalibrate)
+    ranked = selector.rank(calibrate=False)
+    if apply and best:
+        config["ollama_model"] = best.model.name
+        save_config(config)
+
+    if output.FORMAT in ("json", "ndjson"):
+        output.emit({"hardware": selector.hardware.as_dict(), "target": target,
+                     "recommended": best.model.name if best else None, "models": [r.as_dict() for r in ranked]})
+        return
+    if output.FORMAT == "plain":
+        print(best.model.name if best else "")
+        return
+
+    from rich.table import Table
+    hardware = selector.hardware
+    memory = f"{(hardware.memory_available or 0) / 2 ** 30:.1f} of {(hardware.memory_total or 0) / 2 ** 30:.1f} GiB free"
+    load = f", load {hardware.load:.2f}" if hardware.load is not None else ""
+    console.print(f"[dim]{hardware.cores} cores ({hardware.cpu}), {memory}{load}; target {target:g}s per answer[/dim]")
+    table = Table(title=f"Ollama models on {url}")
+    for column in ("Model", "Size", "Params", "Quant", "Tokens/s", "Answer", "Fits"):
+        table.add_column(column, justify="left" if column in ("Model", "Quant") else "right")
+    for result in ranked:
+        model = result.model
+        speed = "-" if result.tokens_per_second is None else f"{'' if result.measured else '~'}{result.tokens_per_second:.1f}"
+        latency = "-" if result.latency is None else f"{result.latency:.1f}s"
+        style = "green" if result.meets_target else "red" if result.latency else ""
+        name = f"[bold]{model.name}[/bold] *" if best and model is best.model else model.name
+        table.add_row(
+            name + (" (loaded)" if model.loaded else ""),
+            f"{model.size / 2 ** 30:.1f} GiB",
+            f"{model.parameters:g}B" if model.parameters else "-",
+            model.quantization or "-",
+            speed,
+            f"[{style}]{latency}[/]" if style else latency,
+            "yes" if result.fits else "[red]no[/red]",
+        )
+    console.print(table)
+    console.print("[dim]~ estimated from the size of a measured model[/dim]")
+    if best:
+        verdict = "meets the target" if best.meets_target else "is the fastest, but misses the target"
+        console.print(f"[green]Recommended: {best.model.name}[/green] ({verdict})")
+        if apply:
+            console.print(f"[green]Saved as ollama_model.[/green]")
+        else:
+            console.print("[dim]Use --set to save it, or set ollama_model to \"auto\" to choose per request.[/dim]")
+
+
+@app.command()
+def prompt(
+    query: str = typer.Argument(..., help="The query to build a prompt for."),
+    tool: str = typer.Option("ollama", help="Provider whose prompt template to use."),
+    model: str = typer.Option(None, help="Model (default: the configured model for the provider)."),
+    output_format: str = typer.Option("text", "--output", autocompletion=lambda: [*output.FORMATS], help=output.OUTPUT_HELP),
+):
+    """Show the prompt a query is sent as, and its size in tokens"""
+    from claii.prompts.concise import target_shell
+    from claii.prompts.registry import template_for
+
+    try:
+        output.set_format(output_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    config = load_config()
+    model = model or config.get(f"{tool.replace('-', '_')}_model")
+    template = template_for(tool, model, config, target_shell())
+    messages = template.messages(query)
+    if output.is_machine():
+        output.emit({"template": template.name, "provider": tool, "model": model, "tokens": template.tokens(query),
+                     "instruction_tokens": template.overhead, "max_tokens": template.max_tokens,
+                     "messages": [{"role": role, "content": content} for role, content in messages]})
+        return
+    console.print(f"[bold]{template.name}[/bold] template for {tool}{f' ({model})' if model else ''}: "
+                  f"~{template.tokens(query)} tokens ({template.overhead} of instructions, budget {template.max_tokens})")
+    for role, content in messages:
+        console.print(f"[dim]{role}:[/dim] {output.escape(content)}")
@@ -0,0 +1,129 @@
+"""Ask several providers the same query at once (``claii compare``).
+
+Every provider gets its own thread and goes through :func:`claii.ai.gen_reply`,
+so the wall time of a comparison is that of the slowest provider rather than
+the sum. Replies stream into :class:`CompareResult` objects that a UI can
+render while they arrive. Comparison requests are kept out of history (they
+would teach the cookbook several answers per query) but are recorded in
+``claii stats``.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from claii import history, stats
+from claii.config import load_config
+from claii.errors import ErrorReply
+
+BUILTIN_TOOLS = ["ollama", "openai", "deepseek", "perplexity", "mistral", "gemini", "openai-compatible"]
+
+
+@dataclass
+class CompareResult:
+    tool: str
+    text: str = ""  # reply so far while streaming, then the full reply
+    reply: Optional[str] = None
+    latency: Optional[float] = None
+    ttft: Optional[float] = None
+    tokens_out: Optional[int] = None
+    error: Optional[str] = None
+    done: bool = False
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if not self.tokens_out or not self.latency:
+            return None
+        return self.tokens_out / self.latency
+
+    def as_dict(self) -> Dict:
+        return {
+            "tool": self.tool,
+            "reply": self.reply,
+            "latency": self.latency,
+            "ttft": self.ttft,
+            "tokens_out": self.tokens_out,
+            "tokens_per_second": self.tokens_per_second,
+            "error": self.error,
+        }
+
+
+def available_tools() -> List[str]:
+    """Built-in providers that are configured, plus plugin models."""
+    from claii import utils
+    from claii.plugins.manager import plugin_manager
+    config = load_config()
+    configured = {
+        "ollama": utils.is_ollama_installed,
+        "openai": utils.is_openai_configured,
+        "deepseek": utils.is_deepseek_configured,
+        "perplexity": utils.is_perplexity_configured,
+        "mistral": utils.is_mistral_configured,
+        "gemini": utils.is_gemini_configured,
+        "openai-compatible": lambda: bool(config.get("openai_compatible_base_url")),
+    }
+    return [tool for tool, check in configured.items() if check()] + list(plugin_manager.models)
+
+
+def ask(query: str, result: CompareResult) -> CompareResult:
+    """Fill ``result`` with one provider's reply, streaming it into ``result.text``."""
+    from claii.ai import gen_reply
+
+    def on_token(token: str):
+        result.text += token
+
+    start = time.perf_counter()
+    reply = None
+    try:
+        with history.paused():
+            reply = gen_reply(query, result.tool, use_tools=False, on_token=on_token)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.latency = time.perf_counter() - start
+
+    record = stats.last_record()
+    if record is not None and record.start >= start:
+        result.ttft = record.ttft
+        result.tokens_out = record.tokens_out
+        result.error = result.error or record.error
+    if reply is None:
+        result.error = result.error or "no_reply"
+    elif isinstance(reply, ErrorReply):
+        result.error = result.error or reply.code
+    result.reply = reply
+    result.text = reply or result.text
+    result.done = True
+    return result
+
+
+def run(query: str, tools: List[str]) -> List[CompareResult]:
+    """Ask every tool concurrently and return their results in the order given."""
+    results = [CompareResult(tool) for tool in tools]
+    with ThreadPoolExecutor(len(tools)) as pool:
+        list(pool.map(lambda result: ask(query, result), results))
+    return results
+
+
+def summarize(runs: List[List[CompareResult]]) -> Dict[str, Dict]:
+    """Aggregate per-tool results over several queries."""
+    by_tool: Dict[str, List[CompareResult]] = {}
+    for results in runs:
+        for result in results:
+            by_tool.setdefault(result.tool, []).append(result)
+
+    summaries = {}
+    for tool, results in by_tool.items():
+        ok = [r for r in results if not r.error]
+        latencies = [r.latency for r in ok]
+        ttfts = [r.ttft for r in ok if r.ttft is not None]
+        tokens = sum(r.tokens_out or 0 for r in ok)
+        summaries[tool] = {
+            "requests": len(results),
+            "errors": len(results) - len(ok),
+            "latency_p50": stats.percentile(latencies, 50),
+            "latency_p90": stats.percentile(latencies, 90),
+            "ttft_p50": stats.percentile(ttfts, 50),
+            "tokens_per_second": tokens / sum(latencies) if tokens and latencies else None,
+        }
+    return summaries
@@ -0,0 +1,249 @@
+"""Fast shell completion for ``claii`` and the console-script entry point.
+
+Completing through the Typer app means importing every command module and
+loading every plugin before the first suggestion. Instead, the first
+completion request (or the first after config, plugins or CLAII itself
+changed) walks the full app once and saves its tree of commands, options and
+argument values to ``completion_cache.json``. Later requests are answered from
+that file by :func:`main` with nothing but the standard library imported.
+
+Values offered for options and arguments come from each parameter's Typer
+``autocompletion`` callback, evaluated when the cache is built; the
+callbacks below supply tool names, configured models and plugin names.
+
+This module must stay cheap to import: it runs on every ``claii`` invocation.
+"""
+
+import json
+import os
+import shlex
+import sys
+
+from claii.config import CONFIG_DIR, CONFIG_PATH
+
+CACHE_PATH = CONFIG_DIR / "completion_cache.json"
+CACHE_VERSION = 1
+COMPLETE_VAR = "_CLAII_COMPLETE"
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Autocompletion callbacks used by the commands (run only while the cache is built)
+
+def complete_tools():
+    from claii.compare import BUILTIN_TOOLS
+    from claii.plugins.manager import plugin_manager
+    return ["auto"] + BUILTIN_TOOLS + sorted(plugin_manager.models)
+
+
+def complete_models():
+    from claii.config import load_config
+    config = load_config()
+    return sorted({value for key, value in config.items() if key.endswith("_model") and isinstance(value, str)})
+
+
+def complete_plugins():
+    from claii.plugins.manager import plugin_manager
+    return sorted(plugin_manager.discover_plugins())
+
+
+# Cache
+
+def _fingerprint():
+    """Modification times of everything the completion tree depends on."""
+    paths = [str(CONFIG_PATH), os.path.join(_PACKAGE_DIR, "app.py")]
+    commands_dir = os.path.join(_PACKAGE_DIR, "commands")
+    for directory in (commands_dir, os.path.join(_PACKAGE_DIR, "plugins", "builtin"), str(CONFIG_DIR / "plugins")):
+        paths.append(directory)
+        # Walk down into plugin packages: editing a plugin's __init__.py in place changes no directory mtime
+        for root, subdirectories, files in os.walk(directory):
+            subdirectories[:] = sorted(name for name in subdirectories if not name.startswith((".", "__pycache__")))
+            paths += [os.path.join(root, name) for name in subdirectories]
+            paths += [os.path.join(root, name) for name in sorted(files) if name.endswith(".py") and not name.startswith(".")]
+    fingerprint = {}
+    for path in paths:
+        try:
+            fingerprint[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            fingerprint[path] = None
+    return fingerprint
+
+
+def _values(param, ctx):
+    if getattr(param.type, "choices", None):
+        return [str(choice) for choice in param.type.choices]
+    if getattr(param, "_custom_shell_complete", None) is None:
+        return []
+    try:
+        return [item.value for item in param.shell_complete(ctx, "")]
+    except Exception:
+        return []
+
+
+def _node(command, ctx):
+    """The completion tree of a click command or group."""
+    import re
+
+    def help_text(text):
+        return re.sub(r"\[/?[a-z][^\]]*\]", "", (text or "").strip().split("\n")[0])
+
+    node = {"help": help_text(command.help or command.short_help), "options": [], "args": [], "commands": {}}
+    for param in command.get_params(ctx):
+        if param.param_type_name == "option" and param.hidden:
+            continue
+        if param.param_type_name == "option":
+            node["options"].append({
+                "opts": param.opts + param.secondary_opts,
+                "help": help_text(param.help),
+                "flag": param.is_flag or param.count,
+                "values": _values(param, ctx),
+            })
+        else:
+            node["args"].append({"name": param.name, "values": _values(param, ctx)})
+    if hasattr(command, "list_commands"):  # a group
+        for name in command.list_commands(ctx):
+            sub = command.get_command(ctx, name)
+            if sub is not None and not sub.hidden:
+                node["commands"][name] = _node(sub, sub.context_class(sub, parent=ctx, info_name=name))
+    return node
+
+
+def build_cache():
+    """Walk the full app and save its completion tree."""
+    import typer
+    from claii.app import app
+
+    command = typer.main.get_command(app)
+    tree = _node(command, command.context_class(command, info_name="claii"))
+    cache = {"version": CACHE_VERSION, "fingerprint": _fingerprint(), "tree": tree}
+    os.makedirs(CACHE_PATH.parent, exist_ok=True)
+    tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, CACHE_PATH)
+    return cache
+
+
+def load_cache(rebuild_if_stale: bool = True):
+    try:
+        with open(CACHE_PATH) as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION and cache.get("fingerprint") == _fingerprint():
+            return cache
+    except (OSError, ValueError):
+        pass
+    return build_cache() if rebuild_if_stale else None
+
+
+# Completion
+
+def _split(line: str):
+    """Split a command line like the shell would, tolerating an unfinished quote."""
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    words = []
+    try:
+        for word in lexer:
+            words.append(word)
+    except ValueError:
+        words.append(lexer.token)
+    return words
+
+
+def complete(tree, args, incomplete):
+    """``(value, help)`` suggestions for ``incomplete`` after ``args`` (words after ``claii``)."""
+    node = tree
+    positional = 0
+    expecting = None  # the option whose value comes next
+    for arg in args:
+        if expecting is not None:
+            expecting = None
+            continue
+        if arg.startswith("-"):
+            option = next((o for o in node["options"] if arg.split("=", 1)[0] in o["opts"]), None)
+            if option and not option["flag"] and "=" not in arg:
+                expecting = option
+            continue
+        if arg in node["commands"] and positional == 0:
+            node = node["commands"][arg]
+            continue
+        positional += 1
+
+    if expecting is not None:
+        return [(value, "") for value in expecting["values"] if value.startswith(incomplete)]
+    if incomplete.startswith("-"):
+        used = set(args)
+        return [
+            (opt, option["help"])
+            for option in node["options"]
+            for opt in option["opts"]
+            if opt.startswith(incomplete) and (opt not in used or opt == "--help")
+        ]
+    if node["commands"] and positional == 0:
+        return [(name, sub["help"]) for name, sub in node["commands"].items() if name.startswith(incomplete)]
+    if positional < len(node["args"]):
+        return [(value, "") for value in node["args"][positional]["values"] if value.startswith(incomplete)]
+    return []
+
+
+def _completion_args(shell: str):
+    if shell == "bash":
+        words = _split(os.environ.get("COMP_WORDS", ""))
+        cword = int(os.environ.get("COMP_CWORD", 0))
+        return words[1:cword], words[cword] if cword < len(words) else ""
+    line = os.environ.get("_TYPER_COMPLETE_ARGS", "")
+    words = _split(line)
+    if shell in ("powershell", "pwsh"):
+        incomplete = os.environ.get("_TYPER_COMPLETE_WORD_TO_COMPLETE", "")
+        return (words[1:-1] if incomplete else words[1:]), incomplete
+    args = words[1:]
+    if args and not line.endswith(" "):
+        return args[:-1], args[-1]
+    return args, ""
+
+
+def _format(shell: str, items):
+    """Render suggestions the way Typer's completion scripts expect them."""
+    if shell == "bash":
+        return "\n".join(value for value, _ in items)
+    if shell == "zsh":
+        def escape(s):
+            return s.replace('"', '""').replace("'", "''").replace("$", "\\$").replace("`", "\\`").replace(":", r"\\:")
+        if not items:
+            return "_files"
+        lines = [f'"{escape(value)}":"{escape(help)}"' if help else f'"{escape(value)}"' for value, help in items]
+        return "_arguments '*: :((" + "\n".join(lines) + "))'"
+    if shell == "fish":
+        action = os.environ.get("_TYPER_COMPLETE_FISH_ACTION", "")
+        if action == "is-args":
+            sys.exit(0 if items else 1)
+        return "\n".join(f"{value}\t{' '.join(help.split())}" if help else value for value, help in items)
+    return "\n".join(f"{value}:::{help or ' '}" for value, help in items)
+
+
+def fast_complete() -> bool:
+    """Answer a shell completion request from the cache; False if it must go through the full app."""
+    instruction = os.environ.get(COMPLETE_VAR, "")
+    if not instruction.startswith("complete_"):
+        return False
+    shell = instruction[len("complete_"):]
+    if shell not in ("bash", "zsh", "fish", "powershell", "pwsh"):
+        return False
+    try:
+        cache = load_cache()
+        args, incomplete = _completion_args(shell)
+        output = _format(shell, complete(cache["tree"], args, incomplete))
+    except Exception:
+        return False
+    if output:
+        print(output)
+    return True
+
+
+def main():
+    """Entry point of the ``claii`` command."""
+    if fast_complete():
+        return
+    from claii.app import app
+    app()
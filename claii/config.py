@@ -2,6 +2,7 @@ import os
 import json
 import platform
 from pathlib import Path
+from claii.tracing import span
 
 # CONFIG_PATH = os.path.expanduser("~/.config/CLAII/config.json")
 
@@ -12,20 +13,28 @@ elif platform.system() == "Darwin":
 else:
     CONFIG_PATH = Path.home() / ".config" / "CLAII" / "config.json"
 
+# Directory for CLAII's other local state (stats, caches)
+CONFIG_DIR = CONFIG_PATH.parent
+
 def ensure_config_dir():
     """Ensure configuration directory exists"""
     os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
 
 def load_config():
     """Load configuration file"""
-    ensure_config_dir()
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    return {}
+    with span("config.load"):
+        ensure_config_dir()
+        if os.path.exists(CONFIG_PATH):
+            with open(CONFIG_PATH, "r") as f:
+                return json.load(f)
+        return {}
 
 def save_config(config):
     """Save configuration to file"""
-    ensure_config_dir()
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f, indent=4)
+    with span("config.save"):
+        ensure_config_dir()
+        # Write then rename, so processes starting at the same time never read a half-written file
+        tmp_path = f"{CONFIG_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(config, f, indent=4)
+        os.replace(tmp_path, CONFIG_PATH)
@@ -0,0 +1,244 @@
+"""Instant answers for recurring queries from a local cookbook.
+
+The cookbook is an index of one-line commands confirmed as the answer to a
+query in history: run with ``--run`` and exited 0, or accepted with ``claii
+cookbook add`` (at least ``min_count`` times, and for most of the times the
+query was confirmed). Replies that were only shown are never learned. Curated
+entries come from ``cookbook.json`` (or ``cookbook.yaml`` if PyYAML is
+installed) next to the config file::
+
+    [
+        {"query": "list files", "command": "ls -la"},
+        {"queries": ["disk usage", "disk space"], "command": "df -h"}
+    ]
+
+The index is stored in ``cookbook_index.json``. It remembers how far into the
+history file it has read, so compaction only parses entries added since the
+last run. A lookup compacts the index first when history has grown (at most
+once per ``refresh`` seconds, if set) or when the curated file changed.
+
+Lookups match the normalized query exactly. With ``fuzzy`` (the
+``cookbook_fuzzy`` config option) they fall back to a keyword match: query words
+are looked up in a word -> entries index (unknown words are matched to close
+known ones to forgive typos), and the best entry by word overlap wins if it
+reaches the threshold. Word overlap can't tell "larger" from "smaller", so a
+fuzzy match is only a suggestion: ``claii chat --run`` asks before running it.
+"""
+
+import difflib
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from claii import history
+from claii.config import CONFIG_DIR
+from claii.tracing import span
+
+try:
+    import yaml
+except ImportError:  # curated YAML files need PyYAML; JSON always works
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = CONFIG_DIR / "cookbook_index.json"
+CURATED_PATHS = [CONFIG_DIR / "cookbook.json", CONFIG_DIR / "cookbook.yaml", CONFIG_DIR / "cookbook.yml"]
+INDEX_VERSION = 2  # 2: learned from confirmed answers only
+
+DEFAULT_MIN_COUNT = 1
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_REFRESH = 0  # seconds between compactions triggered by lookups
+MAX_COMMAND_LENGTH = 300
+
+_WORD = re.compile(r"[\w./~*-]+")
+_loaded = None  # (mtime, index) of the last index read by this process
+
+
+@dataclass
+class Match:
+    query: str  # the cookbook entry's query
+    command: str
+    source: str  # "history" or "curated"
+    count: int  # times the command was confirmed for the query in history
+    score: float  # 1.0 for an exact match, the word overlap for a fuzzy one
+    elapsed: float  # lookup time in seconds
+    exact: bool = True  # False for a fuzzy match, even one scoring 1.0 (the same words reordered)
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+
+def tokenize(query: str) -> List[str]:
+    return _WORD.findall(normalize(query))
+
+
+def _load_curated():
+    """Return ``(entries, mtime)`` from the first curated cookbook file that exists."""
+    for path in CURATED_PATHS:
+        if not path.exists():
+            continue
+        mtime = path.stat().st_mtime
+        try:
+            with open(path) as f:
+                if path.suffix == ".json":
+                    data = json.load(f)
+                elif yaml is None:
+                    logger.warning(f"Install PyYAML to use {path}; it is ignored for now")
+                    return [], mtime
+                else:
+                    data = yaml.safe_load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cookbook file {path}: {e}")
+            return [], mtime
+        entries = []
+        for item in data or []:
+            if not isinstance(item, dict) or not item.get("command"):
+                continue
+            queries = item.get("queries") or [item.get("query")]
+            entries += [(query, str(item["command"])) for query in queries if query]
+        return entries, mtime
+    return [], None
+
+
+def _build_entries(counts: Dict[str, Dict[str, int]], curated, min_count: int):
+    """Turn history counts and curated entries into the lookup tables of the index."""
+    entries = []
+    exact = {}
+    for query, command in curated:
+        exact[normalize(query)] = len(entries)
+        entries.append({"query": query, "command": command, "source": "curated", "count": 0})
+    for query, answers in counts.items():
+        if query in exact:
+            continue
+        command, count = max(answers.items(), key=lambda item: item[1])
+        # Only queries that get the same one-liner most of the time
+        if count >= min_count and count * 2 > sum(answers.values()):
+            exact[query] = len(entries)
+            entries.append({"query": query, "command": command, "source": "history", "count": count})
+    words: Dict[str, List[int]] = {}
+    for i, entry in enumerate(entries):
+        entry["words"] = sorted(set(tokenize(entry["query"])))
+        for word in entry["words"]:
+            words.setdefault(word, []).append(i)
+    return entries, exact, words
+
+
+def compact(rebuild: bool = False, min_count: int = DEFAULT_MIN_COUNT) -> Dict:
+    """Fold answers confirmed in history since the last compaction into the index and save it."""
+    with span("cookbook.compact", rebuild=rebuild):
+        index = None if rebuild else _read_index()
+        counts = index["counts"] if index else {}
+        offset = index["history_offset"] if index else 0
+        if os.path.exists(history.HISTORY_PATH) and os.path.getsize(history.HISTORY_PATH) < offset:
+            counts, offset = {}, 0  # history was truncated or rotated: start over
+        confirmed, offset = history.read_confirmed(offset)
+        for query, command in confirmed:
+            command = command.strip()
+            if not command or "\n" in command or len(command) > MAX_COMMAND_LENGTH:
+                continue
+            answers = counts.setdefault(normalize(query), {})
+            answers[command] = answers.get(command, 0) + 1
+
+        curated, curated_mtime = _load_curated()
+        entries, exact, words = _build_entries(counts, curated, min_count)
+        index = {
+            "version": INDEX_VERSION,
+            "compacted_at": time.time(),
+            "history_offset": offset,
+            "curated_mtime": curated_mtime,
+            "min_count": min_count,
+            "counts": counts,
+            "entries": entries,
+            "exact": exact,
+            "words": words,
+        }
+        _write_index(index)
+        return index
+
+
+def _read_index() -> Optional[Dict]:
+    global _loaded
+    try:
+        mtime = INDEX_PATH.stat().st_mtime
+        if _loaded and _loaded[0] == mtime:
+            return _loaded[1]
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION:
+        return None
+    _loaded = (mtime, index)
+    return index
+
+
+def _write_index(index: Dict) -> None:
+    global _loaded
+    os.makedirs(INDEX_PATH.parent, exist_ok=True)
+    tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, INDEX_PATH)
+    _loaded = (INDEX_PATH.stat().st_mtime, index)
+
+
+def load(refresh: float = DEFAULT_REFRESH, min_count: int = DEFAULT_MIN_COUNT) -> Dict:
+    """Return the index, compacting it first if it is stale."""
+    index = _read_index()
+    if index is None:
+        return compact(min_count=min_count)
+    curated_mtime = next((path.stat().st_mtime for path in CURATED_PATHS if path.exists()), None)
+    history_size = os.path.getsize(history.HISTORY_PATH) if os.path.exists(history.HISTORY_PATH) else 0
+    history_grew = history_size != index["history_offset"] and time.time() - index["compacted_at"] > refresh
+    if history_grew or curated_mtime != index["curated_mtime"] or min_count != index["min_count"]:
+        return compact(min_count=min_count)
+    return index
+
+
+def _resolve_word(word: str, words: Dict[str, List[int]]) -> str:
+    """Map an unknown word to a close known one (typos), if there is one."""
+    if word in words or len(word) < 4:
+        return word
+    same_start = [known for known in words if known[0] == word[0]]
+    close = difflib.get_close_matches(word, same_start, n=1, cutoff=0.8)
+    return close[0] if close else word
+
+
+def match(index: Dict, query: str, threshold: float = DEFAULT_THRESHOLD, fuzzy: bool = False) -> Optional[Match]:
+    """Find the cookbook entry for a query in a loaded index; with ``fuzzy``, also by word overlap."""
+    start = time.perf_counter()
+    entries = index["entries"]
+    i = index["exact"].get(normalize(query))
+    exact = i is not None
+    score = 1.0
+    if not exact:
+        if not fuzzy:
+            return None
+        words = index["words"]
+        query_words = {_resolve_word(word, words) for word in tokenize(query)}
+        candidates = Counter(i for word in query_words for i in words.get(word, ()))
+        best = None
+        for i, shared in candidates.items():
+            union = len(query_words) + len(entries[i]["words"]) - shared
+            candidate_score = shared / union if union else 0
+            if best is None or candidate_score > best[1]:
+                best = (i, candidate_score)
+        if best is None or best[1] < threshold:
+            return None
+        i, score = best
+    entry = entries[i]
+    return Match(entry["query"], entry["command"], entry["source"], entry["count"], score, time.perf_counter() - start,
+                 exact)
+
+
+def lookup(query: str, threshold: float = DEFAULT_THRESHOLD, refresh: float = DEFAULT_REFRESH,
+           min_count: int = DEFAULT_MIN_COUNT, fuzzy: bool = False) -> Optional[Match]:
+    """Return the cookbook command for a query, or None if there is no good match."""
+    with span("cookbook.lookup", fuzzy=fuzzy):
+        return match(load(refresh, min_count), query, threshold, fuzzy)
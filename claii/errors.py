@@ -0,0 +1,15 @@
+"""Error replies returned by model backends."""
+
+
+class ErrorReply(str):
+    """A reply that reports a failure instead of model output.
+
+    It is still the Rich-markup string backends have always returned, so it can
+    be printed as-is, but it also carries a machine-readable ``code`` such as
+    ``missing_api_key`` or ``ollama_not_running``.
+    """
+
+    def __new__(cls, message: str, code: str = "error"):
+        reply = super().__new__(cls, message)
+        reply.code = code
+        return reply
@@ -0,0 +1,85 @@
+"""Run a generated command and measure it (``claii chat --run``).
+
+Besides the exit status, :func:`run_command` records wall time, user and
+system CPU time and peak resident memory of the command and everything it
+waited for, taken from ``wait4``. The numbers are stored in history next to
+the query that produced the command, so ``claii history --slow`` and
+``--failed`` can point at generated commands worth improving (say, a
+``find /`` where ``locate`` would do). Where ``wait4`` is not available
+(Windows) only wall time and exit status are recorded.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from claii.tracing import span
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass
+class RunTelemetry:
+    command: str
+    returncode: int
+    wall_time: float  # seconds
+    user_time: Optional[float] = None  # CPU seconds
+    system_time: Optional[float] = None
+    max_rss: Optional[int] = None  # bytes; None if too small to tell apart from CLAII's own
+    started: float = 0.0  # unix time
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+    def describe(self) -> str:
+        parts = [f"exit {self.returncode}", f"{self.wall_time:.2f}s wall"]
+        if self.user_time is not None:
+            parts.append(f"{self.user_time:.2f}s user, {self.system_time:.2f}s sys")
+        if self.max_rss is not None:
+            parts.append(f"peak RSS {format_bytes(self.max_rss)}")
+        return ", ".join(parts)
+
+
+def format_bytes(value: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def run_command(command: str, stdout=None) -> RunTelemetry:
+    """Run ``command`` in a shell, with inherited stdio, and return its telemetry.
+
+    ``stdout`` redirects the command's standard output (e.g. to ``sys.stderr``).
+    """
+    started = time.time()
+    start = time.perf_counter()
+    with span("run.command"):
+        process = subprocess.Popen(command, shell=True, stdout=stdout)
+        if resource is None or not hasattr(os, "wait4"):
+            returncode = process.wait()
+            return RunTelemetry(command, returncode, time.perf_counter() - start, started=started)
+        while True:
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+                break
+            except KeyboardInterrupt:
+                # The command got the Ctrl-C too; wait for it to exit and report that
+                continue
+        wall_time = time.perf_counter() - start
+    process.returncode = returncode = os.waitstatus_to_exitcode(status)
+    # The child's peak RSS starts out at ours, carried over from before exec,
+    # so only a higher peak is the command's own
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss = None
+    if usage.ru_maxrss > own:
+        # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+        max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return RunTelemetry(command, returncode, wall_time, usage.ru_utime, usage.ru_stime, max_rss, started)
@@ -1,7 +1,124 @@
+import json
 import os
+import threading
+from contextlib import contextmanager
+
 HISTORY_PATH = os.path.expanduser("~/.ai-cli-history.log")
 
+# Set to False to stop replies being written to history (e.g. during load tests)
+LOGGING_ENABLED = True
+
+_local = threading.local()
+
+@contextmanager
+def paused():
+    """Don't log replies generated on this thread inside the block (e.g. intermediate tool-calling rounds)"""
+    previous = getattr(_local, "paused", False)
+    _local.paused = True
+    try:
+        yield
+    finally:
+        _local.paused = previous
+
 def log_history(message: str, reply: str):
     """Log the AI conversation to a history file"""
+    if not LOGGING_ENABLED or getattr(_local, "paused", False):
+        return
+    with open(HISTORY_PATH, "a") as f:
+        f.write(f"Q: {message}\nA: {reply}\n---\n")
+
+def log_run(message: str, run: dict):
+    """Log the telemetry of running a reply after its history entry.
+
+    Runs are blocks of their own (``R: {json}``), so appending one never rewrites
+    the entry and readers that only know ``Q:``/``A:`` blocks skip them.
+    """
+    if not LOGGING_ENABLED or getattr(_local, "paused", False):
+        return
     with open(HISTORY_PATH, "a") as f:
-        f.write(f"Q: {message}\nA: {reply}\n---\n")
\ No newline at end of file
+        f.write(f"R: {json.dumps(dict(run, query=message))}\n---\n")
+
+def log_accept(message: str, command: str):
+    """Record that ``command`` was accepted as the answer to ``message`` (a ``K: {json}`` block)."""
+    if not LOGGING_ENABLED:
+        return
+    with open(HISTORY_PATH, "a") as f:
+        f.write(f"K: {json.dumps({'query': message, 'command': command})}\n---\n")
+
+def load_log(path: str = None):
+    """Read the whole history as dicts with ``query``, ``reply`` and the ``runs`` of that reply."""
+    path = path or HISTORY_PATH
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        data = f.read().decode("utf-8", "replace")
+    entries = []
+    for block in data.split("\n---\n"):
+        if block.startswith("Q: ") and "\nA: " in block:
+            query, reply = block[3:].split("\nA: ", 1)
+            entries.append({"query": query, "reply": reply, "runs": []})
+        elif block.startswith("R: "):
+            try:
+                run = json.loads(block[3:])
+            except ValueError:
+                continue
+            # Attach to the latest entry it came from; another process may have logged in between
+            for entry in reversed(entries[-20:]):
+                if entry["query"] == run.get("query") and entry["reply"].strip() == run.get("command"):
+                    entry["runs"].append(run)
+                    break
+            else:
+                entries.append({"query": run.get("query", ""), "reply": run.get("command", ""), "runs": [run]})
+    return entries
+
+def read_entries(offset: int = 0, path: str = None):
+    """Parse the history entries written after byte ``offset``.
+
+    Returns ``(entries, end_offset)``, where entries are ``(query, reply)`` pairs.
+    An entry still being written at the end of the file is left for the next read.
+    """
+    path = path or HISTORY_PATH
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n---\n")
+    if end == -1:
+        return [], offset
+    entries = []
+    for block in data[:end].split(b"\n---\n"):
+        text = block.decode("utf-8", "replace")
+        if text.startswith("Q: ") and "\nA: " in text:
+            query, reply = text[3:].split("\nA: ", 1)
+            entries.append((query, reply))
+    return entries, offset + end + len(b"\n---\n")
+
+def read_confirmed(offset: int = 0, path: str = None):
+    """Parse the confirmed answers written after byte ``offset``: commands that ran successfully or were accepted.
+
+    Returns ``(answers, end_offset)``, where answers are ``(query, command)`` pairs.
+    """
+    path = path or HISTORY_PATH
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n---\n")
+    if end == -1:
+        return [], offset
+    answers = []
+    for block in data[:end].split(b"\n---\n"):
+        text = block.decode("utf-8", "replace")
+        if not text.startswith(("R: ", "K: ")):
+            continue
+        try:
+            record = json.loads(text[3:])
+        except ValueError:
+            continue
+        if text.startswith("R: ") and record.get("returncode") != 0:
+            continue
+        if record.get("query") and record.get("command"):
+            answers.append((record["query"], record["command"]))
+    return answers, offset + end + len(b"\n---\n")
@@ -0,0 +1,146 @@
+"""Load generation against a configured provider (``claii bench``).
+
+Requests go through :func:`claii.ai.gen_reply`, exactly like ``claii chat``,
+so the numbers include prompt building, client setup and everything else a
+user would wait for.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from claii import stats
+
+DEFAULT_PROMPTS = [
+    "list all files in the current directory including hidden ones",
+    "show disk usage of the current directory sorted by size",
+    "find all python files modified in the last day",
+    "show the ten processes using the most memory",
+    "count the lines in all markdown files",
+]
+
+
+@dataclass
+class RequestResult:
+    start: float
+    end: float
+    latency: float
+    ttft: Optional[float] = None
+    tokens_out: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadTestReport:
+    tool: str
+    concurrency: int
+    requests: int
+    warmup: int
+    ramp_up: float
+    wall_time: float
+    results: List[RequestResult] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        ok = [r for r in self.results if not r.error]
+        latencies = [r.latency for r in ok]
+        ttfts = [r.ttft for r in ok if r.ttft is not None]
+        tokens_out = sum(r.tokens_out or 0 for r in ok)
+        errors: Dict[str, int] = {}
+        for r in self.results:
+            if r.error:
+                errors[r.error] = errors.get(r.error, 0) + 1
+
+        def distribution(values):
+            return {
+                "mean": sum(values) / len(values) if values else None,
+                "p50": stats.percentile(values, 50),
+                "p90": stats.percentile(values, 90),
+                "p99": stats.percentile(values, 99),
+                "max": max(values) if values else None,
+            }
+
+        return {
+            "tool": self.tool,
+            "concurrency": self.concurrency,
+            "requests": len(self.results),
+            "warmup_requests": self.warmup,
+            "ramp_up_seconds": self.ramp_up,
+            "wall_time_seconds": self.wall_time,
+            "successful": len(ok),
+            "errors": errors,
+            "error_rate": (len(self.results) - len(ok)) / len(self.results) if self.results else 0,
+            "requests_per_second": len(self.results) / self.wall_time if self.wall_time else None,
+            "tokens_per_second": tokens_out / self.wall_time if self.wall_time else None,
+            "tokens_out": tokens_out,
+            "latency_seconds": distribution(latencies),
+            "ttft_seconds": distribution(ttfts),
+        }
+
+
+def _run_one(generate: Callable[[str], object], prompt: str) -> RequestResult:
+    start = time.perf_counter()
+    error = None
+    try:
+        reply = generate(prompt)
+        if reply is None:
+            error = "no_reply"
+    except Exception as e:
+        error = type(e).__name__
+    end = time.perf_counter()
+    record = stats.last_record()
+    if record is not None and record.start >= start:
+        return RequestResult(start, end, end - start, record.ttft, record.tokens_out, error or record.error)
+    return RequestResult(start, end, end - start, error=error)
+
+
+def run_load_test(
+    generate: Callable[[str], object],
+    prompts: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int = 0,
+    ramp_up: float = 0.0,
+    tool: str = "auto",
+    on_result: Optional[Callable[[RequestResult], None]] = None,
+) -> LoadTestReport:
+    """Send ``requests`` prompts through ``generate`` from ``concurrency`` workers.
+
+    ``warmup`` requests are sent first and left out of the report. Workers are
+    started evenly over ``ramp_up`` seconds so a cold server isn't hit by every
+    worker at once.
+    """
+    prompts = prompts or DEFAULT_PROMPTS
+    prompt_cycle = itertools.cycle(prompts)
+    lock = threading.Lock()
+
+    if warmup:
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(lambda p: _run_one(generate, p), [next(prompt_cycle) for _ in range(warmup)]))
+
+    remaining = iter(range(requests))
+    results: List[RequestResult] = []
+
+    def worker(index: int):
+        if ramp_up and concurrency > 1:
+            time.sleep(ramp_up * index / concurrency)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+                prompt = next(prompt_cycle)
+            result = _run_one(generate, prompt)
+            with lock:
+                results.append(result)
+            if on_result:
+                on_result(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+    wall_time = time.perf_counter() - start
+
+    return LoadTestReport(tool, concurrency, requests, warmup, ramp_up, wall_time, results)
@@ -0,0 +1,287 @@
+"""Answer a question about input too large for one prompt (``cmd | claii chat --stdin "..."``).
+
+The input is read as a stream and cut into chunks of at most ``chunk_chars``
+characters (on line boundaries where possible). Chunks are sent to the model
+concurrently, at most ``concurrency`` at a time, and no more input is read
+while that many are in flight, so memory stays bounded however large the
+input is. Each chunk yields a partial answer ("map"). Partial answers are
+merged as soon as enough have accumulated to fill a chunk ("reduce"), level by
+level, and the remaining ones are merged into the final reply at the end.
+Input that fits in a single chunk is answered with one request.
+
+Reading stops early after ``max_chunks`` chunks, or when :meth:`MapReduce.stop`
+is called (e.g. on Ctrl-C); the reply is then built from the chunks answered so
+far and says that the input was cut short.
+"""
+
+import codecs
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+
+from claii import history
+from claii.ai import quiet
+from claii.errors import ErrorReply
+from claii.prompts.concise import raw_prompts
+from claii.tracing import span
+
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 2000
+DEFAULT_CONCURRENCY = 4
+# Rounds of merging at the end before the notes are cut to fit the final prompt instead
+MAX_REDUCE_ROUNDS = 8
+
+SINGLE_PROMPT = (
+    "Answer the question using the input below. Be concise and specific; quote the relevant lines.\n"
+    "Question: {query}\n"
+    "Input:\n{chunk}"
+)
+
+MAP_PROMPT = (
+    "You are reading part {index} of a larger input to answer a question. "
+    "Extract only what in this part is relevant to the question, with exact quotes of important lines. "
+    "If nothing is relevant, reply with NOTHING RELEVANT.\n"
+    "Question: {query}\n"
+    "Part {index}:\n{chunk}"
+)
+
+REDUCE_PROMPT = (
+    "These are notes taken from consecutive parts of a large input to answer a question. "
+    "Merge them into one set of notes, keeping every relevant detail and quote and dropping duplicates.\n"
+    "Question: {query}\n"
+    "Notes:\n{notes}"
+)
+
+FINAL_PROMPT = (
+    "These are notes taken from all parts of a large input. Using them, answer the question. "
+    "Be concise and specific.\n"
+    "Question: {query}\n"
+    "Notes:\n{notes}"
+)
+
+NOTHING_RELEVANT = "NOTHING RELEVANT"
+
+
+def iter_chunks(stream: BinaryIO, chunk_chars: int, on_read: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """Yield text chunks of at most ``chunk_chars`` characters, split on line boundaries where possible.
+
+    The stream is read a line at a time but never more than ``chunk_chars``
+    bytes at once, so input without newlines (minified JSON, a binary dump)
+    doesn't have to fit in memory. ``on_read`` is called with each read's size.
+    """
+    # Decodes incrementally, so a character cut between two reads stays whole
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    parts: List[str] = []
+    size = 0
+    while True:
+        raw = stream.readline(chunk_chars)
+        if raw and on_read:
+            on_read(len(raw))
+        line = decoder.decode(raw, final=not raw)
+        if not raw and not line:
+            break
+        while len(line) > chunk_chars:  # bytes held back by the decoder can add a character: hard-split it
+            if parts:
+                yield "".join(parts)
+                parts, size = [], 0
+            yield line[:chunk_chars]
+            line = line[chunk_chars:]
+        if size + len(line) > chunk_chars and parts:
+            yield "".join(parts)
+            parts, size = [], 0
+        parts.append(line)
+        size += len(line)
+        if not raw:
+            break
+    if parts:
+        yield "".join(parts)
+
+
+@dataclass
+class Progress:
+    bytes_read: int = 0
+    chunks_read: int = 0
+    chunks_done: int = 0
+    reduces_done: int = 0
+    in_flight: int = 0
+
+
+class MapReduce:
+    """One map-reduce run; ``ask`` sends a prompt to the model and returns its reply."""
+
+    def __init__(
+        self,
+        query: str,
+        ask: Callable[[str], Optional[str]],
+        chunk_chars: int = DEFAULT_CHUNK_TOKENS * CHARS_PER_TOKEN,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_chunks: Optional[int] = None,
+        on_progress: Optional[Callable[[Progress], None]] = None,
+    ):
+        self.query = query
+        self.ask = ask
+        self.chunk_chars = chunk_chars
+        self.concurrency = max(1, concurrency)
+        self.max_chunks = max_chunks
+        self.on_progress = on_progress
+        self.progress = Progress()
+        self.truncated = False
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop reading input; the reply is built from what has been answered so far."""
+        self.truncated = True
+        self._stop.set()
+
+    def _call(self, prompt: str) -> Optional[str]:
+        # Runs on pool threads: history pausing and quiet are per thread, raw prompts per context.
+        # Quiet drops the "Using ..." line backends print for every chunk.
+        with history.paused(), quiet(), raw_prompts():
+            return self.ask(prompt)
+
+    def _report(self) -> None:
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+    def _notes(self, partials: List[str]) -> str:
+        return "\n---\n".join(partials)
+
+    def _fits(self, partials: List[str]) -> bool:
+        return sum(len(p) for p in partials) < self.chunk_chars
+
+    def _clip(self, note: str, limit: Optional[int] = None) -> str:
+        """``note`` cut to fit a prompt on its own, so merging it never has to start over from the same size."""
+        limit = limit or self.chunk_chars - 1
+        return note if len(note) <= limit else note[:limit]
+
+    def run(self, stream: BinaryIO) -> Optional[str]:
+        with span("mapreduce", chunk_chars=self.chunk_chars, concurrency=self.concurrency):
+            return self._run(stream)
+
+    def _count(self, nbytes: int) -> None:
+        self.progress.bytes_read += nbytes
+
+    def _run(self, stream: BinaryIO) -> Optional[str]:
+        chunks = iter_chunks(stream, self.chunk_chars, self._count)
+        first = next(chunks, None)
+        if first is None:
+            return None
+        second = next(chunks, None)
+        self.progress.chunks_read = 1
+        if second is None:
+            self.progress.in_flight = 1
+            self._report()
+            reply = self._call(SINGLE_PROMPT.format(query=self.query, chunk=first))
+            self.progress.in_flight, self.progress.chunks_done = 0, 1
+            self._report()
+            return reply
+
+        def remaining():
+            yield first
+            yield second
+            yield from chunks
+
+        source = remaining()
+        self.progress.chunks_read = 0
+        levels: List[List[str]] = [[]]
+        pending: Dict[Future, int] = {}
+        error: Optional[ErrorReply] = None
+        exhausted = False
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="claii-map") as pool:
+            while True:
+                try:
+                    while not exhausted and len(pending) < self.concurrency:
+                        if self._stop.is_set():
+                            exhausted = True
+                            break
+                        if self.max_chunks and self.progress.chunks_read >= self.max_chunks:
+                            self.truncated = next(source, None) is not None
+                            exhausted = True
+                            break
+                        chunk = next(source, None)
+                        if chunk is None:
+                            exhausted = True
+                            break
+                        self.progress.chunks_read += 1
+                        prompt = MAP_PROMPT.format(index=self.progress.chunks_read, query=self.query, chunk=chunk)
+                        pending[pool.submit(self._call, prompt)] = 0
+                    self.progress.in_flight = len(pending)
+                    self._report()
+                    if not pending:
+                        break
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    # First Ctrl-C: stop reading and answer from what we have; a second one aborts
+                    if self._stop.is_set():
+                        for future in pending:
+                            future.cancel()
+                        raise
+                    self.stop()
+                    continue
+                for future in done:
+                    level = pending.pop(future)
+                    try:
+                        reply = future.result()
+                    except Exception as e:
+                        reply = ErrorReply(f"[red]Error processing the input: {e}[/red]", type(e).__name__)
+                    if level == 0:
+                        self.progress.chunks_done += 1
+                    else:
+                        self.progress.reduces_done += 1
+                    if reply is None or isinstance(reply, ErrorReply):
+                        error = error or reply or ErrorReply("[red]No reply for part of the input[/red]", "no_reply")
+                        self.stop()
+                        continue
+                    if level == 0 and NOTHING_RELEVANT in reply.upper()[:len(NOTHING_RELEVANT) + 10]:
+                        continue
+                    while len(levels) <= level:
+                        levels.append([])
+                    levels[level].append(self._clip(reply.strip()))
+                    # A reduce always merges at least two notes, so the number of notes shrinks
+                    if len(levels[level]) > 1 and not self._fits(levels[level]):
+                        notes, levels[level] = levels[level], []
+                        prompt = REDUCE_PROMPT.format(query=self.query, notes=self._notes(notes))
+                        pending[pool.submit(self._call, prompt)] = level + 1
+
+            if error is not None:
+                return error
+            return self._finish(pool, [note for level in reversed(levels) for note in level])
+
+    def _finish(self, pool: ThreadPoolExecutor, notes: List[str]) -> Optional[str]:
+        """Merge the remaining notes, in groups that fit a prompt, until one final reply is left.
+
+        Every group has at least two notes, so each round shrinks the notes;
+        after ``MAX_REDUCE_ROUNDS`` (the model keeps its merges long) they are
+        cut to share the final prompt instead.
+        """
+        if not notes:
+            notes = [NOTHING_RELEVANT]
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if self._fits(notes) or len(notes) < 2:
+                break
+            groups, group = [], []
+            for note in notes:
+                if len(group) > 1 and not self._fits(group + [note]):
+                    groups.append(group)
+                    group = []
+                group.append(note)
+            if len(group) == 1 and groups:
+                groups[-1] += group  # no note is merged on its own
+            else:
+                groups.append(group)
+            prompts = [REDUCE_PROMPT.format(query=self.query, notes=self._notes(g)) for g in groups]
+            merged = list(pool.map(self._call, prompts))
+            self.progress.reduces_done += len(merged)
+            self._report()
+            failed = next((m for m in merged if m is None or isinstance(m, ErrorReply)), False)
+            if failed is not False:
+                return failed
+            notes = [self._clip(m.strip()) for m in merged]
+        if not self._fits(notes):
+            notes = [self._clip(note, max(1, self.chunk_chars // len(notes) - 1)) for note in notes]
+        query = self.query
+        if self.truncated:
+            query += f" (Only the first {self.progress.chunks_read} parts of the input were read; say so.)"
+        return self._call(FINAL_PROMPT.format(query=query, notes=self._notes(notes)))
@@ -0,0 +1,375 @@
+"""Pick the Ollama model that fits this machine.
+
+With ``"ollama_model": "auto"``, the model is chosen per request: the largest
+installed model that fits in the available memory and is expected to answer
+within ``latency_target`` seconds (default 10). ``claii tools recommend``
+shows the same reasoning.
+
+The expected latency comes from tokens per second measured by a short
+calibration run (a fixed prompt, a few dozen tokens) and stored in
+``calibration.json`` next to the config file. It is scaled down when the CPU is
+busy. To keep calibration short, only the smallest model is always measured;
+larger ones are estimated from it (generation speed is roughly inversely
+proportional to model size) and measured before being picked. Measurements are
+dropped when the hardware changes, and a model is measured again when it is
+replaced by a different build of the same name.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import platform
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from claii.config import CONFIG_DIR
+from claii.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_PATH = CONFIG_DIR / "calibration.json"
+CALIBRATION_VERSION = 1
+CALIBRATION_PROMPT = "Write a shell command that lists the ten largest files in the current directory."
+CALIBRATION_TOKENS = 48
+CALIBRATION_TIMEOUT = 300
+
+DEFAULT_LATENCY_TARGET = 10.0
+# A typical request: the command prompt plus the query in, a short command out
+TYPICAL_PROMPT_TOKENS = 200
+TYPICAL_REPLY_TOKENS = 40
+# Memory kept free for everything else when deciding whether a model fits
+MEMORY_HEADROOM = 0.9
+FALLBACK_MODEL = "mistral"
+
+
+@dataclass
+class Hardware:
+    cores: int
+    memory_total: Optional[int]  # bytes
+    memory_available: Optional[int]
+    load: Optional[float]  # 1-minute load average
+    cpu: str
+
+    def fingerprint(self) -> Dict:
+        """What makes earlier measurements invalid when it changes (not load or free memory)."""
+        total = round(self.memory_total / 2 ** 30) if self.memory_total else None
+        return {"cores": self.cores, "memory_gib": total, "cpu": self.cpu}
+
+    @property
+    def load_factor(self) -> float:
+        """Share of the CPU left for a model, given the current load."""
+        if self.load is None:
+            return 1.0
+        return max(0.25, min(1.0, 1 - self.load / self.cores))
+
+    def as_dict(self):
+        return {"cores": self.cores, "memory_total": self.memory_total, "memory_available": self.memory_available,
+                "load": self.load, "cpu": self.cpu}
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    size: int  # bytes on disk, roughly the memory it needs
+    parameters: Optional[float] = None  # billions
+    quantization: Optional[str] = None
+    build: str = ""  # digest, or size and modification time
+    loaded: bool = False
+
+
+@dataclass
+class Recommendation:
+    model: ModelInfo
+    tokens_per_second: Optional[float]
+    prompt_tokens_per_second: Optional[float]
+    measured: bool
+    latency: Optional[float]  # expected seconds for a typical request
+    fits: bool
+    meets_target: bool
+
+    def as_dict(self):
+        return {
+            "name": self.model.name,
+            "size": self.model.size,
+            "parameters": self.model.parameters,
+            "quantization": self.model.quantization,
+            "loaded": self.model.loaded,
+            "tokens_per_second": self.tokens_per_second,
+            "prompt_tokens_per_second": self.prompt_tokens_per_second,
+            "measured": self.measured,
+            "latency": self.latency,
+            "fits": self.fits,
+            "meets_target": self.meets_target,
+        }
+
+
+# Hardware
+
+def _meminfo() -> Dict[str, int]:
+    values = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                values[key] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def _cpu_name() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def detect_hardware() -> Hardware:
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cores = os.cpu_count() or 1
+    meminfo = _meminfo()
+    total = meminfo.get("MemTotal")
+    if total is None:
+        try:
+            total = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            total = None
+    try:
+        load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        load = None
+    return Hardware(cores, total, meminfo.get("MemAvailable"), load, _cpu_name())
+
+
+# Ollama
+
+def ollama_url(config=None) -> str:
+    """The local Ollama server: ``ollama_url`` config, else ``OLLAMA_HOST`` like the Ollama client."""
+    url = (config or {}).get("ollama_url") or os.environ.get("OLLAMA_HOST") or "http://localhost:11434"
+    if "://" not in url:
+        url = f"http://{url}"
+    return url.rstrip("/")
+
+
+def _parameters(text: Optional[str]) -> Optional[float]:
+    match = re.match(r"^\s*([\d.]+)\s*([KMBT])", text or "", re.IGNORECASE)
+    if not match:
+        return None
+    scale = {"K": 1e-6, "M": 1e-3, "B": 1.0, "T": 1e3}[match.group(2).upper()]
+    return float(match.group(1)) * scale
+
+
+def list_models(url: str, timeout: float = 5.0) -> List[ModelInfo]:
+    """Installed models with their size and quantization, marking the ones currently loaded."""
+    with span("model_select.list_models"):
+        tags = requests.get(f"{url}/api/tags", timeout=timeout)
+        tags.raise_for_status()
+        try:
+            running = requests.get(f"{url}/api/ps", timeout=timeout)
+            loaded = {model["name"] for model in running.json().get("models", [])} if running.ok else set()
+        except (requests.RequestException, ValueError):
+            loaded = set()
+    models = []
+    for model in tags.json().get("models", []):
+        details = model.get("details") or {}
+        models.append(ModelInfo(
+            name=model["name"],
+            size=int(model.get("size") or 0),
+            parameters=_parameters(details.get("parameter_size")),
+            quantization=details.get("quantization_level"),
+            build=model.get("digest") or f"{model.get('size')}:{model.get('modified_at')}",
+            loaded=model["name"] in loaded,
+        ))
+    return models
+
+
+def measure(url: str, model: str, timeout: float = CALIBRATION_TIMEOUT) -> Dict:
+    """Generate a short reply with ``model`` and return its prompt and generation speed."""
+    with span("model_select.measure", model=model):
+        response = requests.post(f"{url}/api/generate", json={
+            "model": model,
+            "prompt": CALIBRATION_PROMPT,
+            "stream": False,
+            "options": {"num_predict": CALIBRATION_TOKENS, "temperature": 0},
+        }, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+
+    def rate(count, duration_ns):
+        return count / (duration_ns / 1e9) if count and duration_ns else None
+
+    return {
+        "tokens_per_second": rate(data.get("eval_count"), data.get("eval_duration")),
+        "prompt_tokens_per_second": rate(data.get("prompt_eval_count"), data.get("prompt_eval_duration")),
+        "load_seconds": (data.get("load_duration") or 0) / 1e9,
+        "measured_at": time.time(),
+    }
+
+
+# Calibration store
+
+def load_calibration(hardware: Hardware) -> Dict:
+    """Stored measurements, or none if they were taken on different hardware."""
+    try:
+        with open(CALIBRATION_PATH) as f:
+            data = json.load(f)
+        if data.get("version") == CALIBRATION_VERSION and data.get("hardware") == hardware.fingerprint():
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": CALIBRATION_VERSION, "hardware": hardware.fingerprint(), "models": {}}
+
+
+def save_calibration(data: Dict) -> None:
+    os.makedirs(CALIBRATION_PATH.parent, exist_ok=True)
+    # A temporary file of its own, so concurrent writers (threads or processes) don't move each other's
+    fd, tmp_path = tempfile.mkstemp(dir=CALIBRATION_PATH.parent, prefix=f"{CALIBRATION_PATH.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, CALIBRATION_PATH)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+# Choosing
+
+class Selector:
+    """Ranks installed models against the latency target, calibrating the ones it needs."""
+
+    def __init__(self, url: str, target: float = DEFAULT_LATENCY_TARGET, hardware: Optional[Hardware] = None,
+                 models: Optional[List[ModelInfo]] = None, on_calibrate: Optional[Callable[[str], None]] = None):
+        self.url = url
+        self.on_calibrate = on_calibrate
+        self.target = target
+        self.hardware = hardware or detect_hardware()
+        self.models = sorted(models if models is not None else list_models(url), key=lambda m: (m.size, m.name))
+        self.calibration = load_calibration(self.hardware)
+        self.changed = False
+
+    def measurement(self, model: ModelInfo) -> Optional[Dict]:
+        entry = self.calibration["models"].get(model.name)
+        if entry and entry.get("build") == model.build and entry.get("tokens_per_second"):
+            return entry
+        return None
+
+    def calibrate(self, model: ModelInfo) -> Optional[Dict]:
+        if self.on_calibrate:
+            self.on_calibrate(model.name)
+        try:
+            entry = dict(measure(self.url, model.name), build=model.build)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Could not calibrate {model.name}: {e}")
+            return None
+        self.calibration["models"][model.name] = entry
+        self.changed = True
+        return entry
+
+    def fits(self, model: ModelInfo) -> bool:
+        available = self.hardware.memory_available or self.hardware.memory_total
+        if model.loaded or not available or not model.size:
+            return True
+        return model.size <= available * MEMORY_HEADROOM
+
+    def _reference(self) -> Optional[ModelInfo]:
+        """A measured model to estimate the others from (the smallest, measuring it if needed)."""
+        measured = [model for model in self.models if self.measurement(model)]
+        if measured:
+            return measured[0]
+        for model in self.models:
+            if self.fits(model) and self.calibrate(model):
+                return model
+        return None
+
+    def evaluate(self, model: ModelInfo, reference: Optional[ModelInfo]) -> Recommendation:
+        entry = self.measurement(model)
+        tps = prompt_tps = None
+        if entry:
+            tps, prompt_tps = entry["tokens_per_second"], entry.get("prompt_tokens_per_second")
+        elif reference is not None and model.size and reference.size:
+            ref = self.measurement(reference)
+            scale = reference.size / model.size
+            tps = ref["tokens_per_second"] * scale
+            prompt_tps = ref.get("prompt_tokens_per_second") and ref["prompt_tokens_per_second"] * scale
+        latency = None
+        if tps:
+            factor = self.hardware.load_factor
+            latency = TYPICAL_REPLY_TOKENS / (tps * factor)
+            if prompt_tps:
+                latency += TYPICAL_PROMPT_TOKENS / (prompt_tps * factor)
+        fits = self.fits(model)
+        return Recommendation(model, tps, prompt_tps, entry is not None, latency, fits,
+                              fits and latency is not None and latency <= self.target)
+
+    def rank(self, calibrate: bool = True) -> List[Recommendation]:
+        """Every installed model, largest first, with the expected latency of each.
+
+        With ``calibrate``, the largest model expected to meet the target is
+        measured to confirm it, moving down to smaller models until one does.
+        """
+        reference = self._reference() if calibrate else next((m for m in self.models if self.measurement(m)), None)
+        results = {}
+        for model in reversed(self.models):
+            result = self.evaluate(model, reference)
+            if calibrate and result.meets_target and not result.measured:
+                if self.calibrate(model):
+                    result = self.evaluate(model, reference)
+            results[model.name] = result
+            if calibrate and result.meets_target:
+                calibrate = False  # smaller models don't need measuring
+        if self.changed:
+            try:
+                save_calibration(self.calibration)
+            except OSError as e:
+                logger.warning(f"Could not save model calibration: {e}")
+            self.changed = False
+        return [results[model.name] for model in reversed(self.models)]
+
+    def recommend(self, calibrate: bool = True) -> Optional[Recommendation]:
+        """The largest model meeting the target, else the fastest one that fits."""
+        ranked = self.rank(calibrate)
+        best = next((result for result in ranked if result.meets_target), None)
+        if best is None:
+            fitting = [result for result in ranked if result.fits] or ranked
+            best = min(fitting, key=lambda r: (r.latency is None, r.latency or 0, r.model.size), default=None)
+        return best
+
+
+# The choice for each (Ollama URL, latency target), made once per process
+_chosen: Dict[Tuple[str, float], str] = {}
+_choose_lock = threading.Lock()
+
+
+def auto_model(config, on_calibrate: Optional[Callable[[str], None]] = None) -> str:
+    """The model to use for ``"ollama_model": "auto"``.
+
+    Chosen once per process: requests made from several threads at once (map-reduce,
+    ``--candidates``) wait for the first choice instead of each calibrating the same model.
+    """
+    key = (ollama_url(config), config.get("latency_target", DEFAULT_LATENCY_TARGET))
+    with _choose_lock:
+        if key in _chosen:
+            return _chosen[key]
+        with span("model_select.auto"):
+            try:
+                best = Selector(*key, on_calibrate=on_calibrate).recommend()
+            except (requests.RequestException, ValueError, OSError) as e:
+                logger.warning(f"Could not choose an Ollama model automatically: {e}")
+                return FALLBACK_MODEL  # not remembered: Ollama may be up for the next request
+        _chosen[key] = best.model.name if best else FALLBACK_MODEL
+        return _chosen[key]
@@ -0,0 +1,88 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from claii import replay, stats
+from claii.prompts.tokens import count_tokens
+from claii.tracing import span, start_span
+
+_local = threading.local()
+
+
+@contextmanager
+def streaming_to(on_token: Optional[Callable[[str], None]]):
+    """Send each streamed chunk of replies generated in this block to ``on_token``."""
+    previous = getattr(_local, "on_token", None)
+    _local.on_token = on_token
+    try:
+        yield
+    finally:
+        _local.on_token = previous
+
+
+def token_callback() -> Optional[Callable[[str], None]]:
+    """The ``on_token`` callback set by :func:`streaming_to` for this thread, if any."""
+    return getattr(_local, "on_token", None)
+
+
+def chunk_text(chunk) -> str:
+    """Extract the text of a streamed LangChain chunk (message chunk or plain string)."""
+    if isinstance(chunk, str):
+        return chunk
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    # Some providers (e.g. Anthropic) stream a list of content blocks
+    parts = []
+    for block in content:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type", "text") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
+
+def estimate_tokens(prompt) -> int:
+    """Local token count (see :mod:`claii.prompts.tokens`) for providers that don't report usage."""
+    if not isinstance(prompt, str):
+        # LangChain messages, or (role, content) pairs from build_messages
+        prompt = "\n".join(message[1] if isinstance(message, (tuple, list)) else chunk_text(message) for message in prompt)
+    return count_tokens(prompt)
+
+
+def generate(llm, prompt, provider: str, model: str) -> str:
+    """Run a LangChain model on a prompt and return the stripped reply text.
+
+    The reply is streamed so that time-to-first-token can be traced separately
+    from total generation time. Timings and token usage are also reported to
+    the request being tracked by :mod:`claii.stats`.
+    """
+    parts = []
+    usage = {}
+    on_token = token_callback()
+    with span("generate", provider=provider, model=model) as gen_span:
+        first_token = start_span("generate.first_token", provider=provider)
+        request = {"provider": provider, "model": model, "prompt": prompt}
+        for chunk in replay.stream("langchain", request, lambda: llm.stream(prompt)):
+            chunk_usage = getattr(chunk, "usage_metadata", None)
+            if chunk_usage:
+                for key in ("input_tokens", "output_tokens"):
+                    usage[key] = usage.get(key, 0) + (chunk_usage.get(key) or 0)
+            text = chunk_text(chunk)
+            if not text:
+                continue
+            if not parts:
+                first_token.finish()
+                stats.mark_first_token()
+            parts.append(text)
+            if on_token:
+                on_token(text)
+        first_token.finish()
+        reply = "".join(parts).strip()
+        gen_span.set(chars=len(reply))
+    stats.annotate(
+        model=model,
+        tokens_in=usage.get("input_tokens") or estimate_tokens(prompt),
+        tokens_out=usage.get("output_tokens") or estimate_tokens(reply),
+    )
+    return reply
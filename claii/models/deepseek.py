@@ -1,10 +1,12 @@
 from claii.config import load_config
 from claii.history import log_history
-from claii.prompts.concise import build_prompt
+from claii.prompts.concise import build_messages
 from langchain_deepseek import ChatDeepSeek
-from langchain_core.messages import HumanMessage
 import requests
 from claii.utils import is_deepseek_configured
+from claii.models.common import generate
+from claii.tracing import span
+from claii.errors import ErrorReply
 
 
 
@@ -13,12 +15,13 @@ def chat_deepseek(message: str):
     config = load_config()
 
     if not is_deepseek_configured():
-        return("[red]DeepSeek API key not set! Use `claii config set key deepseek <your_key>`[/red]")
+        return ErrorReply("[red]DeepSeek API key not set! Use `claii config set key deepseek <your_key>`[/red]", "missing_api_key")
     
     api_key = config.get("deepseek_api_key")
     model = config.get("deepseek_model", "deepseek-chat")
-    llm = ChatDeepSeek(api_key=api_key, model=model)
-    formatted_prompt = build_prompt(message)
-    reply = llm.invoke([HumanMessage(content=formatted_prompt)]).content.strip()
+    with span("provider.client", provider="deepseek"):
+        llm = ChatDeepSeek(api_key=api_key, model=model)
+    messages = build_messages(message, "deepseek", model, config)
+    reply = generate(llm, messages, "deepseek", model)
     log_history(message, reply)
     return reply
\ No newline at end of file
@@ -2,9 +2,11 @@ from claii.config import load_config
 from claii.history import log_history
 from claii.utils import is_openai_configured
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
-from claii.prompts.concise import build_prompt
+from claii.prompts.concise import build_messages
 from claii.utils import is_gemini_configured
+from claii.models.common import generate
+from claii.tracing import span
+from claii.errors import ErrorReply
 
 
 
@@ -14,12 +16,13 @@ def chat_gemini(message: str):
     config = load_config()
 
     if not is_gemini_configured():
-        return("[red]Gemini API key not set! Use `claii config set key gemini <your_key>`[/red]")
+        return ErrorReply("[red]Gemini API key not set! Use `claii config set key gemini <your_key>`[/red]", "missing_api_key")
 
     api_key = config.get("gemini_api_key")
     model = config.get("gemini_model", "gemini-pro")
-    llm = ChatGoogleGenerativeAI(api_key=api_key, model=model)
-    formatted_prompt = build_prompt(message)
-    reply = llm.invoke([HumanMessage(content=formatted_prompt)]).content.strip()
+    with span("provider.client", provider="gemini"):
+        llm = ChatGoogleGenerativeAI(api_key=api_key, model=model)
+    messages = build_messages(message, "gemini", model, config)
+    reply = generate(llm, messages, "gemini", model)
     log_history(message, reply)
     return reply
@@ -2,9 +2,11 @@ from claii.config import load_config
 from claii.history import log_history
 from claii.utils import is_openai_configured
 from langchain_mistralai import ChatMistralAI
-from langchain_core.messages import HumanMessage
-from claii.prompts.concise import build_prompt
+from claii.prompts.concise import build_messages
 from claii.utils import is_mistral_configured
+from claii.models.common import generate
+from claii.tracing import span
+from claii.errors import ErrorReply
 
 
 def chat_mistral(message: str):
@@ -12,12 +14,13 @@ def chat_mistral(message: str):
     config = load_config()
 
     if not is_mistral_configured():
-        return("[red]Mistral API key not set! Use `claii config set key mistral <your_key>`[/red]")
+        return ErrorReply("[red]Mistral API key not set! Use `claii config set key mistral <your_key>`[/red]", "missing_api_key")
 
     api_key = config.get("mistral_api_key")
     model = config.get("mistral_model", "mistral-medium")
-    llm = ChatMistralAI(api_key=api_key, model=model)
-    formatted_prompt = build_prompt(message)
-    reply = llm.invoke([HumanMessage(content=formatted_prompt)]).content.strip()
+    with span("provider.client", provider="mistral"):
+        llm = ChatMistralAI(api_key=api_key, model=model)
+    messages = build_messages(message, "mistral", model, config)
+    reply = generate(llm, messages, "mistral", model)
     log_history(message, reply)
     return reply
\ No newline at end of file
@@ -2,18 +2,67 @@ from claii.config import load_config
 from claii.history import log_history
 from claii.utils import is_ollama_installed, is_ollama_running
 from langchain_ollama import ChatOllama
-from claii.prompts.concise import build_prompt
+from claii.prompts.concise import build_messages
+from claii.models.common import generate, streaming_to, token_callback
+from claii.tracing import span
+from claii.errors import ErrorReply
+from claii import ollama_pool
 
 
 
 def chat_ollama(message: str, model: str):
     """Chat with a local Ollama model using LangChain"""
+    config = load_config()
+    pool = ollama_pool.get_pool(config)
+    if pool is not None:
+        return _chat_pool(message, model, pool, config)
     if not is_ollama_installed():
-        return("[red]Ollama is not installed![/red]")
+        return ErrorReply("[red]Ollama is not installed![/red]", "ollama_not_installed")
     if not is_ollama_running():
-        return("[red]Ollama is not running![/red]")
-    llm = ChatOllama(model=model)
-    formatted_prompt = build_prompt(message)  # Apply prompt template
-    response = llm.invoke(formatted_prompt)
-    log_history(message, response.content.strip())
-    return response.content.strip()
+        return ErrorReply("[red]Ollama is not running![/red]", "ollama_not_running")
+    with span("provider.client", provider="ollama"):
+        llm = ChatOllama(model=model)
+    messages = build_messages(message, "ollama", model, config)  # Apply prompt template
+    reply = generate(llm, messages, "ollama", model)
+    log_history(message, reply)
+    return reply
+
+
+def _chat_pool(message: str, model: str, pool: ollama_pool.OllamaPool, config):
+    """Chat through the configured pool of Ollama servers, moving on to the next one if a server can't be reached.
+
+    Once tokens of a reply have been streamed to the caller, a lost connection
+    is an error rather than a retry: the next server would stream the reply
+    again from the start, and the caller would show it twice.
+    """
+    messages = build_messages(message, "ollama", model, config)
+    on_token = token_callback()
+    streamed = []
+
+    def forward(token: str):
+        streamed.append(token)
+        on_token(token)
+
+    tried = []
+    while True:
+        try:
+            with pool.acquire(model, exclude=tried) as endpoint:
+                if endpoint is None:
+                    break
+                tried.append(endpoint.url)
+                with span("provider.client", provider="ollama", endpoint=endpoint.url):
+                    llm = ChatOllama(model=model, base_url=endpoint.url)
+                with streaming_to(forward if on_token else None):
+                    reply = generate(llm, messages, "ollama", model)
+        except Exception as e:
+            if not ollama_pool.is_connection_error(e):
+                raise
+            if streamed:
+                return ErrorReply(f"[red]Lost the connection to the Ollama server at {tried[-1]} partway through the reply[/red]",
+                                  "ollama_stream_interrupted")
+            continue
+        log_history(message, reply)
+        return reply
+    if tried:
+        return ErrorReply(f"[red]Could not reach any Ollama server for {model} (tried {', '.join(tried)})[/red]", "ollama_pool_unreachable")
+    return ErrorReply(f"[red]No Ollama server in `ollama_endpoints` serves {model}[/red]", "ollama_pool_no_model")
@@ -3,16 +3,21 @@ from claii.history import log_history
 from claii.utils import is_openai_configured
 from langchain_openai import OpenAI
 from claii.prompts.concise import build_prompt
+from claii.models.common import generate
+from claii.tracing import span
+from claii.errors import ErrorReply
 
 def chat_openai(message: str):
     """Chat with OpenAI API using LangChain"""
     config = load_config()
     api_key = config.get("openai_api_key")
     if not api_key:
-        return("[red]API key not set! Use `ai set-key <your_key>`[/red]")
+        return ErrorReply("[red]API key not set! Use `ai set-key <your_key>`[/red]", "missing_api_key")
 
-    llm = OpenAI(api_key=api_key, model="gpt-3.5-turbo-0125")
-    formatted_prompt = build_prompt(message)  # Apply prompt template
-    reply = llm.invoke(formatted_prompt).content.strip()
+    model = "gpt-3.5-turbo-0125"
+    with span("provider.client", provider="openai"):
+        llm = OpenAI(api_key=api_key, model=model)
+    formatted_prompt = build_prompt(message, "openai", model, config)  # Apply prompt template
+    reply = generate(llm, formatted_prompt, "openai", model)
     log_history(message, reply)
     return reply
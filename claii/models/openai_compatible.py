@@ -0,0 +1,165 @@
+"""Backend for any server speaking the OpenAI chat-completions protocol.
+
+vLLM, llama.cpp's server, Ollama's ``/v1`` endpoint, Groq and DeepSeek all
+accept the same request, so one small HTTP client covers them. Unlike the
+other backends this one imports nothing from LangChain, and connections are
+pooled across requests, which keeps both start-up and per-request overhead low.
+"""
+
+import json
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from claii import stats
+from claii.config import load_config
+from claii.errors import ErrorReply
+from claii.history import log_history
+from claii.models.common import generate
+from claii.prompts.concise import build_messages
+from claii.replay import ReplayChunk
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1"
+DEFAULT_MODEL = "mistral"
+DEFAULT_TIMEOUT = 120
+
+# A plain prompt, or (role, content) messages from build_messages
+Prompt = Union[str, List[Tuple[str, str]]]
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session, so concurrent and repeated requests reuse connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _messages(prompt: Prompt) -> List[Dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return [{"role": role, "content": content} for role, content in prompt]
+
+
+class ChatCompletionsError(Exception):
+    """Non-200 response from a chat-completions server."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class ChatCompletionsClient:
+    """Streams replies from ``<base_url>/chat/completions``.
+
+    ``stream`` yields chunks shaped like LangChain's message chunks (``content``
+    and ``usage_metadata``), so the client can be passed to
+    :func:`claii.models.common.generate` like any LangChain model.
+    """
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT, **params):
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.model = model
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.timeout = timeout
+        self.params = params
+
+    def stream(self, prompt: Prompt) -> Iterator[ReplayChunk]:
+        payload = {
+            "model": self.model,
+            "messages": _messages(prompt),
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            **self.params,
+        }
+        with get_session().post(self.url, headers=self.headers, json=payload, stream=True, timeout=self.timeout) as response:
+            if response.status_code != 200:
+                raise ChatCompletionsError(response.status_code, response.text)
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get("usage")
+                choices = chunk.get("choices") or [{}]
+                yield ReplayChunk(
+                    choices[0].get("delta", {}).get("content") or "",
+                    {"input_tokens": usage.get("prompt_tokens"), "output_tokens": usage.get("completion_tokens")} if usage else None,
+                )
+
+    def complete(self, prompt: Prompt, n: int = 1) -> List[str]:
+        """``n`` independent replies from one request (the API's ``n`` parameter)."""
+        payload = {
+            "model": self.model,
+            "messages": _messages(prompt),
+            "n": n,
+            **self.params,
+        }
+        response = get_session().post(self.url, headers=self.headers, json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise ChatCompletionsError(response.status_code, response.text)
+        data = response.json()
+        usage = data.get("usage") or {}
+        stats.annotate(tokens_in=usage.get("prompt_tokens"), tokens_out=usage.get("completion_tokens"))
+        choices = sorted(data.get("choices") or [], key=lambda choice: choice.get("index", 0))
+        return [(choice.get("message", {}).get("content") or "").strip() for choice in choices]
+
+
+def _client(config) -> ChatCompletionsClient:
+    return ChatCompletionsClient(
+        config.get("openai_compatible_base_url", DEFAULT_BASE_URL),
+        config.get("openai_compatible_model", DEFAULT_MODEL),
+        api_key=config.get("openai_compatible_api_key"),
+        headers=config.get("openai_compatible_headers"),
+        timeout=config.get("openai_compatible_timeout", DEFAULT_TIMEOUT),
+    )
+
+
+def candidates_openai_compatible(message: str, n: int):
+    """``n`` candidate replies from an OpenAI-compatible server in one request (not logged to history)"""
+    config = load_config()
+    client = _client(config)
+    base_url = config.get("openai_compatible_base_url", DEFAULT_BASE_URL)
+    try:
+        replies = client.complete(build_messages(message, "openai-compatible", client.model, config), n)
+    except ChatCompletionsError as e:
+        return ErrorReply(f"[red]Error from {base_url}: {e.status_code} - {e.text}[/red]", f"http_{e.status_code}")
+    except requests.RequestException as e:
+        return ErrorReply(f"[red]Could not reach {base_url}: {e}[/red]", type(e).__name__)
+    if not replies:
+        return ErrorReply(f"[red]{base_url} returned no choices[/red]", "no_choices")
+    return replies
+
+
+def chat_openai_compatible(message: str):
+    """Chat with an OpenAI-compatible server over plain HTTP"""
+    config = load_config()
+    base_url = config.get("openai_compatible_base_url", DEFAULT_BASE_URL)
+    model = config.get("openai_compatible_model", DEFAULT_MODEL)
+    client = _client(config)
+    messages = build_messages(message, "openai-compatible", model, config)
+    try:
+        reply = generate(client, messages, "openai-compatible", model)
+    except ChatCompletionsError as e:
+        return ErrorReply(f"[red]Error from {base_url}: {e.status_code} - {e.text}[/red]", f"http_{e.status_code}")
+    except requests.RequestException as e:
+        return ErrorReply(f"[red]Could not reach {base_url}: {e}[/red]", type(e).__name__)
+    log_history(message, reply)
+    return reply
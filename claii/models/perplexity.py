@@ -2,8 +2,10 @@ from claii.config import load_config
 from claii.history import log_history
 from claii.utils import is_ollama_installed
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage
-from claii.prompts.concise import build_prompt
+from claii.prompts.concise import build_messages
+from claii.models.common import generate
+from claii.tracing import span
+from claii.errors import ErrorReply
 
 
 
@@ -14,11 +16,12 @@ def chat_perplexity(message: str):
     model = config.get("perplexity_model", "pplx-7b-chat")
 
     if not api_key:
-        return("[red]Perplexity API key not set! Use `claii config set key perplexity <your_key>`[/red]")
+        return ErrorReply("[red]Perplexity API key not set! Use `claii config set key perplexity <your_key>`[/red]", "missing_api_key")
 
-    llm = ChatAnthropic(api_key=api_key, model=model)
-    formatted_prompt = build_prompt(message)
-    reply = llm.invoke([HumanMessage(content=formatted_prompt)]).content.strip()
+    with span("provider.client", provider="perplexity"):
+        llm = ChatAnthropic(api_key=api_key, model=model)
+    messages = build_messages(message, "perplexity", model, config)
+    reply = generate(llm, messages, "perplexity", model)
     log_history(message, reply)
     return reply
 
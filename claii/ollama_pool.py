@@ -0,0 +1,257 @@
+"""Spread Ollama requests over a pool of servers.
+
+Configured with ``ollama_endpoints``, a list of URLs or of objects with a
+``url``, an optional ``weight`` (relative capacity, default 1) and an optional
+``models`` list (the models that endpoint may serve)::
+
+    "ollama_endpoints": [
+        {"url": "http://gpu-box:11434", "weight": 3},
+        {"url": "http://cpu-1:11434", "models": ["qwen2.5-coder:1.5b"]},
+        "http://cpu-2:11434"
+    ]
+
+Each request goes to the endpoint with the lowest expected wait: requests it
+is already serving from this process, times its recent latency, divided by
+its weight. An endpoint that doesn't have the model loaded (``/api/ps``)
+counts as slower by the time a model load takes, so warm servers are
+preferred. Endpoints are health-checked through ``/api/tags`` and ``/api/ps``
+every ``ollama_health_interval`` seconds; one that fails a check or a request
+is left out for ``ollama_eject_seconds`` (doubling with each further failure).
+
+The pool lives for the process, so concurrent and batched requests
+(``gen_replies``, map-reduce, candidates, ``claii bench``) are spread over it.
+"""
+
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+import requests
+
+from claii.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_INTERVAL = 30.0
+DEFAULT_HEALTH_TIMEOUT = 1.0
+DEFAULT_EJECT_SECONDS = 30.0
+MAX_EJECT_SECONDS = 600.0
+# Assumed before any endpoint has served a request
+DEFAULT_LATENCY = 2.0
+# Added to the expected wait of an endpoint that doesn't have the model loaded
+MODEL_LOAD_SECONDS = 10.0
+LATENCY_SMOOTHING = 0.3  # weight of the newest sample in the moving average
+
+
+def _model_names(name: str) -> Set[str]:
+    """Ollama treats ``mistral`` and ``mistral:latest`` as the same model."""
+    if name.endswith(":latest"):
+        return {name, name[:-len(":latest")]}
+    if ":" not in name:
+        return {name, f"{name}:latest"}
+    return {name}
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Whether ``error`` means the server couldn't be reached (rather than, say, an unknown model)."""
+    if isinstance(error, (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout)):
+        return True
+    httpx = sys.modules.get("httpx")  # used by langchain_ollama; only loaded if a request was made
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+@dataclass
+class Endpoint:
+    url: str
+    weight: float = 1.0
+    models: Optional[List[str]] = None
+    outstanding: int = 0
+    latency: Optional[float] = None
+    failures: int = 0
+    ejected_until: float = 0.0
+    checked_at: Optional[float] = None
+    available: Set[str] = field(default_factory=set)
+    loaded: Set[str] = field(default_factory=set)
+
+    def serves(self, model: str) -> bool:
+        names = _model_names(model)
+        if self.models is not None:
+            return bool(names & {name for configured in self.models for name in _model_names(configured)})
+        # Before the first health check anything goes; a pull may also be on its way
+        return not self.available or bool(names & self.available)
+
+    def is_loaded(self, model: str) -> bool:
+        return bool(_model_names(model) & self.loaded)
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def expected_wait(self, model: str, default_latency: float = DEFAULT_LATENCY) -> float:
+        wait = (self.outstanding + 1) * (self.latency or default_latency)
+        if not self.is_loaded(model):
+            wait += MODEL_LOAD_SECONDS
+        return wait / self.weight
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "latency": self.latency,
+            "healthy": not self.is_ejected(time.monotonic()),
+            "loaded": sorted(self.loaded),
+        }
+
+
+class OllamaPool:
+    """Chooses an Ollama endpoint per request and keeps track of their health."""
+
+    def __init__(self, endpoints: Iterable[Endpoint], health_interval: float = DEFAULT_HEALTH_INTERVAL,
+                 health_timeout: float = DEFAULT_HEALTH_TIMEOUT, eject_seconds: float = DEFAULT_EJECT_SECONDS):
+        self.endpoints = list(endpoints)
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._session = requests.Session()
+
+    @classmethod
+    def from_config(cls, config) -> "OllamaPool":
+        endpoints = []
+        for entry in config.get("ollama_endpoints") or []:
+            if isinstance(entry, str):
+                entry = {"url": entry}
+            endpoints.append(Endpoint(entry["url"].rstrip("/"), float(entry.get("weight", 1.0)), entry.get("models")))
+        return cls(
+            endpoints,
+            health_interval=config.get("ollama_health_interval", DEFAULT_HEALTH_INTERVAL),
+            health_timeout=config.get("ollama_health_timeout", DEFAULT_HEALTH_TIMEOUT),
+            eject_seconds=config.get("ollama_eject_seconds", DEFAULT_EJECT_SECONDS),
+        )
+
+    # Health
+
+    def check(self, endpoint: Endpoint) -> bool:
+        """Health-check one endpoint, refreshing the models it has and has loaded."""
+        with span("ollama_pool.check", url=endpoint.url):
+            try:
+                tags = self._session.get(f"{endpoint.url}/api/tags", timeout=self.health_timeout)
+                tags.raise_for_status()
+                running = self._session.get(f"{endpoint.url}/api/ps", timeout=self.health_timeout)
+                loaded = {model["name"] for model in running.json().get("models", [])} if running.ok else set()
+                available = {model["name"] for model in tags.json().get("models", [])}
+            except (requests.RequestException, ValueError) as e:
+                logger.info(f"Ollama endpoint {endpoint.url} failed its health check: {e}")
+                with self._lock:
+                    endpoint.checked_at = time.monotonic()
+                    self._eject(endpoint)
+                return False
+        with self._lock:
+            endpoint.checked_at = time.monotonic()
+            endpoint.available, endpoint.loaded = available, loaded
+            endpoint.failures = 0
+            endpoint.ejected_until = 0.0
+        return True
+
+    def refresh(self, force: bool = False) -> None:
+        """Health-check, in parallel, the endpoints whose last check is older than the interval."""
+        with self._refresh_lock:
+            now = time.monotonic()
+            due = [endpoint for endpoint in self.endpoints if force or self._check_due(endpoint, now)]
+            if due:
+                with ThreadPoolExecutor(len(due)) as pool:
+                    list(pool.map(self.check, due))
+
+    def _check_due(self, endpoint: Endpoint, now: float) -> bool:
+        if endpoint.checked_at is None:
+            return True
+        if endpoint.is_ejected(now):
+            return False
+        # An endpoint whose ejection is over is checked before it gets requests again
+        return bool(endpoint.ejected_until) or now - endpoint.checked_at >= self.health_interval
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        endpoint.failures += 1
+        seconds = min(self.eject_seconds * 2 ** (endpoint.failures - 1), MAX_EJECT_SECONDS)
+        endpoint.ejected_until = time.monotonic() + seconds
+
+    # Routing
+
+    def _choose(self, model: str, exclude: Set[str]) -> Optional[Endpoint]:
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.url not in exclude and e.serves(model)]
+        healthy = [e for e in candidates if not e.is_ejected(now)]
+        if healthy:
+            # Endpoints that haven't served a request yet are assumed to be as fast as the others
+            known = [e.latency for e in self.endpoints if e.latency is not None]
+            default_latency = sum(known) / len(known) if known else DEFAULT_LATENCY
+            return min(healthy, key=lambda e: (e.expected_wait(model, default_latency), e.outstanding))
+        # Everything is ejected: try the one that comes back first rather than failing outright
+        return min(candidates, key=lambda e: e.ejected_until, default=None)
+
+    @contextmanager
+    def acquire(self, model: str, exclude: Iterable[str] = ()):
+        """Pick the endpoint for a request for ``model`` (None if no endpoint serves it) and count the request against it.
+
+        The endpoint's latency and health are learned from how the block ends.
+        """
+        self.refresh()
+        with self._lock:
+            # Chosen and counted under one lock, so concurrent requests spread out
+            endpoint = self._choose(model, set(exclude))
+            if endpoint is not None:
+                endpoint.outstanding += 1
+        if endpoint is None:
+            yield None
+            return
+        start = time.perf_counter()
+        try:
+            yield endpoint
+        except BaseException as e:
+            with self._lock:
+                if is_connection_error(e):
+                    self._eject(endpoint)
+            raise
+        else:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                endpoint.latency = elapsed if endpoint.latency is None else (
+                    LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * endpoint.latency)
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+                endpoint.loaded |= {model}
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+
+_pool: Optional[OllamaPool] = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config) -> Optional[OllamaPool]:
+    """The process-wide pool for the configured endpoints, or None if there are none."""
+    global _pool, _pool_key
+    endpoints = config.get("ollama_endpoints")
+    if not endpoints:
+        return None
+    key = repr((endpoints, [config.get(name) for name in ("ollama_health_interval", "ollama_health_timeout", "ollama_eject_seconds")]))
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            _pool, _pool_key = OllamaPool.from_config(config), key
+        return _pool
+
+
+def pool_concurrency(config) -> Optional[int]:
+    """How many requests the pool can usefully take at once (its total weight), or None without a pool."""
+    endpoints = config.get("ollama_endpoints")
+    if not endpoints:
+        return None
+    return sum(max(1, round(entry.get("weight", 1))) if isinstance(entry, dict) else 1 for entry in endpoints)
@@ -0,0 +1,140 @@
+"""Output formats for scripts, and a console that only loads Rich when it is used.
+
+Commands that take ``--output`` print either for people (``text``, the default:
+Rich markup, tables and colours) or for programs:
+
+- ``plain``: the same information as text, without markup or decoration.
+- ``json``: one JSON document.
+- ``ndjson``: one JSON object per line. In stream mode there is one line per event.
+
+In the machine formats, status messages such as "Using Ollama (mistral)" go
+to stderr, so stdout only carries the result.
+
+Importing Rich costs tens of milliseconds, which scripted calls shouldn't pay.
+Modules create a :class:`LazyConsole` instead of a ``rich.console.Console``. It
+imports Rich on first use, and when it writes to something that isn't a
+terminal in a machine format, it prints plain text without importing Rich at all.
+"""
+
+import json
+import re
+import sys
+from typing import Any, Dict
+
+FORMATS = ("text", "plain", "json", "ndjson")
+MACHINE_FORMATS = ("plain", "json", "ndjson")
+
+OUTPUT_HELP = "Output format: text (for people), plain, json or ndjson (for scripts)."
+
+# The format chosen for this invocation (set by commands that take --output)
+FORMAT = "text"
+
+# Rich's markup tags: [bold], [/red], [link=...]; "\[" is a literal bracket
+_MARKUP_TAG = re.compile(r"(\\*)\[([a-z#/@][^[]*?)]")
+
+
+def set_format(value: str) -> str:
+    """Select the output format for this invocation; raises ValueError for unknown formats."""
+    global FORMAT
+    if value not in FORMATS:
+        raise ValueError(f"Unknown output format '{value}'. Choose from {', '.join(FORMATS)}")
+    FORMAT = value
+    return value
+
+
+def is_machine() -> bool:
+    return FORMAT in MACHINE_FORMATS
+
+
+def escape(text: str) -> str:
+    """Escape text so it isn't read as markup (same as ``rich.markup.escape``)."""
+    def escape_backslashes(match):
+        backslashes, tag = match.groups()
+        return f"{backslashes}{backslashes}\\[{tag}]"
+    text = _MARKUP_TAG.sub(escape_backslashes, text)
+    return text + "\\" if text.endswith("\\") and not text.endswith("\\\\") else text
+
+
+def strip_markup(text: str) -> str:
+    """Remove Rich markup tags from ``text``, e.g. from an error reply."""
+    def strip(match):
+        backslashes, tag = match.groups()
+        if len(backslashes) % 2:  # an escaped bracket is literal text
+            return f"{backslashes[:-1]}[{tag}]"
+        return backslashes
+    return _MARKUP_TAG.sub(strip, str(text))
+
+
+def emit(data: Dict[str, Any]) -> None:
+    """Print one JSON document (``json``) or line (``ndjson``) to stdout."""
+    if FORMAT == "ndjson":
+        line = json.dumps(data, default=str)
+    else:
+        line = json.dumps(data, indent=2, default=str)
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+class _PlainConsole:
+    """The part of the Console API used for status messages, as plain text."""
+
+    def __init__(self, stderr: bool):
+        self.stderr = stderr
+
+    @property
+    def file(self):
+        # Looked up on every write, like Rich does, so redirect_stdout() applies
+        return sys.stderr if self.stderr else sys.stdout
+
+    def print(self, *objects, end="\n", sep=" ", **kwargs):
+        text = sep.join(strip_markup(obj) if isinstance(obj, str) else str(obj) for obj in objects)
+        self.file.write(text + end)
+        self.file.flush()
+
+    def out(self, *objects, end="\n", sep=" ", **kwargs):
+        self.file.write(sep.join(str(obj) for obj in objects) + end)
+        self.file.flush()
+
+    def line(self, count=1):
+        self.file.write("\n" * count)
+
+
+class LazyConsole:
+    """Stands in for ``rich.console.Console(**kwargs)``, created on first use.
+
+    With ``status=True`` the console is for progress and status messages: in a
+    machine format those go to stderr instead of stdout.
+    """
+
+    def __init__(self, status: bool = False, **kwargs):
+        object.__setattr__(self, "_status", status)
+        object.__setattr__(self, "_kwargs", kwargs)
+        object.__setattr__(self, "_consoles", {})
+
+    def _target(self):
+        stderr = self._kwargs.get("stderr", False) or (self._status and is_machine())
+        machine = is_machine()
+        key = (stderr, machine)
+        console = self._consoles.get(key)
+        if console is None:
+            stream = sys.stderr if stderr else sys.stdout
+            if machine and not stream.isatty():
+                console = _PlainConsole(stderr)
+            else:
+                from rich.console import Console
+                console = Console(**dict(self._kwargs, stderr=stderr))
+            self._consoles[key] = console
+        return console
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._target(), name, value)
+
+    # Live and Progress hold the console's lock with "with console:"
+    def __enter__(self):
+        return self._target().__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._target().__exit__(*exc_info)
@@ -0,0 +1,237 @@
+"""Plan mode: ask for a task as a graph of shell steps and run them (``claii chat --plan``).
+
+The model answers with a JSON list of steps, each naming the steps it needs::
+
+    [{"id": "create", "command": "npm create vite@latest app -- --template react", "needs": []},
+     {"id": "tailwind", "command": "cd app && npm install -D tailwindcss", "needs": ["create"]},
+     {"id": "router", "command": "cd app && npm install react-router-dom", "needs": ["create"]}]
+
+:func:`execute` starts every step as soon as the steps it needs have
+succeeded, at most ``concurrency`` at a time, so independent steps (``tailwind``
+and ``router`` above) run in parallel instead of in one long ``&&`` chain.
+Output is passed on line by line as it is produced. When a step fails, the
+steps that depend on it, directly or not, are skipped; the others still run.
+"""
+
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from claii.tracing import span
+
+DEFAULT_CONCURRENCY = 4
+
+PLAN_PROMPT = (
+    "Break the following task into shell commands for {shell}. "
+    "Reply with only a JSON list of steps, no explanation. Each step is an object with "
+    '"id" (a short unique name), "command" (one shell command), "description" (a few words) and '
+    '"needs" (the ids of steps that must finish first). '
+    "Only list a step in needs if it really depends on it, so independent steps can run in parallel. "
+    "Each command runs in its own shell from the current directory, so repeat any cd it needs.\n"
+    "Task: {query}"
+)
+
+
+class PlanError(ValueError):
+    """The model's reply is not a valid plan."""
+
+
+@dataclass
+class Step:
+    id: str
+    command: str
+    needs: List[str] = field(default_factory=list)
+    description: str = ""
+
+
+@dataclass
+class StepResult:
+    step: Step
+    status: str = "pending"  # pending, running, ok, failed or skipped
+    returncode: Optional[int] = None
+    start: Optional[float] = None  # seconds since the plan started
+    duration: Optional[float] = None
+    reason: str = ""  # why a step was skipped
+
+
+def parse_plan(reply: str) -> List[Step]:
+    """Read the steps from a model reply, checking that they form a graph that can run."""
+    text = reply or ""
+    start = text.find("[")
+    if start == -1:
+        raise PlanError("the reply has no JSON list of steps")
+    # The first list of objects that parses, ignoring any text around it (brackets included)
+    decoder = json.JSONDecoder()
+    data, error = None, None
+    while start != -1:
+        try:
+            data, _ = decoder.raw_decode(text, start)
+        except ValueError as e:
+            error = error or e
+        else:
+            if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+                break
+        data = None
+        start = text.find("[", start + 1)
+    if data is None:
+        raise PlanError(f"the steps are not valid JSON: {error}" if error else "the reply has no JSON list of steps")
+    if not data:
+        raise PlanError("the plan has no steps")
+
+    steps: List[Step] = []
+    for i, item in enumerate(data, 1):
+        if not isinstance(item, dict) or not str(item.get("command") or "").strip():
+            raise PlanError(f"step {i} has no command")
+        needs = item.get("needs") or []
+        if not isinstance(needs, list):
+            needs = [needs]
+        steps.append(Step(
+            id=str(item.get("id", i)),
+            command=str(item["command"]).strip(),
+            needs=[str(need) for need in needs],
+            description=str(item.get("description") or ""),
+        ))
+
+    ids = [step.id for step in steps]
+    if len(set(ids)) != len(ids):
+        raise PlanError("step ids are not unique")
+    for step in steps:
+        unknown = [need for need in step.needs if need not in ids]
+        if unknown:
+            raise PlanError(f"step {step.id} needs unknown steps: {', '.join(unknown)}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps: List[Step]) -> None:
+    needs = {step.id: set(step.needs) for step in steps}
+    while needs:
+        ready = [step_id for step_id, deps in needs.items() if not deps]
+        if not ready:
+            raise PlanError(f"steps depend on each other in a cycle: {', '.join(sorted(needs))}")
+        for step_id in ready:
+            del needs[step_id]
+        for deps in needs.values():
+            deps.difference_update(ready)
+
+
+def generate_plan(query: str, tool: str = "auto") -> List[Step]:
+    """Ask the model for a plan for ``query``."""
+    import platform
+    from claii.ai import gen_reply
+    from claii.errors import ErrorReply
+    from claii.prompts.concise import raw_prompts
+
+    shell = "PowerShell" if platform.system() == "Windows" else "a POSIX shell"
+    with raw_prompts():
+        reply = gen_reply(PLAN_PROMPT.format(shell=shell, query=query), tool, use_tools=False)
+    if reply is None or isinstance(reply, ErrorReply):
+        raise PlanError(reply or "no reply from the model")
+    return parse_plan(reply)
+
+
+def _dependents(steps: List[Step], failed: str) -> List[str]:
+    """Ids of every step that needs ``failed``, directly or through other steps."""
+    found: List[str] = []
+    frontier = [failed]
+    while frontier:
+        current = frontier.pop()
+        for step in steps:
+            if current in step.needs and step.id not in found:
+                found.append(step.id)
+                frontier.append(step.id)
+    return found
+
+
+def execute(
+    steps: List[Step],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    on_output: Optional[Callable[[Step, str], None]] = None,
+    on_status: Optional[Callable[[StepResult], None]] = None,
+) -> List[StepResult]:
+    """Run the steps of a plan, independent ones in parallel; returns a result per step, in plan order."""
+    results: Dict[str, StepResult] = {step.id: StepResult(step) for step in steps}
+    processes: Dict[str, subprocess.Popen] = {}
+    lock = threading.Lock()
+    plan_start = time.perf_counter()
+
+    def status(result: StepResult, value: str, reason: str = ""):
+        result.status, result.reason = value, reason
+        if on_status:
+            on_status(result)
+
+    def run_step(step: Step) -> int:
+        with span("plan.step", step=step.id):
+            process = subprocess.Popen(
+                step.command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL, text=True, errors="replace",
+            )
+            with lock:
+                processes[step.id] = process
+            for line in process.stdout:
+                if on_output:
+                    on_output(step, line.rstrip("\n"))
+            return process.wait()
+
+    with span("plan.execute", steps=len(steps), concurrency=concurrency):
+        pool = ThreadPoolExecutor(max(1, concurrency), thread_name_prefix="claii-plan")
+        running: Dict[Future, StepResult] = {}
+        try:
+            while True:
+                for step in steps:
+                    result = results[step.id]
+                    if result.status != "pending" or len(running) >= concurrency:
+                        continue
+                    if all(results[need].status == "ok" for need in step.needs):
+                        result.start = time.perf_counter() - plan_start
+                        status(result, "running")
+                        running[pool.submit(run_step, step)] = result
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = running.pop(future)
+                    result.duration = time.perf_counter() - plan_start - result.start
+                    try:
+                        result.returncode = future.result()
+                    except OSError as e:
+                        if on_output:
+                            on_output(result.step, f"could not start: {e}")
+                    if result.returncode == 0:
+                        status(result, "ok")
+                        continue
+                    status(result, "failed")
+                    for step_id in _dependents(steps, result.step.id):
+                        if results[step_id].status == "pending":
+                            status(results[step_id], "skipped", f"{result.step.id} failed")
+        except KeyboardInterrupt:
+            with lock:
+                for process in processes.values():
+                    if process.poll() is None:
+                        process.terminate()
+            for result in results.values():
+                if result.status == "pending":
+                    status(result, "skipped", "cancelled")
+            raise
+        finally:
+            pool.shutdown(wait=True)
+    return [results[step.id] for step in steps]
+
+
+def summary(results: List[StepResult]) -> str:
+    """One line per step with its outcome and timing, as recorded in history."""
+    lines = []
+    for result in results:
+        line = f"[{result.step.id}] {result.step.command} -> {result.status}"
+        if result.returncode not in (None, 0):
+            line += f" (exit {result.returncode})"
+        if result.duration is not None:
+            line += f", started at {result.start:.2f}s, took {result.duration:.2f}s"
+        if result.reason:
+            line += f" ({result.reason})"
+        lines.append(line)
+    return "\n".join(lines)
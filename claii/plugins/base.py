@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 
+from claii import tracing
+
 class CLAIIPlugin(ABC):
     """Base class for all CLAII plugins."""
     
+    # Set to True to run on_load when one of the plugin's commands, models or tools
+    # is first used instead of on every start-up
+    lazy_load = False
+    
     @property
     @abstractmethod
     def name(self) -> str:
@@ -43,9 +49,17 @@ class CLAIIPlugin(ABC):
         return []
     
     def on_load(self) -> None:
-        """Called when the plugin is loaded."""
+        """Called when the plugin is loaded (on first use if ``lazy_load`` is set)."""
         pass
     
     def on_unload(self) -> None:
         """Called when the plugin is unloaded."""
-        pass 
\ No newline at end of file
+        pass
+    
+    def span(self, name: str, **attrs):
+        """Time a block of plugin work in the `--profile` / `CLAII_TRACE` output.
+        
+        Use as a context manager: ``with self.span("request", model=model): ...``.
+        The span is named ``plugin.<plugin name>.<name>``.
+        """
+        return tracing.span(f"plugin.{self.name}.{name}", **attrs) 
\ No newline at end of file
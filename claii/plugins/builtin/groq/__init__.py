@@ -4,11 +4,13 @@ from claii.plugins.base import CLAIIPlugin
 from claii.config import load_config
 from claii.history import log_history
 from claii.prompts.concise import build_prompt
+from claii.errors import ErrorReply
+from claii import replay, stats
+from claii.output import LazyConsole
 import requests
 import json
-from rich.console import Console
 
-console = Console()
+console = LazyConsole(status=True)
 
 class GroqPlugin(CLAIIPlugin):
     """Plugin that adds Groq AI model support."""
@@ -33,6 +35,11 @@ class GroqPlugin(CLAIIPlugin):
                 "type": "string",
                 "description": "Groq API key"
             },
+            "base_url": {
+                "type": "string",
+                "default": "https://api.groq.com/openai/v1",
+                "description": "Groq API base URL"
+            },
             "temperature": {
                 "type": "float",
                 "default": 0.7,
@@ -42,29 +49,47 @@ class GroqPlugin(CLAIIPlugin):
                 "type": "integer",
                 "default": 1024,
                 "description": "Maximum tokens to generate"
+            },
+            "max_concurrency": {
+                "type": "integer",
+                "default": 8,
+                "description": "Maximum parallel requests when answering many messages"
+            },
+            "context_window": {
+                "type": "integer",
+                "default": 8192,
+                "description": "Context window of the configured model, in tokens"
             }
         }
     
     def get_models(self):
         """Return models provided by this plugin."""
+        config = self.config if isinstance(getattr(self, "config", None), dict) else {}
         return [{
             "name": "groq",
             "description": "Groq AI models with fast inference",
-            "handler": self.chat_groq
+            "handler": self.chat_groq,
+            "stream_handler": self.stream_groq,
+            "capabilities": {
+                "stream": True,
+                "max_concurrency": config.get("max_concurrency", 8),
+                "context_window": config.get("context_window", 8192)
+            }
         }]
     
-    def chat_groq(self, message: str):
-        """Chat with Groq model."""
+    def _build_request(self, message: str):
+        """Return ``(model, url, headers, payload)`` for a message, or an ErrorReply."""
         # Check if config is properly initialized
         if not hasattr(self, 'config') or not isinstance(self.config, dict):
-            return "[red]Plugin configuration error. Please disable and re-enable the plugin.[/red]"
+            return ErrorReply("[red]Plugin configuration error. Please disable and re-enable the plugin.[/red]", "plugin_config")
             
         if not self.config.get("api_key"):
-            return "[red]Groq API key not configured. Use 'claii config set plugins.settings.groq api_key YOUR_API_KEY'[/red]"
+            return ErrorReply("[red]Groq API key not configured. Use 'claii config set plugins.settings.groq api_key YOUR_API_KEY'[/red]", "missing_api_key")
         
         model = self.config.get("groq_model", "llama3-70b-8192")
         temperature = self.config.get("temperature", 0.7)
         max_tokens = self.config.get("max_tokens", 1024)
+        base_url = self.config.get("base_url", "https://api.groq.com/openai/v1").rstrip("/")
         
         # Apply prompt template
         formatted_prompt = build_prompt(message)
@@ -80,26 +105,96 @@ class GroqPlugin(CLAIIPlugin):
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+        return model, f"{base_url}/chat/completions", headers, payload
+    
+    def chat_groq(self, message: str):
+        """Chat with Groq model."""
+        request = self._build_request(message)
+        if isinstance(request, ErrorReply):
+            return request
+        model, url, headers, payload = request
         
         try:
             console.print(f"[yellow]Using Groq ({model})[/yellow]")
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
+            with self.span("request", model=model):
+                response = replay.http_post("groq", url, headers, payload)
             
             if response.status_code == 200:
                 result = response.json()
                 content = result["choices"][0]["message"]["content"]
+                usage = result.get("usage", {})
+                stats.annotate(model=model, tokens_in=usage.get("prompt_tokens"), tokens_out=usage.get("completion_tokens"))
                 log_history(message, content)
                 return content
             else:
-                error_msg = f"[red]Error from Groq API: {response.status_code} - {response.text}[/red]"
+                error_msg = ErrorReply(f"[red]Error from Groq API: {response.status_code} - {response.text}[/red]", f"http_{response.status_code}")
                 console.print(error_msg)
                 return error_msg
                 
         except Exception as e:
-            error_msg = f"[red]Error calling Groq API: {str(e)}[/red]"
+            error_msg = ErrorReply(f"[red]Error calling Groq API: {str(e)}[/red]", type(e).__name__)
             console.print(error_msg)
-            return error_msg 
\ No newline at end of file
+            return error_msg
+    
+    def stream_groq(self, message: str):
+        """Stream a reply from Groq, yielding text as it arrives."""
+        request = self._build_request(message)
+        if isinstance(request, ErrorReply):
+            yield request
+            return
+        model, url, headers, payload = request
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        
+        def produce():
+            with requests.post(url, headers=headers, json=payload, stream=True) as response:
+                if response.status_code != 200:
+                    raise GroqHTTPError(response.status_code, response.text)
+                response.encoding = "utf-8"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    # Groq reports usage in x_groq on the last chunk; OpenAI-style servers use "usage"
+                    usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+                    choices = chunk.get("choices") or [{}]
+                    yield replay.ReplayChunk(
+                        choices[0].get("delta", {}).get("content") or "",
+                        {"input_tokens": usage.get("prompt_tokens"), "output_tokens": usage.get("completion_tokens")} if usage else None
+                    )
+        
+        parts = []
+        usage = {}
+        try:
+            console.print(f"[yellow]Using Groq ({model})[/yellow]")
+            with self.span("stream", model=model):
+                for chunk in replay.stream("groq", {"url": url, "json": payload}, produce):
+                    usage = chunk.usage_metadata or usage
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield chunk.content
+        except GroqHTTPError as e:
+            error_msg = ErrorReply(f"[red]Error from Groq API: {e.status_code} - {e.text}[/red]", f"http_{e.status_code}")
+            console.print(error_msg)
+            yield error_msg
+            return
+        except Exception as e:
+            error_msg = ErrorReply(f"[red]Error calling Groq API: {str(e)}[/red]", type(e).__name__)
+            console.print(error_msg)
+            yield error_msg
+            return
+        
+        content = "".join(parts)
+        stats.annotate(model=model, tokens_in=usage.get("input_tokens"), tokens_out=usage.get("output_tokens"))
+        log_history(message, content)
+
+
+class GroqHTTPError(Exception):
+    """Non-200 response to a streaming request."""
+    
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
@@ -1,17 +1,83 @@
 import os
+import functools
 import importlib
 import importlib.util
 import inspect
 import sys
 import logging
+import threading
+import time
+from dataclasses import dataclass
 from typing import Dict, List, Any, Optional, Type
 from pathlib import Path
 
 from claii.plugins.base import CLAIIPlugin
 from claii.config import load_config, save_config
+from claii.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Seconds a plugin may take to initialize (and run on_load) before it is skipped
+DEFAULT_INIT_TIMEOUT = 2.0
+# Seconds a replaced plugin version gets to finish its calls before its on_unload runs anyway
+RETIRE_TIMEOUT = 60.0
+
+
+class _Activity:
+    """Counts calls in progress into one plugin instance's handlers."""
+
+    def __init__(self):
+        self._count = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            self._count += 1
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self._count -= 1
+            if not self._count:
+                self._condition.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._count, timeout)
+
+
+def _tracked_generator(generator, activity: _Activity):
+    try:
+        yield from generator
+    finally:
+        activity.__exit__()
+
+
+@dataclass
+class PluginTiming:
+    """Where a plugin's share of start-up time went."""
+    name: str
+    import_seconds: Optional[float] = None
+    init_seconds: Optional[float] = None
+    on_load_seconds: Optional[float] = None
+    status: str = "discovered"  # loaded, deferred (lazy on_load not run yet), failed, timed out
+    error: Optional[str] = None
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(value or 0 for value in (self.import_seconds, self.init_seconds, self.on_load_seconds))
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "import_seconds": self.import_seconds,
+            "init_seconds": self.init_seconds,
+            "on_load_seconds": self.on_load_seconds,
+            "total_seconds": self.total_seconds,
+            "error": self.error,
+        }
+
+
 class PluginManager:
     """Manages CLAII plugins."""
     
@@ -20,6 +86,12 @@ class PluginManager:
         self.commands: Dict[str, Dict[str, Any]] = {}
         self.models: Dict[str, Dict[str, Any]] = {}
         self.tools: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, PluginTiming] = {}
+        self._deferred = set()  # lazy plugin instances whose on_load hasn't run yet
+        self._on_load_lock = threading.Lock()
+        self._activity: Dict[str, _Activity] = {}  # calls in progress into each plugin's current version
+        self._sources: Dict[str, Path] = {}  # plugin name -> its directory
+        self._registry_lock = threading.RLock()
         self.config = load_config()
         
         # Ensure plugins config exists
@@ -32,24 +104,30 @@ class PluginManager:
     
     def discover_plugins(self) -> Dict[str, Type[CLAIIPlugin]]:
         """Discover available plugins in the plugins directory and installed packages."""
-        plugin_classes = {}
-        
-        # Built-in plugins directory
-        builtin_plugins_dir = Path(__file__).parent / "builtin"
-        if builtin_plugins_dir.exists():
-            plugin_classes.update(self._discover_in_directory(builtin_plugins_dir))
-        
-        # User plugins directory
-        user_plugins_dir = None
+        with span("plugins.discover"):
+            return self._discover_plugins()
+    
+    def plugin_directories(self) -> List[Path]:
+        """Where plugins are looked for: the built-in plugins, then the user's."""
         if sys.platform == "win32":
             user_plugins_dir = Path(os.environ.get("APPDATA")) / "CLAII" / "plugins"
         elif sys.platform == "darwin":
             user_plugins_dir = Path.home() / "Library" / "Application Support" / "CLAII" / "plugins"
         else:
             user_plugins_dir = Path.home() / ".config" / "CLAII" / "plugins"
+        return [Path(__file__).parent / "builtin", user_plugins_dir]
+
+    def plugin_sources(self) -> Dict[str, Path]:
+        """The directory each discovered plugin was imported from."""
+        return dict(self._sources)
+    
+    def _discover_plugins(self) -> Dict[str, Type[CLAIIPlugin]]:
+        plugin_classes = {}
         
-        if user_plugins_dir and user_plugins_dir.exists():
-            plugin_classes.update(self._discover_in_directory(user_plugins_dir))
+        # Built-in plugins, then user plugins (which can replace them)
+        for directory in self.plugin_directories():
+            if directory.exists():
+                plugin_classes.update(self._discover_in_directory(directory))
         
         # TODO: Discover plugins from installed Python packages
         
@@ -66,91 +144,344 @@ class PluginManager:
             plugin_init = plugin_dir / "__init__.py"
             if not plugin_init.exists():
                 continue
+            
+            plugin_classes.update(self._discover_module(plugin_dir))
+        
+        return plugin_classes
+    
+    def _discover_module(self, plugin_dir: Path) -> Dict[str, Type[CLAIIPlugin]]:
+        """Import one plugin directory (afresh each time) and return the plugin classes in it."""
+        plugin_classes = {}
+        try:
+            # Import the module
+            module_name = f"claii.plugins.{plugin_dir.name}"
+            spec = importlib.util.spec_from_file_location(module_name, plugin_dir / "__init__.py")
+            if not spec or not spec.loader:
+                return plugin_classes
                 
-            try:
-                # Import the module
-                module_name = f"claii.plugins.{plugin_dir.name}"
-                spec = importlib.util.spec_from_file_location(module_name, plugin_init)
-                if not spec or not spec.loader:
-                    continue
-                    
-                module = importlib.util.module_from_spec(spec)
+            module = importlib.util.module_from_spec(spec)
+            start = time.perf_counter()
+            with span("plugin.import", module=plugin_dir.name):
                 spec.loader.exec_module(module)
-                
-                # Find plugin classes
-                for _, obj in inspect.getmembers(module):
-                    if (inspect.isclass(obj) and issubclass(obj, CLAIIPlugin) 
-                            and obj is not CLAIIPlugin):
-                        # Create an instance to get the name
-                        try:
-                            plugin_instance = obj()
-                            plugin_name = str(plugin_instance.name)
-                            plugin_classes[plugin_name] = obj
-                        except Exception as e:
-                            logger.error(f"Error instantiating plugin class {obj.__name__}: {e}")
+            import_seconds = time.perf_counter() - start
             
-            except Exception as e:
-                logger.error(f"Error loading plugin from {plugin_dir}: {e}")
+            # Find plugin classes
+            for _, obj in inspect.getmembers(module):
+                if (inspect.isclass(obj) and issubclass(obj, CLAIIPlugin) 
+                        and obj is not CLAIIPlugin):
+                    # Create an instance to get the name
+                    try:
+                        plugin_instance = obj()
+                        plugin_name = str(plugin_instance.name)
+                        plugin_classes[plugin_name] = obj
+                        self._sources[plugin_name] = plugin_dir
+                        self.timings.setdefault(plugin_name, PluginTiming(plugin_name)).import_seconds = import_seconds
+                    except Exception as e:
+                        logger.error(f"Error instantiating plugin class {obj.__name__}: {e}")
+        
+        except Exception as e:
+            logger.error(f"Error loading plugin from {plugin_dir}: {e}")
         
         return plugin_classes
     
     def load_plugins(self) -> None:
         """Load all enabled plugins."""
-        plugin_classes = self.discover_plugins()
-        enabled_plugins = self.config["plugins"]["enabled"]
-        
-        for plugin_name in enabled_plugins:
-            if plugin_name in plugin_classes:
+        with span("plugins.load"):
+            plugin_classes = self.discover_plugins()
+            enabled_plugins = self.config["plugins"]["enabled"]
+            self._load([name for name in enabled_plugins if name in plugin_classes and name not in self.plugins],
+                       plugin_classes)
+
+    def init_timeout(self, plugin_name: str) -> float:
+        """The time budget for initializing a plugin: its ``init_timeout`` setting, else the plugins' one."""
+        settings = self.config["plugins"]["settings"].get(plugin_name, {})
+        return settings.get("init_timeout", self.config["plugins"].get("init_timeout", DEFAULT_INIT_TIMEOUT))
+
+    def _load(self, names: List[str], plugin_classes: Dict[str, Type[CLAIIPlugin]]) -> None:
+        """Initialize plugins concurrently, each within its time budget, then register them in order."""
+        results = self._initialize_all(names, plugin_classes)
+        for plugin_name in names:
+            result = results.get(plugin_name)
+            if isinstance(result, CLAIIPlugin):
+                self._swap(plugin_name, result)
+                logger.info(f"Loaded plugin: {plugin_name}")
+            else:
+                self._record_failure(plugin_name, result)
+
+    def _initialize_all(self, names: List[str], plugin_classes: Dict[str, Type[CLAIIPlugin]]) -> Dict[str, Any]:
+        """Initialize plugins on one thread each: name -> plugin, exception, or nothing if it ran out of time.
+
+        A plugin still initializing when its budget runs out is abandoned: its
+        thread (a daemon, so it doesn't hold up the exit) is left to finish, and
+        the plugin is then unloaded rather than registered, so whatever its
+        on_load set up is released.
+        """
+        results = {}
+        abandoned = set()
+        lock = threading.Lock()
+
+        def run(plugin_name):
+            try:
+                result = self._initialize(plugin_name, plugin_classes[plugin_name])
+            except Exception as e:
+                result = e
+            with lock:
+                if plugin_name not in abandoned:
+                    results[plugin_name] = result
+                    return
+            self._release_late(plugin_name, result)
+
+        started = time.monotonic()
+        threads = []
+        for plugin_name in names:
+            thread = threading.Thread(target=run, args=(plugin_name,), name=f"plugin-{plugin_name}", daemon=True)
+            thread.start()
+            threads.append((plugin_name, thread))
+        for plugin_name, thread in threads:
+            thread.join(max(0.0, started + self.init_timeout(plugin_name) - time.monotonic()))
+        with lock:
+            abandoned.update(name for name in names if name not in results)
+            return dict(results)
+
+    def _release_late(self, plugin_name: str, result) -> None:
+        """Unload a plugin that finished initializing after it was skipped for running out of time."""
+        timing = self.timings.setdefault(plugin_name, PluginTiming(plugin_name))
+        timing.status = "timed out"
+        if not isinstance(result, CLAIIPlugin):
+            timing.error = f"failed after its {self.init_timeout(plugin_name):g}s budget: {result}"
+            return
+        timing.error = f"ready after {timing.total_seconds:.2f}s, past its {self.init_timeout(plugin_name):g}s budget; unloaded"
+        try:
+            self._unload(result)
+        except Exception as e:
+            timing.error = f"ready past its {self.init_timeout(plugin_name):g}s budget; on_unload failed: {e}"
+            logger.error(f"Error unloading plugin {plugin_name} after it timed out: {e}")
+
+    def _record_failure(self, plugin_name: str, result) -> None:
+        timing = self.timings.setdefault(plugin_name, PluginTiming(plugin_name))
+        if result is None:
+            timing.status = "timed out"
+            timing.error = f"not ready within {self.init_timeout(plugin_name):g}s"
+            logger.warning(f"Skipped plugin {plugin_name}: initialization took longer than {self.init_timeout(plugin_name):g}s")
+        else:
+            timing.status = "failed"
+            timing.error = str(result) or type(result).__name__
+            logger.error(f"Error initializing plugin {plugin_name}: {result}")
+
+    def _initialize(self, plugin_name: str, plugin_class: Type[CLAIIPlugin]) -> CLAIIPlugin:
+        """Create and initialize a plugin, and run its on_load unless it is lazy (runs on a loader thread)."""
+        timing = self.timings.setdefault(plugin_name, PluginTiming(plugin_name))
+        with span("plugin.load", plugin=plugin_name):
+            start = time.perf_counter()
+            plugin_instance = plugin_class()
+            plugin_config = self.config["plugins"]["settings"].get(plugin_name, {})
+            with span("plugin.initialize", plugin=plugin_name):
+                plugin_instance.initialize(plugin_config)
+            timing.init_seconds = time.perf_counter() - start
+
+            if getattr(plugin_instance, "lazy_load", False):
+                self._deferred.add(plugin_instance)
+                timing.status = "deferred"
+                return plugin_instance
+            start = time.perf_counter()
+            with span("plugin.on_load", plugin=plugin_name):
+                plugin_instance.on_load()
+            timing.on_load_seconds = time.perf_counter() - start
+            timing.status = "loaded"
+        return plugin_instance
+
+    def ensure_loaded(self, plugin_name: str) -> None:
+        """Run a lazy plugin's on_load if it hasn't run yet."""
+        plugin = self.plugins.get(plugin_name)
+        if plugin is not None:
+            self._run_deferred(plugin)
+
+    def _run_deferred(self, plugin: CLAIIPlugin) -> None:
+        """Run a lazy plugin instance's on_load once, whichever thread gets here first."""
+        if plugin not in self._deferred:
+            return
+        with self._on_load_lock:
+            if plugin not in self._deferred:
+                return
+            timing = self.timings.setdefault(plugin.name, PluginTiming(plugin.name))
+            start = time.perf_counter()
+            try:
+                with span("plugin.on_load", plugin=plugin.name, lazy=True):
+                    plugin.on_load()
+                timing.status = "loaded"
+            except Exception as e:
+                timing.status = "failed"
+                timing.error = str(e) or type(e).__name__
+                logger.error(f"Error in on_load of plugin {plugin.name}: {e}")
+            finally:
+                timing.on_load_seconds = time.perf_counter() - start
+                self._deferred.discard(plugin)
+
+    def _wrap_handlers(self, plugin: CLAIIPlugin, entry: Dict[str, Any], activity: _Activity) -> Dict[str, Any]:
+        """``entry`` with its handlers wrapped to run a deferred on_load first and to count calls in progress.
+
+        A call counts until a returned generator is exhausted or a coroutine
+        finishes, so a reload waits for streams still being read.
+        """
+        def wrap(handler):
+            if inspect.iscoroutinefunction(handler):
+                @functools.wraps(handler)
+                async def async_wrapper(*args, **kwargs):
+                    self._run_deferred(plugin)
+                    with activity:
+                        return await handler(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                self._run_deferred(plugin)
+                activity.__enter__()
                 try:
-                    plugin_class = plugin_classes[plugin_name]
-                    plugin_instance = plugin_class()
-                    
-                    # Initialize with config
-                    plugin_config = self.config["plugins"]["settings"].get(plugin_name, {})
-                    plugin_instance.initialize(plugin_config)
-                    
-                    # Register plugin
-                    self.plugins[plugin_name] = plugin_instance
-                    
-                    # Register plugin commands, models, and tools
-                    self._register_plugin_components(plugin_instance)
-                    
-                    # Call on_load
-                    plugin_instance.on_load()
-                    
-                    logger.info(f"Loaded plugin: {plugin_name}")
-                    
-                except Exception as e:
-                    logger.error(f"Error initializing plugin {plugin_name}: {e}")
+                    result = handler(*args, **kwargs)
+                except BaseException:
+                    activity.__exit__()
+                    raise
+                if inspect.isgenerator(result):
+                    return _tracked_generator(result, activity)
+                activity.__exit__()
+                return result
+            return wrapper
+
+        return {key: wrap(value) if callable(value) and key.endswith("handler") else value for key, value in entry.items()}
     
-    def _register_plugin_components(self, plugin: CLAIIPlugin) -> None:
-        """Register a plugin's commands, models, and tools."""
+    def _register_plugin_components(self, plugin: CLAIIPlugin, commands=None, models=None, tools=None) -> None:
+        """Register a plugin's commands, models, and tools (into the given dicts, else the live ones)."""
+        commands = self.commands if commands is None else commands
+        models = self.models if models is None else models
+        tools = self.tools if tools is None else tools
+        activity = self._activity[plugin.name] = _Activity()
+
         # Register commands
         for command in plugin.get_commands():
             command_name = command.get("name")
             if command_name:
-                self.commands[command_name] = {
+                commands[command_name] = {
                     "plugin": plugin.name,
-                    **command
+                    **self._wrap_handlers(plugin, command, activity)
                 }
         
         # Register models
         for model in plugin.get_models():
             model_name = model.get("name")
             if model_name:
-                self.models[model_name] = {
+                models[model_name] = {
                     "plugin": plugin.name,
-                    **model
+                    **self._wrap_handlers(plugin, model, activity)
                 }
         
         # Register tools
         for tool in plugin.get_tools():
             tool_name = tool.get("name")
             if tool_name:
-                self.tools[tool_name] = {
+                tools[tool_name] = {
                     "plugin": plugin.name,
-                    **tool
+                    **self._wrap_handlers(plugin, tool, activity)
                 }
+
+    def _swap(self, plugin_name: str, plugin: CLAIIPlugin) -> None:
+        """Put ``plugin`` in place of any earlier version in one step.
+
+        New registries are built aside and then assigned, so a lookup sees the
+        old version or the new one, never a mix; handlers already looked up keep
+        running on the version they came from.
+        """
+        with self._registry_lock:
+            commands = {name: cmd for name, cmd in self.commands.items() if cmd.get("plugin") != plugin_name}
+            models = {name: model for name, model in self.models.items() if model.get("plugin") != plugin_name}
+            tools = {name: tool for name, tool in self.tools.items() if tool.get("plugin") != plugin_name}
+            self._register_plugin_components(plugin, commands, models, tools)
+            self.plugins[plugin_name] = plugin
+            self.commands, self.models, self.tools = commands, models, tools
+
+    def _unload(self, plugin: CLAIIPlugin) -> None:
+        """Call on_unload, unless on_load was deferred and never ran."""
+        if plugin in self._deferred:
+            self._deferred.discard(plugin)
+        else:
+            plugin.on_unload()
+
+    def _retire(self, plugin: CLAIIPlugin, activity: Optional[_Activity]) -> None:
+        """Unload a replaced plugin version once calls into it have finished (waiting on a background thread)."""
+        def retire():
+            if activity is not None and not activity.wait_idle(RETIRE_TIMEOUT):
+                logger.warning(f"Old version of plugin {plugin.name} still busy after {RETIRE_TIMEOUT:g}s; unloading it")
+            try:
+                self._unload(plugin)
+            except Exception as e:
+                logger.error(f"Error unloading old version of plugin {plugin.name}: {e}")
+
+        if activity is None or activity.wait_idle(0):
+            retire()
+        else:
+            threading.Thread(target=retire, name=f"plugin-retire-{plugin.name}", daemon=True).start()
+
+    def reload_plugin(self, plugin_name: str) -> bool:
+        """Re-import a plugin from its directory and swap the new version in.
+
+        Calls already running finish on the old version, whose on_unload runs
+        after them. If the new version fails to import or initialize, the old
+        one stays in place.
+        """
+        source = self._sources.get(plugin_name)
+        if source is None:
+            return False
+        with span("plugin.reload", plugin=plugin_name):
+            # Submodules imported by the plugin are imported again too
+            prefix = f"claii.plugins.{source.name}."
+            for module_name in [name for name in sys.modules if name.startswith(prefix)]:
+                del sys.modules[module_name]
+            plugin_classes = self._discover_module(source) if (source / "__init__.py").exists() else {}
+            if plugin_name not in plugin_classes:
+                self._record_failure(plugin_name, LookupError(f"no plugin named {plugin_name} in {source}"))
+                return False
+            result = self._initialize_all([plugin_name], plugin_classes).get(plugin_name)
+            if not isinstance(result, CLAIIPlugin):
+                self._record_failure(plugin_name, result)
+                return False
+            with self._registry_lock:
+                old, activity = self.plugins.get(plugin_name), self._activity.get(plugin_name)
+                self._swap(plugin_name, result)
+        if old is not None:
+            self._retire(old, activity)
+        logger.info(f"Reloaded plugin: {plugin_name}")
+        return True
+
+    def load_directory(self, plugin_dir: Path) -> List[str]:
+        """Import one plugin directory and load the enabled plugins in it that aren't loaded yet; returns their names."""
+        plugin_classes = self._discover_module(plugin_dir)
+        enabled = self.config["plugins"]["enabled"]
+        names = [name for name in plugin_classes if name in enabled and name not in self.plugins]
+        self._load(names, plugin_classes)
+        return [name for name in names if name in self.plugins]
+
+    def sync_enabled(self) -> Dict[str, str]:
+        """Catch up with the config file: load newly enabled plugins, unload disabled ones, reload changed settings.
+
+        Returns what happened to each affected plugin.
+        """
+        config = load_config()
+        config.setdefault("plugins", {"enabled": [], "settings": {}})
+        old_settings = self.config["plugins"].get("settings", {})
+        self.config = config
+        enabled = config["plugins"].get("enabled", [])
+        changes = {}
+        for plugin_name in [name for name in self.plugins if name not in enabled]:
+            self._remove(plugin_name)
+            changes[plugin_name] = "unloaded"
+        for plugin_name in [name for name in self.plugins if name in enabled]:
+            if config["plugins"].get("settings", {}).get(plugin_name) != old_settings.get(plugin_name):
+                changes[plugin_name] = "reloaded" if self.reload_plugin(plugin_name) else "reload failed"
+        new = [name for name in enabled if name not in self.plugins]
+        if new:
+            plugin_classes = self.discover_plugins()
+            self._load([name for name in new if name in plugin_classes], plugin_classes)
+            changes.update({name: "loaded" for name in new if name in self.plugins})
+        return changes
     
     def enable_plugin(self, plugin_name: str) -> bool:
         """Enable a plugin."""
@@ -165,49 +496,16 @@ class PluginManager:
         
         # Load the plugin if it's not already loaded
         if plugin_name not in self.plugins:
-            try:
-                plugin_class = plugin_classes[plugin_name]
-                plugin_instance = plugin_class()
-                
-                # Initialize with config
-                plugin_config = self.config["plugins"]["settings"].get(plugin_name, {})
-                plugin_instance.initialize(plugin_config)
-                
-                # Register plugin
-                self.plugins[plugin_name] = plugin_instance
-                
-                # Register plugin commands, models, and tools
-                self._register_plugin_components(plugin_instance)
-                
-                # Call on_load
-                plugin_instance.on_load()
-                
-                logger.info(f"Loaded plugin: {plugin_name}")
-                return True
-                
-            except Exception as e:
-                logger.error(f"Error initializing plugin {plugin_name}: {e}")
-                return False
+            self._load([plugin_name], plugin_classes)
+            return plugin_name in self.plugins
         
         return True
     
     def disable_plugin(self, plugin_name: str) -> bool:
         """Disable a plugin."""
         if plugin_name in self.plugins:
-            try:
-                # Call on_unload
-                self.plugins[plugin_name].on_unload()
-                
-                # Unregister commands, models, and tools
-                self._unregister_plugin_components(plugin_name)
-                
-                # Remove plugin
-                del self.plugins[plugin_name]
-                
-                logger.info(f"Unloaded plugin: {plugin_name}")
-            except Exception as e:
-                logger.error(f"Error unloading plugin {plugin_name}: {e}")
-                return False
+            self._remove(plugin_name)
+            logger.info(f"Unloaded plugin: {plugin_name}")
         
         # Update config
         if plugin_name in self.config["plugins"]["enabled"]:
@@ -216,6 +514,13 @@ class PluginManager:
         
         return True
     
+    def _remove(self, plugin_name: str) -> None:
+        """Take a plugin out of the registries; its on_unload runs once calls into it have finished."""
+        with self._registry_lock:
+            plugin, activity = self.plugins.pop(plugin_name), self._activity.pop(plugin_name, None)
+            self._unregister_plugin_components(plugin_name)
+        self._retire(plugin, activity)
+
     def _unregister_plugin_components(self, plugin_name: str) -> None:
         """Unregister a plugin's commands, models, and tools."""
         # Unregister commands
@@ -250,6 +555,23 @@ class PluginManager:
             return model_info.get("handler")
         return None
     
+    def get_model_capabilities(self, model_name: str) -> Dict[str, Any]:
+        """Get what a model supports beyond the plain handler.
+        
+        A capability is available when its handler is provided and the model's
+        ``capabilities`` dict doesn't switch it off.
+        """
+        model_info = self.models.get(model_name, {})
+        declared = model_info.get("capabilities", {})
+        return {
+            "stream": bool(model_info.get("stream_handler")) and declared.get("stream", True) is not False,
+            "async": bool(model_info.get("async_handler")) and declared.get("async", True) is not False,
+            "batch": bool(model_info.get("batch_handler")) and declared.get("batch", True) is not False,
+            "max_concurrency": declared.get("max_concurrency"),
+            "max_batch_size": declared.get("max_batch_size"),
+            "context_window": declared.get("context_window"),
+        }
+    
     def get_command_handler(self, command_name: str):
         """Get the handler for a command."""
         if command_name in self.commands:
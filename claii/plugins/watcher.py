@@ -0,0 +1,219 @@
+"""Reload plugins when their files or the plugin config change.
+
+Long-lived processes (``claii repl``, anything embedding the plugin manager)
+can keep a :class:`PluginWatcher` running. It watches the built-in and user
+plugin directories and the config file:
+
+- a change under a loaded plugin's directory re-imports that plugin and swaps
+  it in (see :meth:`PluginManager.reload_plugin`); calls already running
+  finish on the old version;
+- a new plugin directory named after an enabled plugin is imported and loaded
+  (nothing else is imported for it);
+- a plugin enabled, disabled or reconfigured in the config (say by ``claii
+  system enable-plugin`` in another terminal) is loaded, unloaded or reloaded
+  to match.
+
+Dotfiles (editor swap and lock files) and ``__pycache__`` are ignored.
+
+On Linux the watcher sleeps on inotify, so a save is picked up at once;
+elsewhere, or when inotify isn't available, it compares modification times
+every ``interval`` seconds. Either way the files are compared with the last
+snapshot, so an editor writing a file several times causes one reload.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from claii.config import CONFIG_PATH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 1.0
+# After inotify wakes the watcher, wait this long for the rest of a save to land
+SETTLE_SECONDS = 0.1
+
+# IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_INOTIFY_MASK = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+
+class _Inotify:
+    """Just enough inotify (through libc) to sleep until something in a set of directories changes."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched = set()
+
+    def watch(self, directories: List[str]) -> None:
+        # A deleted directory loses its watch, so forget it and add it again if it comes back
+        self._watched = {path for path in self._watched if os.path.isdir(path)}
+        for path in directories:
+            if path not in self._watched and self._libc.inotify_add_watch(self.fd, os.fsencode(path), _INOTIFY_MASK) >= 0:
+                self._watched.add(path)
+
+    def wait(self, timeout: float) -> bool:
+        """Whether anything changed within ``timeout`` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(ready)
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _ignored(name: str) -> bool:
+    return name.startswith(".") or name == "__pycache__"
+
+
+def _open_inotify() -> Optional[_Inotify]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError) as e:
+        logger.info(f"inotify not available, polling plugin files instead: {e}")
+        return None
+
+
+class PluginWatcher:
+    """Watch plugin files and the config, and bring the plugin manager in line when they change.
+
+    ``on_change`` is called (on the watcher's thread) with what happened to
+    each affected plugin: ``"reloaded"``, ``"reload failed"``, ``"loaded"`` or
+    ``"unloaded"``.
+    """
+
+    def __init__(self, manager=None, interval: float = DEFAULT_INTERVAL,
+                 on_change: Optional[Callable[[Dict[str, str]], None]] = None, use_inotify: bool = True):
+        if manager is None:
+            from claii.plugins.manager import plugin_manager as manager
+        self.manager = manager
+        self.interval = interval
+        self.on_change = on_change
+        self._use_inotify = use_inotify
+        self._inotify: Optional[_Inotify] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._files = self.snapshot()
+
+    def _directories(self) -> List[str]:
+        """The plugin directories and everything under them, plus the config directory."""
+        directories = [str(CONFIG_PATH.parent)]
+        for root in self.manager.plugin_directories():
+            for path, subdirectories, _ in os.walk(root):
+                subdirectories[:] = [name for name in subdirectories if not _ignored(name)]
+                directories.append(path)
+        return directories
+
+    def snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Modification time and size of every plugin source file and the config file."""
+        files = {}
+        for directory in self._directories()[1:]:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.endswith(".py") and not _ignored(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        try:
+            stat = os.stat(CONFIG_PATH)
+            files[str(CONFIG_PATH)] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+        return files
+
+    def check(self) -> Dict[str, str]:
+        """Compare the files with the last snapshot and reload, load or unload plugins to match."""
+        current = self.snapshot()
+        changed = {path for path in current.keys() | self._files.keys() if current.get(path) != self._files.get(path)}
+        self._files = current
+        if not changed:
+            return {}
+
+        results = {}
+        if str(CONFIG_PATH) in changed:
+            changed.discard(str(CONFIG_PATH))
+            results.update(self.manager.sync_enabled())
+
+        sources = self.manager.plugin_sources()
+        unclaimed = set(changed)
+        for name, source in sources.items():
+            inside = {path for path in changed if path.startswith(f"{source}{os.sep}")}
+            unclaimed -= inside
+            if inside and name in self.manager.plugins and name not in results:
+                results[name] = "reloaded" if self.manager.reload_plugin(name) else "reload failed"
+
+        # A plugin directory nothing was loaded from yet: import just that one, if it is named after an enabled plugin
+        enabled = self.manager.config["plugins"]["enabled"]
+        for plugin_dir in self._new_plugin_directories(unclaimed):
+            if plugin_dir.name in enabled and plugin_dir.name not in self.manager.plugins:
+                results.update({name: "loaded" for name in self.manager.load_directory(plugin_dir)})
+
+        if results and self.on_change:
+            self.on_change(results)
+        return results
+
+    def _new_plugin_directories(self, paths) -> List[Path]:
+        """The top-level plugin directories (with an ``__init__.py``) the changed ``paths`` are in."""
+        directories = set()
+        for root in self.manager.plugin_directories():
+            for path in paths:
+                parts = Path(path).relative_to(root).parts if path.startswith(f"{root}{os.sep}") else ()
+                if len(parts) > 1 and (root / parts[0] / "__init__.py").exists():
+                    directories.add(root / parts[0])
+        return sorted(directories)
+
+    def start(self) -> "PluginWatcher":
+        """Watch on a daemon thread until :meth:`stop`."""
+        if self._use_inotify:
+            self._inotify = _open_inotify()
+        self._thread = threading.Thread(target=self._run, name="plugin-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                self._inotify.watch(self._directories())
+                if self._inotify.wait(self.interval):
+                    self._stop.wait(SETTLE_SECONDS)
+                    self._inotify.drain()
+            else:
+                self._stop.wait(self.interval)
+            if self._stop.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error reloading plugins: {e}")
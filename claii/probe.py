@@ -0,0 +1,245 @@
+"""Check which providers can answer right now, all at once.
+
+``claii tools list`` probes every built-in provider and every plugin model in
+parallel, within one short deadline (``probe_timeout``, default 3 seconds).
+For each it measures:
+
+- the TCP connect time to the provider's API host, and
+- the round trip of the cheapest request the API has (listing models), which
+  also catches a rejected API key.
+
+Providers without an API key aren't contacted. Plugin models are probed through
+the ``health_handler`` in their model entry, if they register one.
+
+The results are stored in ``provider_status.json`` next to the config file.
+With ``--tool auto``, :func:`claii.ai.gen_reply` passes over providers found
+down less than ``provider_status_ttl`` seconds ago (default 300) without trying
+them.
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from claii.config import CONFIG_DIR
+from claii.tracing import span
+
+logger = logging.getLogger(__name__)
+
+STATUS_PATH = CONFIG_DIR / "provider_status.json"
+DEFAULT_PROBE_TIMEOUT = 3.0
+DEFAULT_STATUS_TTL = 300.0
+
+# The order --tool auto tries providers in
+AUTO_ORDER = ("ollama", "openai", "deepseek", "perplexity", "mistral", "gemini")
+PROVIDERS = AUTO_ORDER + ("openai-compatible",)
+
+# Where a cheap authenticated request goes, and how the key is sent
+_CLOUD = {
+    "openai": ("https://api.openai.com/v1/models", "bearer"),
+    "deepseek": ("https://api.deepseek.com/models", "bearer"),
+    # chat_perplexity goes through LangChain's ChatAnthropic, so that is the API it needs
+    "perplexity": ("https://api.anthropic.com/v1/models", "x-api-key"),
+    "mistral": ("https://api.mistral.ai/v1/models", "bearer"),
+    "gemini": ("https://generativelanguage.googleapis.com/v1beta/models", "x-goog-api-key"),
+}
+
+
+@dataclass
+class ProbeResult:
+    name: str
+    kind: str  # "provider" or "plugin"
+    status: str  # "up", "down", "unconfigured", or "unknown" (a plugin model without a health check)
+    connect_ms: Optional[float] = None
+    round_trip_ms: Optional[float] = None
+    detail: str = ""
+    checked_at: float = field(default_factory=time.time)
+
+    @property
+    def available(self) -> bool:
+        return self.status in ("up", "unknown")
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "status": self.status,
+            "available": self.available,
+            "connect_ms": self.connect_ms,
+            "round_trip_ms": self.round_trip_ms,
+            "detail": self.detail,
+            "checked_at": self.checked_at,
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _targets(name: str, config) -> Optional[List[Tuple[str, Dict[str, str]]]]:
+    """The URLs (with headers) to probe for a built-in provider, or None if it isn't configured."""
+    if name == "ollama":
+        from claii.model_select import ollama_url
+        endpoints = config.get("ollama_endpoints") or []
+        urls = [entry if isinstance(entry, str) else entry["url"] for entry in endpoints] or [ollama_url(config)]
+        return [(f"{url.rstrip('/')}/api/tags", {}) for url in urls]
+    if name == "openai-compatible":
+        base_url = config.get("openai_compatible_base_url")
+        if not base_url:
+            return None
+        headers = dict(config.get("openai_compatible_headers") or {})
+        if config.get("openai_compatible_api_key"):
+            headers["Authorization"] = f"Bearer {config['openai_compatible_api_key']}"
+        return [(f"{base_url.rstrip('/')}/models", headers)]
+    key = config.get(f"{name}_api_key")
+    if not key:
+        return None
+    url, scheme = _CLOUD[name]
+    if scheme == "bearer":
+        headers = {"Authorization": f"Bearer {key}"}
+    else:
+        headers = {scheme: key}
+    if name == "perplexity":
+        headers["anthropic-version"] = "2023-06-01"
+    return [(url, headers)]
+
+
+def _probe_url(url: str, headers: Dict[str, str], timeout: float) -> Tuple[float, float, Optional[str]]:
+    """Connect time, round trip and the problem found (None if the request succeeded)."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    start = time.perf_counter()
+    socket.create_connection((parts.hostname, port), timeout=timeout).close()
+    connect = time.perf_counter() - start
+    start = time.perf_counter()
+    response = requests.get(url, headers=headers, timeout=timeout)
+    round_trip = time.perf_counter() - start
+    if response.status_code in (401, 403):
+        return connect, round_trip, f"API key rejected (HTTP {response.status_code})"
+    if not response.ok:
+        return connect, round_trip, f"HTTP {response.status_code}"
+    return connect, round_trip, None
+
+
+def probe_provider(name: str, config, timeout: float = DEFAULT_PROBE_TIMEOUT) -> ProbeResult:
+    """Probe one built-in provider. An Ollama pool is up if any of its servers is."""
+    with span("probe.provider", provider=name):
+        targets = _targets(name, config)
+        if targets is None:
+            return ProbeResult(name, "provider", "unconfigured", detail="no API key" if name in _CLOUD else "not configured")
+        problems = []
+        for url, headers in targets:
+            try:
+                connect, round_trip, problem = _probe_url(url, headers, timeout)
+            except (OSError, requests.RequestException) as e:
+                problems.append(f"{urlsplit(url).netloc}: {_describe(e)}")
+                continue
+            if problem is None:
+                return ProbeResult(name, "provider", "up", _ms(connect), _ms(round_trip), urlsplit(url).netloc)
+            problems.append(problem)
+        detail = "; ".join(problems)
+        if name == "ollama" and len(targets) == 1 and urlsplit(targets[0][0]).hostname in ("localhost", "127.0.0.1") \
+                and not shutil.which("ollama"):
+            detail = "not installed"
+        return ProbeResult(name, "provider", "down", detail=detail)
+
+
+def _describe(error: BaseException) -> str:
+    if isinstance(error, (socket.timeout, requests.Timeout)):
+        return "timed out"
+    if isinstance(error, ConnectionRefusedError):
+        return "connection refused"
+    if isinstance(error, socket.gaierror):
+        return "host not found"
+    return str(error) or type(error).__name__
+
+
+def probe_plugin_model(name: str, model_info) -> ProbeResult:
+    """Probe a plugin model through its ``health_handler`` (no arguments; falsy or raising means down)."""
+    health_handler = model_info.get("health_handler")
+    if health_handler is None:
+        return ProbeResult(name, "plugin", "unknown", detail=f"from plugin {model_info.get('plugin')}, no health check")
+    with span("probe.plugin_model", model=name):
+        start = time.perf_counter()
+        try:
+            healthy = health_handler()
+        except Exception as e:
+            return ProbeResult(name, "plugin", "down", detail=str(e) or type(e).__name__)
+        round_trip = time.perf_counter() - start
+    return ProbeResult(name, "plugin", "up" if healthy else "down", round_trip_ms=_ms(round_trip),
+                       detail="" if healthy else "health check failed")
+
+
+def probe_all(config, models: Optional[Dict] = None, timeout: Optional[float] = None) -> List[ProbeResult]:
+    """Probe every built-in provider and plugin model at once; anything still going after ``timeout`` counts as down.
+
+    The probes run on daemon threads, so one stuck past the deadline doesn't hold up the exit.
+    """
+    timeout = timeout or config.get("probe_timeout", DEFAULT_PROBE_TIMEOUT)
+    probes: Dict[str, Callable[[], ProbeResult]] = {
+        name: (lambda name=name: probe_provider(name, config, timeout)) for name in PROVIDERS
+    }
+    for name, model_info in (models or {}).items():
+        probes.setdefault(name, lambda name=name, model_info=model_info: probe_plugin_model(name, model_info))
+
+    results: Dict[str, ProbeResult] = {}
+    threads = []
+    with span("probe.all", count=len(probes)):
+        def run(name, probe):
+            try:
+                results[name] = probe()
+            except Exception as e:
+                logger.warning(f"Probing {name} failed: {e}")
+                results[name] = ProbeResult(name, "plugin" if name in (models or {}) else "provider", "down", detail=str(e))
+
+        for name, probe in probes.items():
+            thread = threading.Thread(target=run, args=(name, probe), name=f"probe-{name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    finished = dict(results)
+    return [finished.get(name) or ProbeResult(name, "plugin" if name in (models or {}) else "provider", "down",
+                                              detail=f"no answer within {timeout:g}s")
+            for name in probes]
+
+
+# Status file
+
+def load_status() -> Dict[str, Dict]:
+    """The last probe result of each provider, by name."""
+    try:
+        with open(STATUS_PATH) as f:
+            return json.load(f).get("providers", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_status(results: List[ProbeResult]) -> None:
+    """Store probe results, keeping earlier ones for names not probed this time."""
+    providers = load_status()
+    providers.update({result.name: result.as_dict() for result in results})
+    os.makedirs(STATUS_PATH.parent, exist_ok=True)
+    tmp_path = f"{STATUS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"updated_at": time.time(), "providers": providers}, f, indent=2)
+    os.replace(tmp_path, STATUS_PATH)
+
+
+def known_down(status: Dict[str, Dict], name: str, ttl: float = DEFAULT_STATUS_TTL) -> Optional[Dict]:
+    """The stored result for ``name`` if it was found down within the last ``ttl`` seconds."""
+    entry = status.get(name)
+    if entry and entry.get("status") == "down" and time.time() - entry.get("checked_at", 0) < ttl:
+        return entry
+    return None
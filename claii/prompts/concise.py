@@ -1,42 +1,43 @@
-from langchain_core.prompts import PromptTemplate
+import contextvars
 import platform
+from contextlib import contextmanager
+from claii.tracing import span
 
-SHORT_ANSWER_PROMPT_POSIX = PromptTemplate(
-    input_variables=["query"],
-    template=(
-        "You are a concise assistant. Answer the following query in as little words as possible. "
-        "If the user asks for a command, return only the command itself without extra explanation. "
-        "You should not include any english words in your response if possible. "
-        "You must always use a posix compliant command. you can assume that the user has the necessary permissions to run the command. "
-        "if the command requires a specific file, you can assume that the file exists. "
-        "if the command requires a specific binary, instruct the user to install the necessary package. "
-        "you must always return a command that is safe to run. "
-        "you must always assume the user does not have any binaries installed. "
-        "do not add any characters to the command that are not necessary. "
-        "Query: {query}"
-    ),
-)
-
-SHORT_ANSWER_PROMPT_POWERSHELL = PromptTemplate(
-    input_variables=["query"],
-    template=(
-        "You are a concise assistant. Answer the following query in as little words as possible. "
-        "If the user asks for a command, return only the command itself without extra explanation. "
-        "You should not include any english words in your response if possible. "
-        "You must always use a powershell compliant command. you can assume that the user has the necessary permissions to run the command. "
-        "if the command requires a specific file, you can assume that the file exists. "
-        "if the command requires a specific binary, instruct the user to install the necessary package. "
-        "you must always return a command that is safe to run. "
-        "you must always assume the user does not have any binaries installed. "
-        "do not add any characters to the command that are not necessary. "
-        "Query: {query}"
-    ),
-)
-
-
-def build_prompt(message:str):
-    if platform.system() == "Windows":
-        return SHORT_ANSWER_PROMPT_POWERSHELL.format(query=message)
-    else:
-        return SHORT_ANSWER_PROMPT_POSIX.format(query=message)
+from claii.prompts.registry import template_for
 
+# Bump when the prompts change, so replies to the old prompt aren't shared with new requests
+PROMPT_VERSION = 2
+
+
+_raw = contextvars.ContextVar("claii_raw_prompts", default=False)
+
+
+@contextmanager
+def raw_prompts():
+    """Send messages in this block to the model as they are, e.g. prompts that aren't asking for a command."""
+    token = _raw.set(True)
+    try:
+        yield
+    finally:
+        _raw.reset(token)
+
+
+def target_shell() -> str:
+    """The shell commands are asked for: "powershell" on Windows, otherwise "posix"."""
+    return "powershell" if platform.system() == "Windows" else "posix"
+
+
+def build_prompt(message: str, provider: str = None, model: str = None, config=None) -> str:
+    """The prompt for ``message`` as one string, using the template for ``provider`` and ``model``."""
+    with span("prompt.build", provider=provider):
+        if _raw.get():
+            return message
+        return template_for(provider, model, config, target_shell()).text(message)
+
+
+def build_messages(message: str, provider: str = None, model: str = None, config=None):
+    """The prompt for ``message`` as ``(role, content)`` chat messages, with a system message if the template has one."""
+    with span("prompt.build", provider=provider):
+        if _raw.get():
+            return [("user", message)]
+        return template_for(provider, model, config, target_shell()).messages(message)
@@ -0,0 +1,156 @@
+"""Prompt templates per provider and model, compiled once.
+
+Every command request is wrapped in instructions. How much instruction a model
+needs depends on the model:
+
+- ``compact``: a one-line instruction for small local models (Ollama), where
+  each prompt token costs prompt-evaluation time on every request;
+- ``system``: the instructions as a system message and the query alone as the
+  user message, for API chat models;
+- ``full``: the original long instruction text, for everything else (plugin
+  models, unknown providers).
+
+The choice can be changed with ``prompt_templates`` in the config, keyed by
+provider or ``provider:model-pattern``::
+
+    "prompt_templates": {"ollama": "full", "ollama:llama3*:70b": "system"}
+
+Templates are formatted for both target shells at import, so building a prompt
+is a string concatenation. A query too long for the template's token budget
+(``max_prompt_tokens``, default 3072 for ``compact`` and 16000 otherwise) is
+cut, so the instructions are never what the model drops.
+"""
+
+import fnmatch
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from claii.prompts.tokens import count_tokens, truncate
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_NOTE = "\n[... input truncated ...]"
+
+_FULL = (
+    "You are a concise assistant. Answer the following query in as little words as possible. "
+    "If the user asks for a command, return only the command itself without extra explanation. "
+    "You should not include any english words in your response if possible. "
+    "You must always use a {shell} compliant command. you can assume that the user has the necessary permissions to run the command. "
+    "if the command requires a specific file, you can assume that the file exists. "
+    "if the command requires a specific binary, instruct the user to install the necessary package. "
+    "you must always return a command that is safe to run. "
+    "you must always assume the user does not have any binaries installed. "
+    "do not add any characters to the command that are not necessary. "
+    "Query: "
+)
+
+_COMPACT = "Reply with only a {shell_title} command, no explanation. Assume files exist; keep it safe.\nQuery: "
+
+_SYSTEM = (
+    "Turn the user's request into a {shell_title} command. Reply with the command only: no explanation, no Markdown. "
+    "Assume referenced files exist and the user has the permissions needed. "
+    "If a program may not be installed, include the command that installs it. Keep commands safe to run."
+)
+
+# name: (system message, text before the query, text after it, default token budget)
+TEMPLATES: Dict[str, Tuple[str, str, str, int]] = {
+    "full": ("", _FULL, "", 16000),
+    "compact": ("", _COMPACT, "", 3072),
+    "system": (_SYSTEM, "", "", 16000),
+}
+
+# The template for each provider unless `prompt_templates` says otherwise; "full" for the rest
+DEFAULT_TEMPLATES = {
+    "ollama": "compact",
+    "openai": "system",
+    "openai-compatible": "system",
+    "deepseek": "system",
+    "perplexity": "system",
+    "mistral": "system",
+    "gemini": "system",
+}
+
+# {shell} as the original prompt words it, {shell_title} for the newer ones
+_SHELL_NAMES = {"posix": {"shell": "posix", "shell_title": "POSIX shell"},
+                "powershell": {"shell": "powershell", "shell_title": "PowerShell"}}
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    name: str
+    shell: str
+    system: str
+    prefix: str
+    suffix: str
+    max_tokens: int
+    overhead: int = field(init=False)  # tokens in the fixed parts
+    _head: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        head = f"{self.system}\n\n{self.prefix}" if self.system else self.prefix
+        object.__setattr__(self, "_head", head)
+        object.__setattr__(self, "overhead", count_tokens(head + self.suffix))
+
+    def with_budget(self, max_tokens: int) -> "CompiledPrompt":
+        return CompiledPrompt(self.name, self.shell, self.system, self.prefix, self.suffix, max_tokens)
+
+    def fit(self, query: str) -> str:
+        """``query``, cut to what the token budget leaves after the instructions."""
+        budget = max(1, self.max_tokens - self.overhead)
+        if len(query) <= budget:  # no token is shorter than a character
+            return query
+        tokens = count_tokens(query)
+        if tokens <= budget:
+            return query
+        logger.warning(f"Query of ~{tokens} tokens cut to fit the {self.name} prompt's budget of {self.max_tokens}")
+        return truncate(query, max(0, budget - count_tokens(TRUNCATION_NOTE))) + TRUNCATION_NOTE
+
+    def text(self, query: str) -> str:
+        """The prompt as one string, the system text first."""
+        return self._head + self.fit(query) + self.suffix
+
+    def messages(self, query: str) -> List[Tuple[str, str]]:
+        """The prompt as ``(role, content)`` chat messages."""
+        user = self.prefix + self.fit(query) + self.suffix
+        return [("system", self.system), ("user", user)] if self.system else [("user", user)]
+
+    def tokens(self, query: str) -> int:
+        return self.overhead + count_tokens(self.fit(query))
+
+
+COMPILED: Dict[Tuple[str, str], CompiledPrompt] = {
+    (name, shell): CompiledPrompt(name, shell, system.format(**names), prefix.format(**names), suffix.format(**names), budget)
+    for name, (system, prefix, suffix, budget) in TEMPLATES.items()
+    for shell, names in _SHELL_NAMES.items()
+}
+
+
+def _template_name(provider: Optional[str], model: Optional[str], overrides: Tuple[Tuple[str, str], ...]) -> str:
+    for key, name in overrides:
+        key_provider, _, pattern = key.partition(":")
+        if key_provider == provider and (not pattern or fnmatch.fnmatchcase(model or "", pattern)):
+            return name
+    return DEFAULT_TEMPLATES.get(provider, "full")
+
+
+@lru_cache(maxsize=256)
+def _resolve(provider: Optional[str], model: Optional[str], shell: str,
+             overrides: Tuple[Tuple[str, str], ...], max_tokens: Optional[int]) -> CompiledPrompt:
+    # Patterned keys first, so "ollama:llama3*" beats "ollama"
+    ordered = tuple(sorted(overrides, key=lambda item: ":" not in item[0]))
+    name = _template_name(provider, model, ordered)
+    if name not in TEMPLATES:
+        logger.warning(f"Unknown prompt template '{name}' for {provider}; using 'full'")
+        name = "full"
+    compiled = COMPILED[(name, shell)]
+    return compiled.with_budget(max_tokens) if max_tokens else compiled
+
+
+def template_for(provider: Optional[str] = None, model: Optional[str] = None, config=None,
+                 shell: str = "posix") -> CompiledPrompt:
+    """The compiled template for a provider and model, after the config's ``prompt_templates``."""
+    config = config or {}
+    overrides = tuple((config.get("prompt_templates") or {}).items())
+    return _resolve(provider, model, shell, overrides, config.get("max_prompt_tokens"))
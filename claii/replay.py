@@ -0,0 +1,248 @@
+"""Record/replay of provider traffic for deterministic offline runs.
+
+With ``CLAII_RECORD=cassette.json`` (or ``claii --record cassette.json ...``)
+every provider interaction is saved to a cassette file together with its
+timings: streamed chunks keep their offset from the start of the request.
+With ``CLAII_REPLAY=cassette.json`` (or ``--replay``) the same interactions
+are served from the cassette instead of the network, sleeping to reproduce
+the original latency shape. ``CLAII_REPLAY_SCALE`` (``--replay-scale``)
+multiplies the delays: 1 keeps the original timings, 0.5 is twice as fast,
+0 replays instantly.
+
+Interactions are matched on their kind, provider, model and request body.
+When a request is seen more often than it was recorded, its recordings are
+reused in order, so a short cassette can drive a long benchmark.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+RECORD_ENV = "CLAII_RECORD"
+REPLAY_ENV = "CLAII_REPLAY"
+REPLAY_SCALE_ENV = "CLAII_REPLAY_SCALE"
+
+CASSETTE_VERSION = 1
+
+
+class ReplayMissError(LookupError):
+    """Raised when a replayed request is not in the cassette."""
+
+
+class ReplayChunk:
+    """A streamed chunk served from a cassette (quacks like a LangChain message chunk)."""
+
+    __slots__ = ("content", "usage_metadata")
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+class ReplayResponse:
+    """An HTTP response served from a cassette (quacks like ``requests.Response``)."""
+
+    def __init__(self, status_code: int, text: str, headers: Optional[Dict] = None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _serialize(value):
+    """Turn prompts (strings or LangChain messages) into JSON-friendly data."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _serialize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_serialize(item) for item in value]
+    if hasattr(value, "content"):
+        return {"role": getattr(value, "type", "message"), "content": _serialize(value.content)}
+    return str(value)
+
+
+def request_key(kind: str, request: Dict) -> str:
+    """Stable key for matching a request against recorded ones."""
+    body = json.dumps({"kind": kind, "request": _serialize(request)}, sort_keys=True)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded interactions, loaded from and saved to a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.interactions = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.interactions = data.get("interactions", [])
+
+    def add(self, interaction: Dict) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def find(self, key: str) -> Dict:
+        with self._lock:
+            matches = [i for i in self.interactions if i["key"] == key]
+            if not matches:
+                raise ReplayMissError(f"No recorded interaction matches this request in {self.path}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return matches[position % len(matches)]
+
+    def save(self) -> None:
+        with self._lock:
+            data = {"version": CASSETTE_VERSION, "interactions": self.interactions}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class Recorder:
+    """Current record/replay mode for the process."""
+
+    def __init__(self):
+        self.mode = None  # None, "record" or "replay"
+        self.cassette: Optional[Cassette] = None
+        self.scale = 1.0
+
+    def configure(self, record: Optional[str] = None, replay: Optional[str] = None, scale: Optional[float] = None) -> None:
+        if record and replay:
+            raise ValueError("Use either record or replay, not both")
+        if scale is not None:
+            self.scale = scale
+        if replay:
+            if not os.path.exists(replay):
+                raise FileNotFoundError(f"Cassette not found: {replay}")
+            self.mode = "replay"
+            self.cassette = Cassette(replay)
+        elif record:
+            first = self.mode != "record"
+            self.mode = "record"
+            self.cassette = Cassette(record)
+            if first:
+                # Saved once at exit; recording many requests shouldn't rewrite the file each time
+                atexit.register(lambda: self.cassette.save())
+
+    def _sleep_until(self, start: float, offset: float) -> None:
+        delay = start + offset * self.scale - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stream(self, kind: str, request: Dict, produce: Callable[[], Iterable]) -> Iterable:
+        """Stream chunks from ``produce()``, recording or replaying them."""
+        if self.mode is None:
+            return produce()
+        if self.mode == "replay":
+            return self._replay_stream(kind, request)
+        return self._record_stream(kind, request, produce)
+
+    def _record_stream(self, kind, request, produce):
+        from claii.models.common import chunk_text
+        start = time.perf_counter()
+        chunks = []
+        for chunk in produce():
+            chunks.append({
+                "t": round(time.perf_counter() - start, 6),
+                "text": chunk_text(chunk),
+                "usage": getattr(chunk, "usage_metadata", None) or None,
+            })
+            yield chunk
+        self.cassette.add({
+            "key": request_key(kind, request),
+            "kind": kind,
+            "request": _serialize(request),
+            "chunks": chunks,
+            "duration": round(time.perf_counter() - start, 6),
+        })
+
+    def _replay_stream(self, kind, request):
+        from claii import stats
+        interaction = self.cassette.find(request_key(kind, request))
+        stats.annotate(cache="replay")
+        start = time.perf_counter()
+        for chunk in interaction["chunks"]:
+            self._sleep_until(start, chunk["t"])
+            yield ReplayChunk(chunk["text"], chunk.get("usage"))
+        self._sleep_until(start, interaction.get("duration", 0))
+
+    def call(self, kind: str, request: Dict, produce: Callable[[], object]):
+        """Return a JSON-serialisable value from ``produce()``, recording or replaying it."""
+        if self.mode is None:
+            return produce()
+        key = request_key(kind, request)
+        if self.mode == "replay":
+            interaction = self.cassette.find(key)
+            start = time.perf_counter()
+            self._sleep_until(start, interaction.get("duration", 0))
+            return interaction["value"]
+        start = time.perf_counter()
+        value = produce()
+        self.cassette.add({
+            "key": key,
+            "kind": kind,
+            "request": _serialize(request),
+            "value": value,
+            "duration": round(time.perf_counter() - start, 6),
+        })
+        return value
+
+    def http_post(self, kind: str, url: str, headers: Dict, payload: Dict, **kwargs):
+        """``requests.post`` with JSON body, recorded or replayed (headers are never stored)."""
+        import requests
+
+        def produce():
+            response = requests.post(url, headers=headers, json=payload, **kwargs)
+            return {"status_code": response.status_code, "text": response.text,
+                    "headers": {"Content-Type": response.headers.get("Content-Type", "")}}
+
+        if self.mode is None:
+            return requests.post(url, headers=headers, json=payload, **kwargs)
+        if self.mode == "replay":
+            from claii import stats
+            stats.annotate(cache="replay")
+        value = self.call(kind, {"url": url, "json": payload}, produce)
+        return ReplayResponse(value["status_code"], value["text"], value.get("headers"))
+
+
+recorder = Recorder()
+
+
+def configure(record: Optional[str] = None, replay: Optional[str] = None, scale: Optional[float] = None) -> None:
+    """Switch the process to record or replay mode."""
+    recorder.configure(record, replay, scale)
+
+
+def stream(kind: str, request: Dict, produce: Callable[[], Iterable]) -> Iterable:
+    return recorder.stream(kind, request, produce)
+
+
+def call(kind: str, request: Dict, produce: Callable[[], object]):
+    return recorder.call(kind, request, produce)
+
+
+def http_post(kind: str, url: str, headers: Dict, payload: Dict, **kwargs):
+    return recorder.http_post(kind, url, headers, payload, **kwargs)
+
+
+if os.environ.get(REPLAY_ENV) or os.environ.get(RECORD_ENV):
+    configure(
+        record=os.environ.get(RECORD_ENV),
+        replay=os.environ.get(REPLAY_ENV),
+        scale=float(os.environ[REPLAY_SCALE_ENV]) if os.environ.get(REPLAY_SCALE_ENV) else None,
+    )
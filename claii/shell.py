@@ -0,0 +1,168 @@
+"""A long-lived shell for running generated commands (``claii repl``).
+
+``subprocess.run(command, shell=True)`` starts a new shell for every command,
+so ``cd`` and exported variables are lost between commands. A
+:class:`ShellSession` keeps one shell running and writes each command to its
+stdin, followed by a line that prints a unique marker and the command's exit
+status. Output is read up to the marker and streamed as it arrives.
+
+If a command runs past its timeout, the shell and everything it started are
+killed, and a fresh shell is started for the next command (so that one loses
+the earlier state). The same happens if a command exits the shell. POSIX only.
+"""
+
+import codecs
+import os
+import select
+import shlex
+import signal
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from claii.tracing import span
+
+DEFAULT_SHELL = "/bin/sh"
+KILL_GRACE = 1.0
+
+
+class ShellError(RuntimeError):
+    """The shell session can't be used."""
+
+
+@dataclass
+class ShellResult:
+    command: str
+    returncode: Optional[int]  # None when the command timed out
+    output: str
+    duration: float
+    timed_out: bool = False
+    restarted: bool = False  # the shell had to be restarted, losing cd and variables
+
+
+class ShellSession:
+    """One shell process that runs commands in turn, keeping its state between them."""
+
+    def __init__(self, shell: str = DEFAULT_SHELL, cwd: Optional[str] = None):
+        if os.name != "posix":
+            raise ShellError("persistent shell sessions need a POSIX shell")
+        self.shell = shell
+        self.cwd = cwd
+        self._marker = f"__CLAII_DONE_{uuid.uuid4().hex}__"
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "ShellSession":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        if self.alive:
+            return
+        self._process = subprocess.Popen(
+            [self.shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            cwd=self.cwd, start_new_session=True,  # own process group, so a timeout can kill it all
+        )
+
+    def close(self) -> None:
+        if not self.alive:
+            self._process = None
+            return
+        try:
+            self._process.stdin.write(b"exit\n")
+            self._process.stdin.close()
+            self._process.wait(timeout=KILL_GRACE)
+        except (OSError, subprocess.TimeoutExpired):
+            self._kill()
+        self._process = None
+
+    def _kill(self) -> None:
+        process = self._process
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                break
+            try:
+                process.wait(timeout=KILL_GRACE)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        self._process = None
+
+    def run(self, command: str, timeout: Optional[float] = None,
+            on_output: Optional[Callable[[str], None]] = None) -> ShellResult:
+        """Run ``command`` in the session and wait for it, streaming its output to ``on_output``."""
+        restarted = self._process is not None and not self.alive
+        self.start()
+        start = time.perf_counter()
+        # eval keeps cd and variables in this shell, and a quoting mistake in the
+        # command can't swallow the marker line. The command mustn't read our pipe:
+        # it carries the commands that follow.
+        script = f"eval {shlex.quote(command)} </dev/null\nprintf '%s%s\\n' '{self._marker}' \"$?\"\n"
+        with span("shell.run"):
+            try:
+                self._process.stdin.write(script.encode())
+                self._process.stdin.flush()
+            except BrokenPipeError:
+                raise ShellError("the shell exited")
+            output, returncode, timed_out = self._read_until_marker(timeout, on_output)
+        if timed_out:
+            self._kill()
+            restarted = True
+        elif not self.alive:  # the command exited the shell
+            self._process = None
+            restarted = True
+        return ShellResult(command, returncode, output, time.perf_counter() - start, timed_out, restarted)
+
+    def _partial_marker(self, text: str) -> int:
+        """Length of the longest end of ``text`` that could be the start of the marker."""
+        for length in range(min(len(self._marker) - 1, len(text)), 0, -1):
+            if text.endswith(self._marker[:length]):
+                return length
+        return 0
+
+    def _read_until_marker(self, timeout, on_output):
+        fd = self._process.stdout.fileno()
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        buffer = ""
+        emitted = 0  # characters of buffer already passed to on_output
+
+        def emit(end: int):
+            nonlocal emitted
+            if on_output and end > emitted:
+                on_output(buffer[emitted:end])
+                emitted = end
+
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                emit(len(buffer))
+                return buffer, None, True
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 65536)
+            if not data:  # the command exited the shell
+                emit(len(buffer))
+                return buffer, self._process.wait(), False
+            buffer += decoder.decode(data)
+            index = buffer.find(self._marker)
+            if index == -1:
+                emit(len(buffer) - self._partial_marker(buffer))
+                continue
+            end = buffer.find("\n", index)
+            if end == -1:
+                emit(index)
+                continue
+            emit(index)
+            return buffer[:index], int(buffer[index + len(self._marker):end]), False
@@ -0,0 +1,306 @@
+"""Local per-request performance statistics.
+
+Every reply generated through ``gen_reply`` is recorded in a small SQLite
+database next to the config file: provider, model, latency, time-to-first-token,
+tokens in/out, cache status and error class. ``claii stats`` aggregates it.
+"""
+
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from claii.config import CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+STATS_PATH = CONFIG_DIR / "stats.db"
+RETENTION_DAYS = 90
+
+# Set to False to stop requests being stored (e.g. during load tests); they are still tracked
+RECORDING_ENABLED = True
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    ts REAL NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    latency REAL NOT NULL,
+    ttft REAL,
+    tokens_in INTEGER,
+    tokens_out INTEGER,
+    cache TEXT NOT NULL DEFAULT 'miss',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS requests_ts ON requests (ts);
+"""
+
+_local = threading.local()
+_db_lock = threading.Lock()
+_connection = None
+_connection_path = None
+
+
+class RequestRecord:
+    """Measurements for a single request, filled in while it runs."""
+
+    __slots__ = ("ts", "provider", "model", "start", "latency", "first_token_at",
+                 "tokens_in", "tokens_out", "cache", "error")
+
+    def __init__(self, provider: str, model: str):
+        self.ts = time.time()
+        self.start = time.perf_counter()
+        self.provider = provider
+        self.model = model
+        self.latency = None
+        self.first_token_at = None
+        self.tokens_in = None
+        self.tokens_out = None
+        self.cache = "miss"
+        self.error = None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the start of the request to the first streamed token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.start
+
+    def as_dict(self) -> Dict:
+        return {
+            "ts": self.ts,
+            "provider": self.provider,
+            "model": self.model,
+            "latency": self.latency,
+            "ttft": self.ttft,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "cache": self.cache,
+            "error": self.error,
+        }
+
+
+def current() -> Optional[RequestRecord]:
+    """Return the request being tracked on this thread, if any."""
+    return getattr(_local, "record", None)
+
+
+def last_record() -> Optional[RequestRecord]:
+    """Return the most recently finished request on this thread."""
+    return getattr(_local, "last", None)
+
+
+def remember(record: RequestRecord) -> None:
+    """Make ``record`` this thread's last record, e.g. for a request made on worker threads."""
+    _local.last = record
+
+
+def annotate(**fields) -> None:
+    """Set fields (``model``, ``tokens_in``, ``tokens_out``, ``cache``...) on the current request."""
+    record = current()
+    if record is None:
+        return
+    for key, value in fields.items():
+        setattr(record, key, value)
+
+
+def mark_first_token() -> None:
+    """Record that the current request produced its first token."""
+    record = current()
+    if record is not None and record.first_token_at is None:
+        record.first_token_at = time.perf_counter()
+
+
+@contextmanager
+def track(provider: str, model: str, save: bool = True):
+    """Track one request; the record is stored when the block exits."""
+    record = RequestRecord(provider, model)
+    previous = current()
+    _local.record = record
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        _local.record = previous
+        finish(record, save)
+
+
+def finish(record: RequestRecord, save: bool = True) -> None:
+    """Close a request started without :func:`track` (e.g. one of many coroutines on a thread)."""
+    record.latency = time.perf_counter() - record.start
+    _local.last = record
+    if save and RECORDING_ENABLED:
+        try:
+            save_record(record)
+        except Exception as e:
+            logger.warning(f"Could not record request stats: {e}")
+
+
+def _connect():
+    global _connection, _connection_path
+    if _connection is None or _connection_path != STATS_PATH:
+        os.makedirs(os.path.dirname(STATS_PATH), exist_ok=True)
+        _connection = sqlite3.connect(str(STATS_PATH), check_same_thread=False, timeout=5)
+        _connection_path = STATS_PATH
+        _connection.executescript(_SCHEMA)
+        _connection.execute("DELETE FROM requests WHERE ts < ?", (time.time() - RETENTION_DAYS * 86400,))
+        _connection.commit()
+    return _connection
+
+
+def save_record(record: RequestRecord) -> None:
+    """Append a finished request to the stats database."""
+    with _db_lock:
+        connection = _connect()
+        connection.execute(
+            "INSERT INTO requests (ts, provider, model, latency, ttft, tokens_in, tokens_out, cache, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record.ts, record.provider, record.model, record.latency, record.ttft,
+             record.tokens_in, record.tokens_out, record.cache, record.error),
+        )
+        connection.commit()
+
+
+def load_records(since: Optional[float] = None, provider: Optional[str] = None) -> List[Dict]:
+    """Return stored requests, optionally only those newer than ``since`` (epoch seconds)."""
+    if not os.path.exists(STATS_PATH):
+        return []
+    query = "SELECT ts, provider, model, latency, ttft, tokens_in, tokens_out, cache, error FROM requests WHERE ts >= ?"
+    params = [since or 0]
+    if provider:
+        query += " AND provider = ?"
+        params.append(provider)
+    with _db_lock:
+        rows = _connect().execute(query + " ORDER BY ts", params).fetchall()
+    columns = ("ts", "provider", "model", "latency", "ttft", "tokens_in", "tokens_out", "cache", "error")
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def parse_window(window: str) -> Optional[float]:
+    """Convert a window such as ``15m``, ``24h``, ``7d`` or ``all`` to seconds."""
+    if window == "all":
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", window.strip())
+    if not match:
+        raise ValueError(f"Invalid window '{window}'. Use e.g. 30m, 24h, 7d, 4w or all.")
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return float(match.group(1)) * units[match.group(2)]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Return the q-th percentile (0-100) of values, interpolating between ranks."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(records: List[Dict]) -> List[Dict]:
+    """Aggregate requests per provider and model."""
+    groups: Dict[tuple, List[Dict]] = {}
+    for record in records:
+        groups.setdefault((record["provider"], record["model"]), []).append(record)
+
+    summaries = []
+    for (provider, model), group in sorted(groups.items()):
+        ok = [r for r in group if not r["error"]]
+        latencies = [r["latency"] for r in ok]
+        ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+        tokens_out = sum(r["tokens_out"] or 0 for r in ok)
+        generation_time = sum(r["latency"] for r in ok if r["tokens_out"])
+        cached = sum(1 for r in group if r["cache"] != "miss")
+        errors: Dict[str, int] = {}
+        for r in group:
+            if r["error"]:
+                errors[r["error"]] = errors.get(r["error"], 0) + 1
+        summaries.append({
+            "provider": provider,
+            "model": model,
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "error_rate": (len(group) - len(ok)) / len(group),
+            "error_classes": errors,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p90": percentile(latencies, 90),
+            "latency_p99": percentile(latencies, 99),
+            "latency_sum": sum(latencies),
+            "latency_count": len(latencies),
+            "ttft_p50": percentile(ttfts, 50),
+            "ttft_p90": percentile(ttfts, 90),
+            "ttft_p99": percentile(ttfts, 99),
+            "ttft_sum": sum(ttfts),
+            "ttft_count": len(ttfts),
+            "tokens_in": sum(r["tokens_in"] or 0 for r in ok),
+            "tokens_out": tokens_out,
+            "tokens_per_second": tokens_out / generation_time if generation_time else None,
+            "cache_hit_ratio": cached / len(group),
+        })
+    return summaries
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def to_openmetrics(summaries: List[Dict], window: str) -> str:
+    """Render summaries in OpenMetrics text format (node exporter textfile collector compatible)."""
+    lines = []
+
+    for metric, field, help_text in (
+        ("claii_request_latency_seconds", "latency", "End-to-end request latency"),
+        ("claii_time_to_first_token_seconds", "ttft", "Time from request start to the first streamed token"),
+    ):
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"# UNIT {metric} seconds")
+        lines.append(f"# HELP {metric} {help_text} over the last {window}.")
+        for s in summaries:
+            base = {"provider": s["provider"], "model": s["model"], "window": window}
+            for q in (50, 90, 99):
+                value = s[f"{field}_p{q}"]
+                if value is not None:
+                    lines.append(f"{metric}{_labels(**base, quantile=q / 100)} {value:.6f}")
+            lines.append(f"{metric}_sum{_labels(**base)} {s[f'{field}_sum']:.6f}")
+            lines.append(f"{metric}_count{_labels(**base)} {s[f'{field}_count']}")
+
+    for metric, field, help_text in (
+        ("claii_requests", "requests", "Requests made"),
+        ("claii_request_error_ratio", "error_rate", "Share of requests that failed"),
+        ("claii_tokens_per_second", "tokens_per_second", "Output tokens per second of generation"),
+        ("claii_cache_hit_ratio", "cache_hit_ratio", "Share of requests answered without a fresh upstream call"),
+    ):
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"# HELP {metric} {help_text} over the last {window}.")
+        for s in summaries:
+            if s[field] is not None:
+                lines.append(f"{metric}{_labels(provider=s['provider'], model=s['model'], window=window)} {s[field]}")
+
+    lines.append("# TYPE claii_request_errors gauge")
+    lines.append(f"# HELP claii_request_errors Failed requests by error class over the last {window}.")
+    for s in summaries:
+        for error, count in sorted(s["error_classes"].items()):
+            lines.append(f"claii_request_errors{_labels(provider=s['provider'], model=s['model'], window=window, error=error)} {count}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str, content: str) -> None:
+    """Write a metrics file atomically so the collector never reads a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
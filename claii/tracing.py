@@ -0,0 +1,254 @@
+"""Lightweight span tracing for CLAII invocations.
+
+Tracing is off unless ``CLAII_TRACE=1`` is set or ``--profile`` is passed.
+While it is off, :func:`span` returns a shared no-op object, so instrumented
+code only pays for a function call and a flag check.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+TRACE_ENV = "CLAII_TRACE"
+TRACE_FILE_ENV = "CLAII_TRACE_FILE"
+TRACE_FORMAT_ENV = "CLAII_TRACE_FORMAT"
+
+
+class Span:
+    """A timed section of work, optionally nested under a parent span."""
+
+    __slots__ = ("name", "attrs", "start", "end", "parent", "children", "thread_id", "_tracer", "_pushed")
+
+    def __init__(self, tracer, name, attrs, parent, pushed):
+        self._tracer = tracer
+        self._pushed = pushed
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (up to now if the span is still open)."""
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def set(self, **attrs) -> None:
+        """Attach extra attributes to the span."""
+        self.attrs.update(attrs)
+
+    def finish(self) -> None:
+        """Close the span."""
+        if self.end is None:
+            self.end = time.perf_counter()
+            if self._pushed:
+                self._tracer._pop(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+        return False
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Collects spans for the current process and reports them on exit."""
+
+    def __init__(self):
+        self.enabled = False
+        self.output_path = None
+        self.output_format = "chrome"
+        self.print_tree = True
+        self.roots = []
+        self.epoch = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def enable(self, output_path=None, output_format=None, print_tree=True) -> None:
+        """Start recording spans and report them when the process exits."""
+        if output_path:
+            self.output_path = output_path
+        if output_format:
+            self.output_format = output_format
+        self.print_tree = print_tree
+        if not self.enabled:
+            self.enabled = True
+            atexit.register(self.report)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """Return the innermost open span on this thread, if any."""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def _new_span(self, name, attrs, pushed):
+        parent = self.current()
+        span = Span(self, name, attrs, parent, pushed)
+        if parent is not None:
+            parent.children.append(span)
+        else:
+            with self._lock:
+                self.roots.append(span)
+        if pushed:
+            self._stack().append(span)
+        return span
+
+    def span(self, name, attrs):
+        return self._new_span(name, attrs, pushed=True)
+
+    def start_span(self, name, attrs):
+        return self._new_span(name, attrs, pushed=False)
+
+    def _pop(self, span) -> None:
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+
+    def iter_spans(self):
+        """Yield ``(depth, span)`` pairs in start order."""
+        pending = [(0, root) for root in reversed(self.roots)]
+        while pending:
+            depth, span = pending.pop()
+            yield depth, span
+            pending.extend((depth + 1, child) for child in reversed(span.children))
+
+    def format_tree(self) -> str:
+        """Render the collected spans as an indented timing tree."""
+        lines = ["CLAII profile"]
+        for depth, span in self.iter_spans():
+            label = "  " * (depth + 1) + span.name
+            attrs = " ".join(f"{key}={value}" for key, value in span.attrs.items())
+            lines.append(f"{label:<48} {span.duration * 1000:>10.1f} ms  {attrs}".rstrip())
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        """Return the spans in Chrome trace event format (``chrome://tracing``, Perfetto)."""
+        pid = os.getpid()
+        events = []
+        for _, span in self.iter_spans():
+            events.append({
+                "name": span.name,
+                "cat": "claii",
+                "ph": "X",
+                "ts": round((span.start - self.epoch) * 1e6, 3),
+                "dur": round(span.duration * 1e6, 3),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {key: str(value) for key, value in span.attrs.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_json(self) -> list:
+        """Return the spans as a nested JSON-serialisable tree."""
+        def convert(span):
+            return {
+                "name": span.name,
+                "start_ms": round((span.start - self.epoch) * 1000, 3),
+                "duration_ms": round(span.duration * 1000, 3),
+                "attrs": {key: str(value) for key, value in span.attrs.items()},
+                "children": [convert(child) for child in span.children],
+            }
+        return [convert(root) for root in self.roots]
+
+    def report(self) -> None:
+        """Print the timing tree and write the trace file, once."""
+        if self._reported or not self.roots:
+            return
+        self._reported = True
+        if self.print_tree:
+            sys.stderr.write(self.format_tree() + "\n")
+        if self.output_path:
+            data = self.to_json() if self.output_format == "json" else self.to_chrome_trace()
+            with open(self.output_path, "w") as f:
+                json.dump(data, f, indent=2)
+            sys.stderr.write(f"Trace written to {self.output_path}\n")
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """Context manager timing a block of work as a child of the current span."""
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return tracer.span(name, attrs)
+
+
+def start_span(name: str, **attrs):
+    """Start a span that is closed explicitly with ``finish()``.
+
+    Unlike :func:`span`, it does not become the parent of spans opened after it,
+    which makes it suitable for milestones such as time-to-first-token.
+    """
+    if not tracer.enabled:
+        return NOOP_SPAN
+    return tracer.start_span(name, attrs)
+
+
+def enable(output_path=None, output_format=None) -> None:
+    """Turn tracing on for the rest of the process."""
+    tracer.enable(output_path, output_format)
+
+
+def configure_from_argv(argv) -> None:
+    """Enable tracing early if ``--profile`` options are on the command line.
+
+    The Typer callback handles the same options, but by then startup has
+    already happened; scanning ``argv`` first lets imports and plugin loading
+    show up in the profile too.
+    """
+    output_path = None
+    output_format = None
+    profile = False
+    for index, arg in enumerate(argv):
+        if arg == "--":
+            break
+        if arg == "--profile":
+            profile = True
+        elif arg.startswith("--profile-output"):
+            profile = True
+            output_path = arg.split("=", 1)[1] if "=" in arg else (argv[index + 1] if index + 1 < len(argv) else None)
+        elif arg.startswith("--profile-format"):
+            output_format = arg.split("=", 1)[1] if "=" in arg else (argv[index + 1] if index + 1 < len(argv) else None)
+    if profile:
+        enable(output_path, output_format)
+
+
+if os.environ.get(TRACE_ENV, "").lower() in ("1", "true", "yes", "on"):
+    enable(os.environ.get(TRACE_FILE_ENV), os.environ.get(TRACE_FORMAT_ENV))
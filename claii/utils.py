@@ -1,11 +1,14 @@
 import os
 import subprocess
 from claii.config import load_config
+from claii.tracing import span
+from claii import replay
 
 
 def is_ollama_installed():
     """Check if Ollama is installed"""
-    return os.system("which ollama > /dev/null 2>&1") == 0
+    with span("ollama.check_installed"):
+        return replay.call("ollama.check_installed", {}, lambda: os.system("which ollama > /dev/null 2>&1") == 0)
 
 def is_openai_configured():
     """Check if OpenAI API key is set"""
@@ -34,6 +37,10 @@ def is_gemini_configured():
 
 def is_ollama_running():
     """Check if Ollama is running."""
+    with span("ollama.check_running"):
+        return replay.call("ollama.check_running", {}, _ollama_list_succeeds)
+
+def _ollama_list_succeeds():
     try:
         result = subprocess.run(["ollama", "list"], capture_output=True, text=True)
         return result.returncode == 0
@@ -13,6 +13,7 @@ setup(
     install_requires=[
         "typer",
         "rich",
+        "requests",
         "pytest",
         "pytest-mock",
         "langchain-core",
@@ -26,7 +27,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "claii=claii.app:app",  # CLI entry point
+            "claii=claii.completion:main",  # CLI entry point (answers shell completion without loading the app)
         ],
     },
     classifiers=[
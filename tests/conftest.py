@@ -0,0 +1,32 @@
+import pytest
+from claii import coalesce, cookbook, probe, stats
+
+
+@pytest.fixture(autouse=True)
+def stats_db(tmp_path, monkeypatch):
+    """Keep request stats recorded during tests out of the user's stats store"""
+    monkeypatch.setattr(stats, "STATS_PATH", tmp_path / "stats.db")
+    return tmp_path / "stats.db"
+
+
+@pytest.fixture(autouse=True)
+def coalesce_dir(tmp_path, monkeypatch):
+    """Keep coalescing lock files out of the user's config directory"""
+    monkeypatch.setattr(coalesce, "COALESCE_DIR", tmp_path / "coalesce")
+    return tmp_path / "coalesce"
+
+
+@pytest.fixture(autouse=True)
+def cookbook_paths(tmp_path, monkeypatch):
+    """Keep the cookbook index and curated file out of the user's config directory"""
+    monkeypatch.setattr(cookbook, "INDEX_PATH", tmp_path / "cookbook_index.json")
+    monkeypatch.setattr(cookbook, "CURATED_PATHS", [tmp_path / "cookbook.json"])
+    monkeypatch.setattr(cookbook, "_loaded", None)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def provider_status(tmp_path, monkeypatch):
+    """Keep provider probe results out of the user's config directory"""
+    monkeypatch.setattr(probe, "STATUS_PATH", tmp_path / "provider_status.json")
+    return tmp_path / "provider_status.json"
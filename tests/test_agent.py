@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from claii import agent
+
+
+def test_parse_tool_calls():
+    """Test tool call extraction from model replies"""
+    assert agent.parse_tool_calls("ls -la") == []
+    assert agent.parse_tool_calls('TOOL_CALLS: [{"name": "current_time", "arguments": {}}]') == [
+        {"name": "current_time", "arguments": {}}
+    ]
+    assert agent.parse_tool_calls('TOOL_CALLS: ```json\n{"name": "disk", "arguments": {"path": "/"}}\n```') == [
+        {"name": "disk", "arguments": {"path": "/"}}
+    ]
+    assert agent.parse_tool_calls("TOOL_CALLS: not json") == []
+
+
+def test_execute_tool_calls_runs_concurrently_with_timeouts_and_memo():
+    """Test parallel sync/async execution, per-tool timeouts and per-request memoization"""
+    counter = {"slow": 0}
+    lock = threading.Lock()
+
+    def slow(seconds):
+        with lock:
+            counter["slow"] += 1
+        time.sleep(seconds)
+        return seconds
+
+    async def async_tool():
+        await asyncio.sleep(0.2)
+        return "async"
+
+    def hang():
+        time.sleep(5)
+
+    tools = {
+        "slow": {"handler": slow},
+        "async_tool": {"handler": async_tool},
+        "hang": {"handler": hang, "timeout": 0.3},
+    }
+    calls = [
+        {"name": "slow", "arguments": {"seconds": 0.2}},
+        {"name": "slow", "arguments": {"seconds": 0.2}},
+        {"name": "slow", "arguments": {"seconds": 0.21}},
+        {"name": "async_tool", "arguments": {}},
+        {"name": "hang", "arguments": {}},
+        {"name": "missing", "arguments": {}},
+    ]
+    memo = {}
+    start = time.monotonic()
+    results = agent.execute_tool_calls(calls, tools, memo)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6  # not the 0.2 + 0.2 + 0.21 + 0.2 + 0.3 a serial run would take
+    assert [r.get("result") for r in results[:4]] == [0.2, 0.2, 0.21, "async"]
+    assert counter["slow"] == 2  # the duplicate call ran once
+    assert "timed out" in results[4]["error"]
+    assert "unknown tool" in results[5]["error"]
+
+    again = agent.execute_tool_calls(calls[:1], tools, memo)
+    assert again[0]["cached"] is True
+    assert counter["slow"] == 2
+
+
+def test_run_tool_loop_feeds_results_back():
+    """Test that tool results are sent back to the model until it answers"""
+    prompts = []
+
+    def ask(prompt):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            return 'TOOL_CALLS: [{"name": "current_time", "arguments": {}}]'
+        return "date"
+
+    tools = {"current_time": {"description": "Get current time", "handler": lambda: "12:00"}}
+    assert agent.run_tool_loop("what time is it", ask, tools) == "date"
+    assert "current_time: Get current time" in prompts[0]
+    assert 'current_time({}) -> "12:00"' in prompts[1]
+
+
+def test_tool_loop_follow_up_turns_skip_the_command_template(mocker):
+    """Test that only the first tool-loop turn is wrapped in the provider's command template"""
+    from claii import ai
+    from claii.prompts.concise import build_messages
+
+    sent = []
+
+    def chat(prompt):
+        sent.append(build_messages(prompt, "ollama", "mistral", {}))
+        return 'TOOL_CALLS: [{"name": "current_time", "arguments": {}}]' if len(sent) == 1 else "date"
+
+    tools = {"current_time": {"description": "Get current time", "handler": lambda: "12:00"}}
+    mocker.patch.object(ai.plugin_manager, "tools", tools)
+    mocker.patch.object(ai, "log_history")
+    config = {"tool_calling": True, "stats_enabled": False}
+    assert ai._reply("ollama", "mistral", chat, "what time is it", config, None) == "date"
+
+    assert sent[0][0][1].startswith("Reply with only a POSIX shell command")
+    assert sent[1] == [("user", "\n".join([
+        "what time is it",
+        "",
+        agent.describe_tools(tools),
+        "",
+        'TOOL_CALLS: [{"name": "current_time", "arguments": {}}]',
+        "Tool results:",
+        '- current_time({}) -> "12:00"',
+        agent.FOLLOW_UP,
+    ]))]
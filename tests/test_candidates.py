@@ -0,0 +1,39 @@
+from benchmarks.stub_servers import OpenAIStub, StubBehavior
+from claii import ai, candidates
+from claii.models import openai_compatible
+
+
+def test_rank_prefers_valid_available_commands():
+    """Test that candidates are ranked by syntax, installed programs, target shell, votes and length"""
+    ranked = candidates.rank([
+        "find . -name '*.log",
+        "Get-ChildItem -Recurse -Filter *.log",
+        "frobnicate --logs",
+        "```bash\nfind . -name '*.log'\n```",
+        "find . -name '*.log'",
+        "find . -type f -name '*.log' -print",
+    ], shell="posix")
+    assert [candidate.command for candidate in ranked[:2]] == ["find . -name '*.log'", "find . -type f -name '*.log' -print"]
+    assert ranked[0].votes == 2 and ranked[0].issues == []
+    issues = {candidate.command: candidate.issues for candidate in ranked}
+    assert issues["find . -name '*.log"] == ["unbalanced quotes"]
+    assert issues["frobnicate --logs"] == ["'frobnicate' not found on PATH"]
+    assert "uses PowerShell cmdlets" in issues["Get-ChildItem -Recurse -Filter *.log"]
+    assert candidates.check("Get-ChildItem | Where-Object { $_.Length -gt 1mb }", "powershell") == []
+    assert candidates.check("ls | grep x", "powershell") == ["uses POSIX-only programs"]
+
+
+def test_openai_compatible_candidates_come_from_one_request(mocker):
+    """Test that OpenAI-compatible servers are asked for all candidates with the n parameter"""
+    with OpenAIStub(StubBehavior(reply="ls -la", latency=0, token_rate=0)) as stub:
+        config = {"openai_compatible_base_url": stub.base_url, "openai_compatible_model": "qwen"}
+        mocker.patch.object(openai_compatible, "load_config", return_value=config)
+        mocker.patch.object(ai, "load_config", return_value=config)
+        assert ai.gen_candidates("list files", "openai-compatible", n=3) == ["ls -la"] * 3
+        assert [request["payload"].get("n") for request in stub.requests] == [3]
+
+    # A response without choices is an error, not an empty list of candidates
+    client = mocker.Mock(model="qwen")
+    client.complete.return_value = []
+    mocker.patch.object(openai_compatible, "_client", return_value=client)
+    assert openai_compatible.candidates_openai_compatible("list files", 3).code == "no_choices"
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from claii import coalesce, stats
+from claii.errors import ErrorReply
+
+
+def test_identical_requests_share_one_call():
+    """Test that concurrent identical requests in a process make a single upstream call"""
+    calls = []
+    started = threading.Event()
+
+    def call():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "ls -la"
+
+    key = coalesce.request_key("list  files ", "ollama", "mistral")
+    assert key == coalesce.request_key("list files", "ollama", "mistral")
+    assert key != coalesce.request_key("list files", "ollama", "llama3")
+
+    def request(_):
+        with stats.track("ollama", "mistral", save=False) as record:
+            reply = coalesce.run(key, call)
+        return reply, record.cache
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(request, range(8)))
+    assert len(calls) == 1
+    assert {reply for reply, _ in results} == {"ls -la"}
+    assert sorted(cache for _, cache in results).count("coalesced") == 7
+
+    # Not a cache: a later request calls again
+    assert coalesce.run(key, call) == "ls -la" and len(calls) == 2
+
+
+WAITER = """
+import pathlib, sys
+from claii import coalesce
+coalesce.COALESCE_DIR = pathlib.Path(sys.argv[1])
+print("ready", flush=True)
+print(coalesce.run(sys.argv[2], lambda: "own call"))
+"""
+
+
+def test_requests_coalesce_across_processes(coalesce_dir):
+    """Test that another process waits for the lock holder and receives its reply"""
+    key = coalesce.request_key("list files", "ollama", "mistral")
+    holding = threading.Event()
+    release = threading.Event()
+
+    def leader():
+        def call():
+            holding.set()
+            release.wait(5)
+            return ErrorReply("[red]Ollama is not running![/red]", "ollama_not_running")
+        return coalesce.run(key, call)
+
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(leader)
+        assert holding.wait(5)
+        env = {**os.environ, "PYTHONPATH": os.getcwd()}
+        waiter = subprocess.Popen([sys.executable, "-c", WAITER, str(coalesce_dir), key],
+                                  stdout=subprocess.PIPE, text=True, env=env)
+        assert waiter.stdout.readline().strip() == "ready"
+        time.sleep(0.2)
+        release.set()
+        assert future.result().code == "ollama_not_running"
+    assert waiter.communicate(timeout=10)[0].strip() == "[red]Ollama is not running![/red]"
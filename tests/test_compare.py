@@ -0,0 +1,33 @@
+import time
+
+from claii import compare
+from claii.errors import ErrorReply
+from claii.plugins.manager import plugin_manager
+
+
+def _slow_stream(reply, delay):
+    def stream(message):
+        time.sleep(delay)
+        yield reply
+    return stream
+
+
+def test_compare_runs_tools_concurrently(monkeypatch):
+    """Test that a comparison takes as long as the slowest tool, not the sum"""
+    monkeypatch.setitem(plugin_manager.models, "fast", {"name": "fast", "stream_handler": _slow_stream("ls", 0.2)})
+    monkeypatch.setitem(plugin_manager.models, "slow", {"name": "slow", "stream_handler": _slow_stream("ls -la", 0.4)})
+    monkeypatch.setitem(plugin_manager.models, "broken", {
+        "name": "broken", "handler": lambda m: ErrorReply("[red]no key[/red]", "missing_api_key"),
+    })
+
+    start = time.perf_counter()
+    results = compare.run("list files", ["fast", "slow", "broken"])
+    assert time.perf_counter() - start < 0.55
+    fast, slow, broken = results
+    assert (fast.reply, slow.reply) == ("ls", "ls -la")
+    assert fast.ttft is not None and fast.latency < slow.latency
+    assert broken.error == "missing_api_key"
+
+    summary = compare.summarize([results, compare.run("list files", ["fast", "slow", "broken"])])
+    assert summary["slow"]["requests"] == 2 and summary["slow"]["errors"] == 0
+    assert summary["broken"]["errors"] == 2 and summary["broken"]["latency_p50"] is None
@@ -0,0 +1,62 @@
+import os
+
+from claii import completion
+
+
+def test_fast_completion_answers_from_the_cache(tmp_path, monkeypatch, capsys):
+    """Test that completion requests are answered from the cached command tree"""
+    monkeypatch.setattr(completion, "CACHE_PATH", tmp_path / "completion_cache.json")
+    cache = completion.load_cache()
+    assert (tmp_path / "completion_cache.json").exists()
+    assert completion.load_cache(rebuild_if_stale=False) == cache
+
+    def complete(line, shell="bash"):
+        words = completion._split(line)
+        monkeypatch.setenv("_CLAII_COMPLETE", f"complete_{shell}")
+        monkeypatch.setenv("COMP_WORDS", line)
+        monkeypatch.setenv("COMP_CWORD", str(len(words) if line.endswith(" ") else len(words) - 1))
+        monkeypatch.setenv("_TYPER_COMPLETE_ARGS", line)
+        assert completion.fast_complete()
+        return capsys.readouterr().out.split("\n")
+
+    assert {"chat", "config", "cookbook", "compare"} <= set(complete("claii c"))
+    assert "--tool" in complete("claii chat 'list files' --to")
+    assert {"ollama", "openai-compatible"} <= set(complete("claii chat 'list files' --tool "))
+    assert complete("claii config set mo") == ["model", ""]
+    assert complete("claii config set model open") == ["openai", "openai-compatible", ""]
+    assert '"model"' in complete("claii config set mo", shell="zsh")[0]
+
+    monkeypatch.setenv("_CLAII_COMPLETE", "source_bash")
+    assert not completion.fast_complete()  # not a completion request: goes to the full app
+
+
+def test_completion_cache_is_rebuilt_when_config_changes(tmp_path, monkeypatch):
+    """Test that the cache is stale once the config file changes"""
+    monkeypatch.setattr(completion, "CACHE_PATH", tmp_path / "completion_cache.json")
+    config_path = tmp_path / "config.json"
+    config_path.write_text("{}")
+    monkeypatch.setattr(completion, "CONFIG_PATH", config_path)
+    completion.load_cache()
+    assert completion.load_cache(rebuild_if_stale=False) is not None
+    stat = config_path.stat()
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert completion.load_cache(rebuild_if_stale=False) is None
+
+
+def test_completion_cache_is_rebuilt_when_a_plugin_file_changes(tmp_path, monkeypatch):
+    """Test that editing a plugin package's files in place makes the cache stale"""
+    monkeypatch.setattr(completion, "CACHE_PATH", tmp_path / "completion_cache.json")
+    monkeypatch.setattr(completion, "CONFIG_DIR", tmp_path)
+    plugin_dir = tmp_path / "plugins" / "echo"
+    plugin_dir.mkdir(parents=True)
+    for name in ("__init__.py", "models.py"):
+        (plugin_dir / name).write_text("")
+    completion.load_cache()
+    assert completion.load_cache(rebuild_if_stale=False) is not None
+
+    for name in ("__init__.py", "models.py"):
+        source = plugin_dir / name
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert completion.load_cache(rebuild_if_stale=False) is None
+        completion.load_cache()
@@ -0,0 +1,56 @@
+import json
+
+from claii import cookbook, history
+
+
+def test_cookbook_learns_confirmed_answers_incrementally(tmp_path, monkeypatch):
+    """Test that only commands run successfully or accepted are indexed, and compaction is incremental"""
+    history_path = tmp_path / "history.log"
+    monkeypatch.setattr(history, "HISTORY_PATH", str(history_path))
+    for query, reply in [("List files", "ls -la"), ("list files", "ls -la"), ("show disk usage", "du -sh .")]:
+        history.log_history(query, reply)  # shown only: not learned
+    history.log_run("List files", {"command": "ls -la", "returncode": 0})
+    history.log_run("show disk usage", {"command": "du -sh /", "returncode": 1})
+    history.log_accept("multi", "a\nb")
+
+    index = cookbook.compact()
+    assert [(e["query"], e["command"], e["count"]) for e in index["entries"]] == [("list files", "ls -la", 1)]
+    assert index["history_offset"] == history_path.stat().st_size
+
+    history.log_accept("show disk usage", "du -sh .")
+    index = cookbook.compact()
+    assert index["counts"]["show disk usage"] == {"du -sh .": 1}
+    assert len(index["entries"]) == 2
+
+    match = cookbook.match(index, "LIST FILES")
+    assert match.command == "ls -la" and match.exact and match.source == "history"
+    # Typos and similar queries only match when fuzzy matching is turned on
+    assert cookbook.match(index, "show disk usgae") is None
+    fuzzy = cookbook.match(index, "show disk usgae", fuzzy=True)
+    assert fuzzy.command == "du -sh ." and not fuzzy.exact
+    assert cookbook.match(index, "delete disk usage", fuzzy=True) is None
+
+
+def test_similar_query_is_not_an_exact_match(tmp_path, monkeypatch):
+    """Test that a query differing in one word from a known one gets no answer by default"""
+    monkeypatch.setattr(history, "HISTORY_PATH", str(tmp_path / "history.log"))
+    larger = "find all files larger than 100MB in my home directory and list them"
+    history.log_run(larger, {"command": "find ~ -size +100M", "returncode": 0})
+    smaller = larger.replace("larger", "smaller")
+    assert cookbook.lookup(smaller) is None
+    assert cookbook.lookup(larger).command == "find ~ -size +100M"
+    assert not cookbook.lookup(smaller, fuzzy=True).exact
+
+
+def test_curated_entries_take_precedence(tmp_path, monkeypatch, cookbook_paths):
+    """Test that curated cookbook entries are used and override history"""
+    monkeypatch.setattr(history, "HISTORY_PATH", str(tmp_path / "history.log"))
+    for _ in range(3):
+        history.log_run("list files", {"command": "ls", "returncode": 0})
+    (cookbook_paths / "cookbook.json").write_text(json.dumps([
+        {"queries": ["list files", "show files"], "command": "ls -la"},
+    ]))
+    match = cookbook.lookup("show files")
+    assert match.command == "ls -la" and match.source == "curated"
+    assert cookbook.lookup("list files").command == "ls -la"
+    assert cookbook.lookup("compress this folder") is None
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+import pytest
+
+from claii import history
+from claii.execution import run_command
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs wait4")
+def test_run_command_measures_the_command():
+    """Test that exit status, CPU time and peak memory of a command are captured"""
+    python = json.dumps(sys.executable)
+    result = run_command(f"{python} -c \"x = bytearray(300 * 1024 * 1024); x[::4096] = b'1' * len(x[::4096]); raise SystemExit(3)\"")
+    assert result.returncode == 3
+    assert result.wall_time > 0 and result.user_time is not None and result.system_time is not None
+    assert result.max_rss > 300 * 1024 * 1024
+    assert run_command("true").max_rss is None  # indistinguishable from our own footprint
+
+
+def test_runs_are_attached_to_their_history_entry(tmp_path, monkeypatch):
+    """Test that run telemetry is stored after the history entry and read back with it"""
+    path = tmp_path / "history.log"
+    monkeypatch.setattr(history, "HISTORY_PATH", str(path))
+    history.log_history("list files", "ls -la\n")
+    history.log_history("disk usage", "df -h")
+    history.log_run("list files", {"command": "ls -la", "returncode": 0, "wall_time": 0.01})
+    history.log_run("find logs", {"command": "find / -name '*.log'", "returncode": 1, "wall_time": 42.0})
+
+    entries = history.load_log()
+    assert [(e["query"], len(e["runs"])) for e in entries] == [("list files", 1), ("disk usage", 0), ("find logs", 1)]
+    assert entries[0]["runs"][0]["wall_time"] == 0.01
+    # Older readers still see only the conversations
+    assert history.read_entries()[0] == [("list files", "ls -la\n"), ("disk usage", "df -h")]
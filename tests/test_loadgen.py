@@ -0,0 +1,40 @@
+import threading
+import time
+from claii import loadgen, stats
+
+
+def test_run_load_test_reports_latency_errors_and_concurrency():
+    """Test warm-up exclusion, concurrency, error breakdown and TTFT pickup"""
+    active = 0
+    peak = 0
+    calls = []
+    lock = threading.Lock()
+
+    def generate(prompt):
+        nonlocal active, peak
+        with lock:
+            calls.append(prompt)
+            active += 1
+            peak = max(peak, active)
+        try:
+            with stats.track("stub", "m", save=False):
+                time.sleep(0.01)
+                stats.mark_first_token()
+                stats.annotate(tokens_out=4)
+                if prompt == "bad":
+                    raise TimeoutError()
+            return "ok"
+        finally:
+            with lock:
+                active -= 1
+
+    report = loadgen.run_load_test(generate, ["good", "bad"], requests=10, concurrency=4, warmup=2)
+    data = report.as_dict()
+
+    assert len(calls) == 12
+    assert peak > 1
+    assert data["requests"] == 10
+    assert data["errors"] == {"TimeoutError": 5}
+    assert data["tokens_out"] == 20
+    assert data["ttft_seconds"]["p50"] is not None
+    assert data["latency_seconds"]["p50"] >= 0.01
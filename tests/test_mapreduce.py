@@ -0,0 +1,114 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from claii import ai
+from claii.errors import ErrorReply
+from claii.mapreduce import MapReduce, iter_chunks
+from claii.prompts.concise import build_prompt, raw_prompts
+
+
+def test_iter_chunks_respects_the_budget():
+    """Test that chunks stay within the character budget and keep every byte of the input"""
+    data = b"".join(b"line %d\n" % i for i in range(1000)) + b"x" * 250 + b"\n"
+    chunks = list(iter_chunks(io.BytesIO(data), 100))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks).encode() == data
+    assert chunks[0].endswith("\n")  # split on line boundaries where possible
+
+
+def test_iter_chunks_reads_lines_without_newlines_in_bounded_pieces():
+    """Test that input without newlines is read a chunk at a time and multi-byte characters survive the cuts"""
+    class Reader(io.BytesIO):
+        largest = 0
+
+        def readline(self, limit=-1):
+            piece = super().readline(limit)
+            Reader.largest = max(Reader.largest, len(piece))
+            return piece
+
+    data = "é{\"k\": 1}".encode() * 10000  # 120 KB, no newline
+    stream = Reader(data)
+    chunks = iter_chunks(stream, 100)
+    first = next(chunks)
+    assert stream.tell() <= 200  # the first chunk didn't need the whole input
+    rest = list(chunks)
+    assert Reader.largest <= 100
+    assert all(len(chunk) <= 100 for chunk in rest)
+    assert "".join([first] + rest).encode() == data
+
+
+def test_map_reduce_is_bounded_and_reduces():
+    """Test that chunks are answered concurrently within the limit and merged into one reply"""
+    lock = threading.Lock()
+    active, peak, prompts = [0], [0], []
+
+    def ask(prompt):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            prompts.append(prompt)
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        if prompt.startswith("These are notes taken from all parts"):
+            return "the error is on line 42"
+        return "notes " * 10
+
+    data = b"".join(b"log line %d\n" % i for i in range(2000))
+    mr = MapReduce("where is the error?", ask, chunk_chars=200, concurrency=3)
+    assert mr.run(io.BytesIO(data)) == "the error is on line 42"
+    assert peak[0] <= 3
+    assert mr.progress.chunks_done == mr.progress.chunks_read > 100
+    assert mr.progress.reduces_done > 0
+    assert not mr.truncated
+    assert all(build_prompt("list files") not in prompt for prompt in prompts)
+
+    # Early termination: only the first chunks are read, and the final prompt says so
+    prompts.clear()
+    mr = MapReduce("where is the error?", ask, chunk_chars=200, concurrency=3, max_chunks=5)
+    mr.run(io.BytesIO(data))
+    assert mr.truncated and mr.progress.chunks_read == 5
+    assert "Only the first 5 parts" in prompts[-1]
+
+    # The first failing request ends the run with its error
+    failing = MapReduce("q", lambda prompt: ErrorReply("[red]down[/red]", "http_503"), chunk_chars=200)
+    assert failing.run(io.BytesIO(data)).code == "http_503"
+
+
+def test_reduce_ends_when_merged_notes_stay_long():
+    """Test that notes the model never shortens are merged in pairs and cut, not reduced forever"""
+    calls = []
+
+    def ask(prompt):
+        calls.append(prompt)
+        return "the answer" if prompt.startswith("These are notes taken from all parts") else "x" * 120
+
+    mr = MapReduce("q", ask, chunk_chars=100)
+    with ThreadPoolExecutor(2) as pool:
+        assert mr._finish(pool, ["a" * 120, "b" * 120]) == "the answer"
+    assert len(calls) <= 2
+
+    data = b"".join(b"log line %d\n" % i for i in range(200))
+    calls.clear()
+    assert MapReduce("q", ask, chunk_chars=100).run(io.BytesIO(data)) == "the answer"
+    assert len(calls) < 100
+
+
+def test_raw_prompts_skip_the_command_prompt():
+    """Test that messages are sent as they are inside raw_prompts()"""
+    assert build_prompt("list files") != "list files"
+    with raw_prompts():
+        assert build_prompt("list files") == "list files"
+    assert build_prompt("list files") != "list files"
+
+
+def test_chunk_requests_are_quiet_only_on_their_own_threads():
+    """Test that the per-chunk "Using ..." line is silenced without touching other threads"""
+    quiet = []
+    mr = MapReduce("q", lambda prompt: quiet.append(getattr(ai._local, "quiet", False)) or "note",
+                   chunk_chars=100, concurrency=2)
+    assert mr.run(io.BytesIO(b"line\n" * 100)) == "note"
+    assert quiet and all(quiet)
+    assert not getattr(ai._local, "quiet", False)
@@ -0,0 +1,106 @@
+from claii import model_select
+from claii.model_select import Hardware, ModelInfo, Selector
+
+GIB = 2 ** 30
+
+
+def _hardware(**kwargs):
+    values = dict(cores=8, memory_total=32 * GIB, memory_available=16 * GIB, load=0.0, cpu="test")
+    values.update(kwargs)
+    return Hardware(**values)
+
+
+def _models():
+    return [
+        ModelInfo("tiny", 1 * GIB, build="a"),
+        ModelInfo("medium", 4 * GIB, build="b"),
+        ModelInfo("large", 8 * GIB, build="c"),
+        ModelInfo("huge", 40 * GIB, build="d"),
+    ]
+
+
+def test_recommends_largest_model_meeting_target(tmp_path, monkeypatch):
+    """Test that only the models the choice depends on are measured, and the largest fast enough one wins"""
+    monkeypatch.setattr(model_select, "CALIBRATION_PATH", tmp_path / "calibration.json")
+    # 40 tokens/s per GiB: tiny 40, medium 10, large ~3.3 (estimated 5) tokens/s
+    speeds = {"tiny": 40.0, "medium": 10.0, "large": 3.3}
+    measured = []
+
+    def measure(url, model):
+        measured.append(model)
+        return {"tokens_per_second": speeds[model], "prompt_tokens_per_second": None}
+
+    monkeypatch.setattr(model_select, "measure", measure)
+    selector = Selector("http://ollama", target=10, hardware=_hardware(), models=_models())
+    best = selector.recommend()
+
+    # huge doesn't fit in memory; large is estimated fast enough but measured too slow (40 / 3.3 > 10)
+    assert best.model.name == "medium"
+    assert measured == ["tiny", "large", "medium"]
+    ranked = {result.model.name: result for result in selector.rank(calibrate=False)}
+    assert not ranked["huge"].fits and ranked["large"].measured and not ranked["large"].meets_target
+
+    # Stored: the next choice measures nothing
+    measured.clear()
+    assert Selector("http://ollama", target=10, hardware=_hardware(), models=_models()).recommend().model.name == "medium"
+    assert measured == []
+
+
+def test_calibration_dropped_when_hardware_or_model_changes(tmp_path, monkeypatch):
+    """Test that measurements are redone on different hardware or for a rebuilt model"""
+    monkeypatch.setattr(model_select, "CALIBRATION_PATH", tmp_path / "calibration.json")
+    measured = []
+    monkeypatch.setattr(model_select, "measure",
+                        lambda url, model: measured.append(model) or {"tokens_per_second": 100.0})
+    models = [ModelInfo("tiny", GIB, build="a")]
+
+    Selector("http://ollama", hardware=_hardware(), models=models).recommend()
+    Selector("http://ollama", hardware=_hardware(load=4.0, memory_available=GIB), models=models).recommend()
+    assert measured == ["tiny"]  # load and free memory don't invalidate measurements
+
+    Selector("http://ollama", hardware=_hardware(cores=4), models=models).recommend()
+    Selector("http://ollama", hardware=_hardware(cores=4), models=[ModelInfo("tiny", GIB, build="new")]).recommend()
+    assert measured == ["tiny", "tiny", "tiny"]
+
+
+def test_auto_model_is_chosen_once_for_concurrent_requests(tmp_path, monkeypatch):
+    """Test that threads asking for the auto model at once share one choice and one calibration"""
+    import threading
+    import time
+
+    monkeypatch.setattr(model_select, "CALIBRATION_PATH", tmp_path / "calibration.json")
+    monkeypatch.setattr(model_select, "_chosen", {})
+    monkeypatch.setattr(model_select, "detect_hardware", _hardware)
+    monkeypatch.setattr(model_select, "list_models", lambda url: _models())
+    measured = []
+
+    def measure(url, model):
+        measured.append(model)
+        time.sleep(0.05)
+        return {"tokens_per_second": 100.0}
+
+    monkeypatch.setattr(model_select, "measure", measure)
+    chosen = []
+    threads = [threading.Thread(target=lambda: chosen.append(model_select.auto_model({}))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(chosen)) == 1 and len(chosen) == 4
+    assert len(measured) == len(set(measured))  # no model calibrated twice
+
+    # Concurrent writers each use their own temporary file
+    errors = []
+
+    def save():
+        try:
+            model_select.save_calibration({"models": {}})
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and [path.name for path in tmp_path.iterdir()] == ["calibration.json"]
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from benchmarks.stub_servers import OllamaStub, StubBehavior
+from claii import ollama_pool
+from claii.models import ollama
+
+
+def _pool(*endpoints):
+    pool = ollama_pool.OllamaPool(endpoints)
+    for endpoint in endpoints:
+        endpoint.checked_at = time.monotonic()  # skip health checks
+    return pool
+
+
+def test_pool_prefers_warm_weighted_endpoints_and_ejects_failures():
+    """Test routing by loaded model, weight, outstanding requests, model lists and ejection"""
+    cold = ollama_pool.Endpoint("http://cold")
+    warm = ollama_pool.Endpoint("http://warm", weight=2, loaded={"mistral:latest"})
+    small = ollama_pool.Endpoint("http://small", models=["qwen2.5-coder:1.5b"], loaded={"qwen2.5-coder:1.5b"})
+    pool = _pool(cold, warm, small)
+
+    with pool.acquire("mistral") as first, pool.acquire("mistral") as second:
+        assert first is warm and second is warm and warm.outstanding == 2
+    with pool.acquire("qwen2.5-coder:1.5b") as endpoint:
+        assert endpoint is small
+
+    with pytest.raises(ConnectionError):
+        with pool.acquire("mistral"):
+            raise ConnectionError("refused")
+    assert warm.is_ejected(time.monotonic()) and warm.outstanding == 0
+    with pool.acquire("mistral") as endpoint:
+        assert endpoint is cold
+    with pool.acquire("llama3", exclude=["http://cold"]) as endpoint:
+        assert endpoint is warm  # everything else is ejected or doesn't serve it: try the one back first
+
+
+def test_chat_ollama_fails_over_across_the_pool(mocker):
+    """Test that a request moves on from an unreachable server and the health check reads loaded models"""
+    with OllamaStub(StubBehavior(reply="echo hi", latency=0, token_rate=0)) as stub:
+        config = {"ollama_endpoints": ["http://127.0.0.1:9", {"url": stub.url, "weight": 0.5}]}
+        mocker.patch.object(ollama, "load_config", return_value=config)
+        mocker.patch.object(ollama, "log_history")
+        pool = ollama_pool.get_pool(config)
+        pool.refresh()
+        dead, alive = pool.endpoints
+        assert dead.is_ejected(time.monotonic()) and alive.loaded == {"mistral"}
+
+        dead.ejected_until = 0  # as if the ejection were over, without a new health check
+        dead.checked_at = alive.checked_at = time.monotonic()
+        dead.loaded = {"mistral"}
+        assert ollama.chat_ollama("say hi", "mistral") == "echo hi"
+        assert dead.is_ejected(time.monotonic()) and alive.latency is not None
+
+
+def test_chat_ollama_does_not_fail_over_after_streaming_started(mocker):
+    """Test that a connection lost mid-stream is reported instead of streaming the reply again from the next server"""
+    first, second = ollama_pool.Endpoint("http://first", loaded={"mistral"}), ollama_pool.Endpoint("http://second")
+    pool = _pool(first, second)
+    mocker.patch.object(ollama, "log_history")
+    mocker.patch.object(ollama, "ChatOllama", side_effect=lambda model, base_url: base_url)
+
+    def generate(llm, messages, provider, model):
+        on_token = ollama.token_callback()
+        if on_token:
+            on_token("echo")
+        if llm == "http://first":
+            raise ConnectionError("reset")
+        return "echo hi"
+
+    mocker.patch.object(ollama, "generate", side_effect=generate)
+    tokens = []
+    with ollama.streaming_to(tokens.append):
+        reply = ollama._chat_pool("say hi", "mistral", pool, {})
+    assert reply.code == "ollama_stream_interrupted" and tokens == ["echo"]
+
+    # Without a stream to the caller nothing was shown yet, so the next server answers
+    first.ejected_until = 0
+    assert ollama._chat_pool("say hi", "mistral", pool, {}) == "echo hi"
+    assert ollama.generate.call_count == 3
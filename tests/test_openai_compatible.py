@@ -0,0 +1,24 @@
+from benchmarks.stub_servers import OpenAIStub, StubBehavior
+from claii import stats
+from claii.errors import ErrorReply
+from claii.models import openai_compatible
+
+
+def test_chat_openai_compatible_streams_from_server(mocker):
+    """Test the plain HTTP backend against an OpenAI-compatible stub, including errors"""
+    mocker.patch.object(openai_compatible, "log_history")
+    with OpenAIStub(StubBehavior(reply="ls -la /tmp", latency=0, token_rate=0)) as stub:
+        mocker.patch.object(openai_compatible, "load_config", return_value={
+            "openai_compatible_base_url": stub.base_url,
+            "openai_compatible_model": "qwen",
+            "openai_compatible_api_key": "secret",
+        })
+        with stats.track("openai-compatible", "qwen", save=False) as record:
+            assert openai_compatible.chat_openai_compatible("list tmp") == "ls -la /tmp"
+        assert record.tokens_out == 3 and record.ttft is not None
+        payload = stub.requests[0]["payload"]
+        assert payload["model"] == "qwen" and payload["stream"] is True
+
+        stub.behavior.error_rate = 1.0
+        reply = openai_compatible.chat_openai_compatible("list tmp")
+        assert isinstance(reply, ErrorReply) and reply.code == "http_500"
@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+from claii import output
+from claii.commands import generate
+
+
+@pytest.fixture(autouse=True)
+def text_format():
+    """Leave the default output format for the next test"""
+    yield
+    output.set_format("text")
+
+
+def test_strip_markup_keeps_escaped_brackets():
+    """Test that markup tags are removed but escaped text is kept as written"""
+    assert output.strip_markup("[red]Error:[/red] [bold]bad[/]") == "Error: bad"
+    text = "grep '[a-z]' [x]"
+    assert output.strip_markup(output.escape(text)) == text
+
+
+def test_chat_json_and_ndjson(mocker):
+    """Test that chat prints structured results (and stream events) for scripts"""
+    def reply(message, tool, use_tools=None, on_token=None):
+        for token in ("ls", " -la"):
+            if on_token:
+                on_token(token)
+        return "ls -la"
+
+    mocker.patch.object(generate, "gen_reply", side_effect=reply)
+    mocker.patch.object(generate, "load_config", return_value={"cookbook": False})
+    mocker.patch.object(generate.history, "log_history")
+    runner = CliRunner()
+
+    result = runner.invoke(generate.app, ["list files", "--output", "json", "--no-stdin"])
+    assert result.exit_code == 0
+    data = json.loads(result.stdout)
+    assert data["reply"] == "ls -la" and data["error"] is None and data["latency"] >= 0
+
+    result = runner.invoke(generate.app, ["list files", "--output", "ndjson", "--stream", "--no-stdin"])
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [event["event"] for event in events] == ["token", "token", "reply"]
+    assert events[-1]["reply"] == "ls -la"
+
+    # Piped stdin (say from a `while read` loop) is left alone without --stdin
+    result = runner.invoke(generate.app, ["list files", "--output", "json"], input="next line of the loop\n")
+    data = json.loads(result.stdout)
+    assert data["reply"] == "ls -la" and "parts" not in data
+    assert generate.gen_reply.call_args.args[0] == "list files"
+
+
+def test_rich_is_not_imported_at_startup():
+    """Test that importing the CLI doesn't pay for Rich"""
+    code = "import sys, claii.app; print('rich' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.strip() == "False"
@@ -0,0 +1,49 @@
+import json
+import sys
+
+import pytest
+
+from claii import plan
+
+
+def test_parse_plan_validates_the_graph():
+    """Test that plans are read from a reply and invalid graphs are rejected"""
+    reply = 'Sure:\n```json\n[{"id": "a", "command": "echo a"}, {"id": "b", "command": "echo b", "needs": ["a"]}]\n```'
+    steps = plan.parse_plan(reply)
+    assert [(step.id, step.needs) for step in steps] == [("a", []), ("b", ["a"])]
+
+    with pytest.raises(plan.PlanError, match="unknown"):
+        plan.parse_plan('[{"id": "a", "command": "x", "needs": ["z"]}]')
+    with pytest.raises(plan.PlanError, match="cycle"):
+        plan.parse_plan('[{"id": "a", "command": "x", "needs": ["b"]}, {"id": "b", "command": "y", "needs": ["a"]}]')
+    with pytest.raises(plan.PlanError):
+        plan.parse_plan("ls -la")
+
+    # Bracketed text around the list is ignored; an empty list is not a plan
+    assert [step.id for step in plan.parse_plan('See [1]: [{"id": "a", "command": "ls"}] and [x]')] == ["a"]
+    with pytest.raises(plan.PlanError, match="no steps"):
+        plan.parse_plan("[]")
+
+
+def test_execute_runs_independent_steps_in_parallel_and_skips_dependents():
+    """Test that independent steps overlap and a failure only stops the steps that need it"""
+    python = json.dumps(sys.executable)
+    sleep = f"{python} -c \"import time; time.sleep(0.5); print('done')\""
+    steps = plan.parse_plan(json.dumps([
+        {"id": "a", "command": sleep},
+        {"id": "b", "command": sleep},
+        {"id": "fail", "command": f"{python} -c \"raise SystemExit(3)\"", "needs": ["a"]},
+        {"id": "after-fail", "command": "echo never", "needs": ["fail"]},
+        {"id": "c", "command": f"{python} -c \"print('c')\"", "needs": ["a", "b"]},
+    ]))
+    output = []
+    results = {r.step.id: r for r in plan.execute(steps, concurrency=4, on_output=lambda s, line: output.append((s.id, line)))}
+
+    assert results["a"].status == results["b"].status == results["c"].status == "ok"
+    assert results["b"].start < results["a"].start + results["a"].duration  # a and b overlapped
+    assert results["c"].start >= results["b"].start + results["b"].duration
+    assert results["fail"].status == "failed" and results["fail"].returncode == 3
+    assert results["after-fail"].status == "skipped"
+    assert ("a", "done") in output and ("c", "c") in output
+    assert "after-fail" not in {step for step, _ in output}
+    assert "-> skipped (fail failed)" in plan.summary(list(results.values()))
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from claii.plugins import manager as manager_module
+from claii.plugins.base import CLAIIPlugin
+
+
+def _plugin(plugin_name, on_load=None, initialize=None, lazy=False, models=(), on_unload=None):
+    class Plugin(CLAIIPlugin):
+        lazy_load = lazy
+        name = plugin_name
+        description = f"{plugin_name} plugin"
+
+        def initialize(self, config):
+            if initialize:
+                initialize()
+
+        def on_load(self):
+            if on_load:
+                on_load()
+
+        def on_unload(self):
+            if on_unload:
+                on_unload()
+
+        def get_models(self):
+            return list(models)
+
+    return Plugin
+
+
+def _manager(monkeypatch, names, **plugins_config):
+    config = {"plugins": {"enabled": names, "settings": {}, **plugins_config}}
+    monkeypatch.setattr(manager_module, "load_config", lambda: config)
+    return manager_module.PluginManager()
+
+
+def test_plugins_initialize_in_parallel_within_budget(monkeypatch):
+    """Test that slow plugins don't add up, one past its budget is skipped, and failures are recorded"""
+    def boom():
+        raise RuntimeError("bad config")
+
+    classes = {
+        "slow1": _plugin("slow1", on_load=lambda: time.sleep(0.3)),
+        "slow2": _plugin("slow2", on_load=lambda: time.sleep(0.3)),
+        "stuck": _plugin("stuck", on_load=lambda: time.sleep(5)),
+        "broken": _plugin("broken", initialize=boom),
+    }
+    manager = _manager(monkeypatch, list(classes), init_timeout=1.0)
+    start = time.perf_counter()
+    manager._load(list(classes), classes)
+    assert time.perf_counter() - start < 1.5
+
+    assert sorted(manager.plugins) == ["slow1", "slow2"]
+    status = {name: timing.status for name, timing in manager.timings.items()}
+    assert status == {"slow1": "loaded", "slow2": "loaded", "stuck": "timed out", "broken": "failed"}
+    assert manager.timings["slow1"].on_load_seconds >= 0.3
+    assert manager.timings["broken"].error == "bad config"
+
+
+def test_lazy_on_load_runs_once_on_first_use(monkeypatch):
+    """Test that a lazy plugin's on_load is deferred until one of its handlers is called"""
+    calls = []
+    model = {"name": "lazy-model", "handler": lambda message: f"reply to {message}"}
+    classes = {"lazy": _plugin("lazy", on_load=lambda: calls.append(threading.get_ident()), lazy=True, models=[model])}
+    manager = _manager(monkeypatch, ["lazy"])
+    manager._load(["lazy"], classes)
+    assert calls == [] and manager.timings["lazy"].status == "deferred"
+
+    handler = manager.get_model_handler("lazy-model")
+    threads = [threading.Thread(target=handler, args=("hi",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and handler("hi") == "reply to hi"
+    assert manager.timings["lazy"].status == "loaded" and manager.timings["lazy"].on_load_seconds is not None
+
+
+def test_plugin_ready_after_its_budget_is_unloaded(monkeypatch):
+    """Test that a plugin whose on_load finishes after the time budget is released, not left half-loaded"""
+    unloaded = threading.Event()
+    classes = {"late": _plugin("late", on_load=lambda: time.sleep(0.3), on_unload=unloaded.set)}
+    manager = _manager(monkeypatch, ["late"], init_timeout=0.1)
+    manager._load(["late"], classes)
+    assert manager.plugins == {} and manager.timings["late"].status == "timed out"
+
+    assert unloaded.wait(2)
+    assert "late" not in manager.plugins and manager.timings["late"].status == "timed out"
+    assert "unloaded" in manager.timings["late"].error
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from benchmarks.stub_servers import OpenAIStub, StubBehavior
+from claii import ai, stats
+from claii.plugins.builtin import groq
+from claii.plugins.manager import plugin_manager
+
+
+def _register(monkeypatch, name, model):
+    monkeypatch.setitem(plugin_manager.models, name, {"plugin": "test", "name": name, **model})
+
+
+def test_capabilities_follow_handlers(monkeypatch):
+    """Test that capabilities need a handler and can be switched off"""
+    _register(monkeypatch, "caps", {
+        "handler": lambda m: m,
+        "stream_handler": lambda m: iter([m]),
+        "batch_handler": lambda ms: ms,
+        "capabilities": {"batch": False, "max_concurrency": 2, "context_window": 4096},
+    })
+    capabilities = plugin_manager.get_model_capabilities("caps")
+    assert capabilities["stream"] and not capabilities["batch"] and not capabilities["async"]
+    assert capabilities["max_concurrency"] == 2
+    assert capabilities["context_window"] == 4096
+
+
+def test_gen_reply_prefers_stream_handler(monkeypatch):
+    """Test that a streaming model is streamed to on_token and its first token is recorded"""
+    _register(monkeypatch, "streamer", {
+        "handler": lambda m: "plain",
+        "stream_handler": lambda m: iter(["ls", " -la"]),
+    })
+    tokens = []
+    assert ai.gen_reply("list files", "streamer", use_tools=False, on_token=tokens.append) == "ls -la"
+    assert tokens == ["ls", " -la"]
+    assert stats.last_record().ttft is not None
+
+
+def test_gen_replies_uses_batches_then_async(monkeypatch):
+    """Test that batch handlers get batches and async handlers run concurrently"""
+    batches = []
+    _register(monkeypatch, "batcher", {
+        "handler": lambda m: m.upper(),
+        "batch_handler": lambda ms: batches.append(list(ms)) or [m.upper() for m in ms],
+        "capabilities": {"max_batch_size": 2},
+    })
+    assert ai.gen_replies(["a", "b", "c"], "batcher", use_tools=False) == ["A", "B", "C"]
+    assert sorted(batches) == [["a", "b"], ["c"]]
+
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def handler(message):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return message * 2
+
+    _register(monkeypatch, "async", {"async_handler": handler, "capabilities": {"max_concurrency": 3}})
+    assert ai.gen_replies(list("abcdefg"), "async", use_tools=False) == [c * 2 for c in "abcdefg"]
+    assert running["peak"] == 3
+
+
+def test_groq_stream_handler(monkeypatch):
+    """Test the Groq plugin's streaming handler against an OpenAI-compatible stub"""
+    monkeypatch.setattr(groq, "log_history", lambda *args: None)
+    plugin = groq.GroqPlugin()
+    with OpenAIStub(StubBehavior(reply="ls -la /tmp", latency=0, token_rate=0)) as stub:
+        plugin.initialize({"api_key": "stub", "base_url": stub.base_url})
+        with stats.track("groq", "groq", save=False) as record:
+            assert "".join(plugin.stream_groq("list tmp")) == "ls -la /tmp"
+        assert stub.requests[0]["payload"]["stream"] is True
+    assert record.tokens_out == 3
@@ -0,0 +1,127 @@
+import json
+import time
+
+from claii.plugins import manager as manager_module
+from claii.plugins import watcher as watcher_module
+from claii.plugins.watcher import PluginWatcher
+
+PLUGIN = '''
+import json
+from claii.plugins.base import CLAIIPlugin
+
+
+class EchoPlugin(CLAIIPlugin):
+    name = "echo"
+    description = "echo plugin"
+
+    def on_unload(self):
+        with open(self.config["log"], "a") as f:
+            f.write("unload {version}\\n")
+
+    def get_models(self):
+        def handler(message):
+            yield "{version}-start"
+            yield "{version}-end"
+        return [{{"name": "echo-model", "handler": handler}}]
+'''
+
+
+def _setup(tmp_path, monkeypatch, version="v1"):
+    plugin_dir = tmp_path / "plugins" / "echo"
+    plugin_dir.mkdir(parents=True)
+    (plugin_dir / "__init__.py").write_text(PLUGIN.format(version=version))
+    log = tmp_path / "unload.log"
+    config = {"plugins": {"enabled": ["echo"], "settings": {"echo": {"log": str(log)}}}}
+    monkeypatch.setattr(manager_module, "load_config", lambda: config)
+    monkeypatch.setattr(manager_module.PluginManager, "plugin_directories", lambda self: [tmp_path / "plugins"])
+    monkeypatch.setattr(watcher_module, "CONFIG_PATH", tmp_path / "config.json")
+    manager = manager_module.PluginManager()
+    manager.load_plugins()
+    return manager, plugin_dir / "__init__.py", log
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_reload_lets_calls_in_flight_finish_on_old_version(tmp_path, monkeypatch):
+    """Test that a reload swaps in the new version while a running call finishes on the old one"""
+    manager, source, log = _setup(tmp_path, monkeypatch)
+    stream = manager.models["echo-model"]["handler"]("hi")
+    assert next(stream) == "v1-start"
+
+    source.write_text(PLUGIN.format(version="v2"))
+    assert manager.reload_plugin("echo")
+    assert list(manager.models["echo-model"]["handler"]("hi")) == ["v2-start", "v2-end"]
+    assert not log.exists()  # the old version is still answering
+
+    assert list(stream) == ["v1-end"]
+    assert _wait_for(lambda: log.exists() and log.read_text() == "unload v1\n")
+
+    # A version that doesn't import leaves the working one in place
+    source.write_text("raise SyntaxError('half-saved')")
+    assert not manager.reload_plugin("echo")
+    assert list(manager.models["echo-model"]["handler"]("hi")) == ["v2-start", "v2-end"]
+    assert manager.timings["echo"].status == "failed"
+
+
+def test_watcher_reloads_changed_plugin_and_follows_config(tmp_path, monkeypatch):
+    """Test that the watcher reloads an edited plugin and unloads one disabled in the config"""
+    manager, source, log = _setup(tmp_path, monkeypatch)
+    changes = []
+    watcher = PluginWatcher(manager, on_change=changes.append, use_inotify=False)
+    assert watcher.check() == {}
+
+    source.write_text(PLUGIN.format(version="v2") + "\n")
+    assert watcher.check() == {"echo": "reloaded"}
+    assert list(manager.models["echo-model"]["handler"]("hi")) == ["v2-start", "v2-end"]
+    assert log.read_text() == "unload v1\n"
+
+    disabled = {"plugins": {"enabled": [], "settings": {}}}
+    monkeypatch.setattr(manager_module, "load_config", lambda: disabled)
+    (tmp_path / "config.json").write_text(json.dumps(disabled))
+    assert watcher.check() == {"echo": "unloaded"}
+    assert "echo-model" not in manager.models
+    assert changes == [{"echo": "reloaded"}, {"echo": "unloaded"}]
+
+
+def test_disable_waits_for_calls_in_flight(tmp_path, monkeypatch):
+    """Test that disabling a plugin unregisters it at once but unloads it only after running calls finish"""
+    manager, source, log = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(manager_module, "save_config", lambda config: None)
+    stream = manager.models["echo-model"]["handler"]("hi")
+    assert next(stream) == "v1-start"
+
+    assert manager.disable_plugin("echo")
+    assert "echo-model" not in manager.models and "echo" not in manager.plugins
+    assert not log.exists()
+
+    assert list(stream) == ["v1-end"]
+    assert _wait_for(lambda: log.exists() and log.read_text() == "unload v1\n")
+
+
+def test_watcher_imports_only_new_enabled_plugin_directories(tmp_path, monkeypatch):
+    """Test that swap files and disabled plugins are ignored and a new enabled plugin is imported on its own"""
+    manager, source, log = _setup(tmp_path, monkeypatch)
+    manager.config["plugins"]["enabled"].append("greet")
+    imports = tmp_path / "imports.log"
+    watcher = PluginWatcher(manager, use_inotify=False)
+
+    (source.parent / ".#__init__.py").write_text("swap")
+    (source.parent / "__pycache__").mkdir()
+    (source.parent / "__pycache__" / "x.py").write_text("")
+    disabled = tmp_path / "plugins" / "disabled"
+    disabled.mkdir()
+    (disabled / "__init__.py").write_text(f"open({str(imports)!r}, 'a').write('disabled\\n')")
+    assert watcher.check() == {}
+    assert not imports.exists()
+
+    greet = tmp_path / "plugins" / "greet"
+    greet.mkdir()
+    (greet / "__init__.py").write_text(
+        f"open({str(imports)!r}, 'a').write('greet\\n')\n" + PLUGIN.format(version="g").replace("echo", "greet"))
+    assert watcher.check() == {"greet": "loaded"}
+    assert imports.read_text() == "greet\n"
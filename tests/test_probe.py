@@ -0,0 +1,45 @@
+import time
+
+from benchmarks.stub_servers import OllamaStub, StubBehavior
+from claii import ai, probe
+
+
+def test_probe_all_runs_concurrently_within_deadline():
+    """Test that providers and plugin models are probed at once and slow ones are cut off at the deadline"""
+    def slow():
+        time.sleep(5)
+        return True
+
+    models = {
+        "fast": {"plugin": "p", "health_handler": lambda: True},
+        "broken": {"plugin": "p", "health_handler": lambda: 1 / 0},
+        "slow": {"plugin": "p", "health_handler": slow},
+        "plain": {"plugin": "p", "handler": lambda message: message},
+    }
+    with OllamaStub(StubBehavior(latency=0)) as stub:
+        config = {"ollama_url": stub.url}
+        start = time.perf_counter()
+        results = {result.name: result for result in probe.probe_all(config, models, timeout=0.5)}
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 2
+    assert results["ollama"].status == "up" and results["ollama"].connect_ms is not None
+    assert results["openai"].status == "unconfigured"
+    assert results["fast"].status == "up" and results["fast"].round_trip_ms is not None
+    assert results["broken"].status == "down" and "division" in results["broken"].detail
+    assert results["slow"].status == "down" and "0.5s" in results["slow"].detail
+    assert results["plain"].status == "unknown" and results["plain"].available
+
+
+def test_auto_skips_providers_known_down(mocker):
+    """Test that --tool auto passes over a provider stored as down until the entry expires"""
+    config = {"openai_api_key": "key"}
+    mocker.patch.object(ai, "load_config", return_value=config)
+    assert ai._auto_tool(config) == "ollama"
+
+    probe.save_status([probe.ProbeResult("ollama", "provider", "down", detail="connection refused")])
+    assert ai._auto_tool(config) == "openai"
+    assert ai._auto_tool({}) == "ollama"  # nothing else configured: try it anyway
+
+    probe.save_status([probe.ProbeResult("ollama", "provider", "down", checked_at=time.time() - 3600)])
+    assert ai._auto_tool(config) == "ollama"
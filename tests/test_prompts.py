@@ -0,0 +1,37 @@
+from claii.prompts import concise, registry
+from claii.prompts.tokens import count_tokens
+
+
+def test_templates_per_provider_and_model():
+    """Test that small local models get the compact prompt, API models a system message, and config overrides win"""
+    ollama = concise.build_messages("list files", "ollama", "qwen2.5-coder:1.5b", {})
+    assert ollama == [("user", registry.COMPILED[("compact", "posix")].prefix + "list files")]
+
+    system, user = concise.build_messages("list files", "openai-compatible", "llama3", {})
+    assert system[0] == "system" and "POSIX shell" in system[1] and user == ("user", "list files")
+
+    # Unknown providers keep the original prompt, word for word
+    assert concise.build_prompt("list files").startswith("You are a concise assistant.")
+    assert concise.build_prompt("list files").endswith("Query: list files")
+
+    config = {"prompt_templates": {"ollama": "full", "ollama:llama3*:70b": "system"}}
+    assert registry.template_for("ollama", "llama3.1:70b", config).name == "system"
+    assert registry.template_for("ollama", "llama3.1:8b", config).name == "full"
+    assert registry.template_for("ollama", "llama3.1:8b", {"prompt_templates": {"ollama": "nope"}}).name == "full"
+
+    with concise.raw_prompts():
+        assert concise.build_messages("list files", "openai") == [("user", "list files")]
+
+
+def test_long_queries_are_cut_to_the_token_budget():
+    """Test that the instructions survive and the prompt stays within max_prompt_tokens"""
+    assert count_tokens("") == 0
+    assert 2 <= count_tokens("ls -la") <= 4
+    assert count_tokens("word " * 100) >= 100
+
+    template = registry.template_for("ollama", "tiny", {"max_prompt_tokens": 200})
+    query = "find the largest log files in /var/log and compress them " * 100
+    text = template.text(query)
+    assert text.startswith(template.prefix) and text.endswith(registry.TRUNCATION_NOTE)
+    assert template.tokens(query) <= 200 < template.overhead + count_tokens(query)
+    assert template.text("list files") == template.prefix + "list files"
@@ -0,0 +1,54 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from benchmarks.stub_servers import OpenAIStub, StubBehavior
+from claii import replay
+from claii.models.common import generate
+
+
+class BrokenLLM:
+    """A model that must not be reached during replay"""
+
+    def stream(self, prompt):
+        raise AssertionError("network access during replay")
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    fresh = replay.Recorder()
+    monkeypatch.setattr(replay, "recorder", fresh)
+    return fresh
+
+
+def test_record_then_replay_langchain_stream(recorder, tmp_path):
+    """Test that a streamed reply is recorded with timings and replayed offline"""
+    cassette_path = str(tmp_path / "cassette.json")
+    recorder.mode = "record"
+    recorder.cassette = replay.Cassette(cassette_path)
+    assert generate(FakeListChatModel(responses=["ls -la"]), "list files", "fake", "m") == "ls -la"
+    recorder.cassette.save()
+
+    recorder.configure(replay=cassette_path, scale=0)
+    assert generate(BrokenLLM(), "list files", "fake", "m") == "ls -la"
+    # Recordings are reused when a request repeats
+    assert generate(BrokenLLM(), "list files", "fake", "m") == "ls -la"
+    with pytest.raises(replay.ReplayMissError):
+        generate(BrokenLLM(), "another prompt", "fake", "m")
+
+
+def test_record_then_replay_http_post(recorder, tmp_path):
+    """Test that plugin HTTP calls replay without the server and without storing headers"""
+    cassette_path = str(tmp_path / "cassette.json")
+    recorder.mode = "record"
+    recorder.cassette = replay.Cassette(cassette_path)
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+    with OpenAIStub(StubBehavior(reply="echo hi", latency=0, token_rate=0)) as stub:
+        url = f"{stub.base_url}/chat/completions"
+        response = replay.http_post("groq", url, {"Authorization": "Bearer secret"}, payload)
+    recorder.cassette.save()
+    assert response.json()["choices"][0]["message"]["content"] == "echo hi"
+    assert "secret" not in open(cassette_path).read()
+
+    recorder.configure(replay=cassette_path, scale=0)
+    replayed = replay.http_post("groq", url, {}, payload)
+    assert replayed.status_code == 200
+    assert replayed.json()["choices"][0]["message"]["content"] == "echo hi"
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from claii.shell import ShellSession
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="persistent shells need a POSIX shell")
+
+
+def test_session_keeps_state_and_exit_codes(tmp_path):
+    """Test that cd and variables carry over between commands and exit codes are reported"""
+    with ShellSession() as session:
+        assert session.run(f"cd {tmp_path} && export CLAII_TEST=kept").returncode == 0
+        result = session.run("pwd; echo $CLAII_TEST; printf 'no newline'")
+        assert result.output == f"{os.path.realpath(tmp_path)}\nkept\nno newline"
+        failed = session.run("echo oops >&2; exit_code() { return 4; }; exit_code")
+        assert (failed.returncode, failed.output) == (4, "oops\n")
+        # Commands can't read the session's own input
+        assert session.run("read line; echo \"[$line]\"").output == "[]\n"
+
+
+def test_session_streams_and_recovers_from_timeouts_and_exits():
+    """Test that output streams as it arrives and a killed or exited shell is replaced"""
+    with ShellSession() as session:
+        chunks = []
+        session.run("echo one; sleep 0.2; echo two", on_output=chunks.append)
+        assert chunks == ["one\n", "two\n"]
+
+        session.run("export CLAII_TEST=lost")
+        result = session.run("sleep 10", timeout=0.2)
+        assert result.timed_out and result.restarted and result.returncode is None
+        assert session.run("echo \"[$CLAII_TEST]\"").output == "[]\n"
+
+        exited = session.run("exit 3")
+        assert exited.returncode == 3 and exited.restarted
+        assert session.run("echo back").output == "back\n"
@@ -0,0 +1,46 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from claii.commands import shell_init
+
+FAKE_CLAII = """#!/bin/sh
+echo "Using Stub" >&2
+printf 'ls '
+sleep 0.2
+printf -- '-la\\n'
+"""
+
+
+def test_keys_and_unsupported_input():
+    """Test that keys are written in each shell's notation and bad input is rejected"""
+    assert "bind -x '\"\\C-g\": _claii_widget'" in shell_init.script("bash", executable="claii")
+    assert "bindkey '^[x' _claii_widget" in shell_init.script("zsh", "alt-x", executable="claii")
+    with pytest.raises(ValueError):
+        shell_init.script("fish")
+    with pytest.raises(ValueError):
+        shell_init.script("bash", "f5")
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+def test_bash_widget_generates_in_the_background(tmp_path):
+    """Test that the bash binding returns at once and inserts the command when pressed again"""
+    fake = tmp_path / "claii"
+    fake.write_text(FAKE_CLAII)
+    fake.chmod(0o755)
+    script = tmp_path / "init.bash"
+    script.write_text(shell_init.script("bash", executable=str(fake)))
+    test = f"""
+        source {script} 2>/dev/null
+        _claii_status() {{ :; }}
+        READLINE_LINE="list files"; READLINE_POINT=10
+        _claii_widget; [[ -n $_claii_pid && $READLINE_LINE == "list files" ]] || exit 1
+        sleep 1; _claii_widget
+        echo "$READLINE_LINE|$READLINE_POINT"
+    """
+    result = subprocess.run(["bash", "-c", test], capture_output=True, text=True, cwd=tmp_path, timeout=10,
+                            env=dict(os.environ, TMPDIR=str(tmp_path)))
+    assert result.stdout.strip() == "ls -la|6"
+    assert not list(tmp_path.glob("claii.*"))  # temporary files are removed
@@ -0,0 +1,63 @@
+import pytest
+from claii import stats
+from claii.errors import ErrorReply
+
+
+def test_track_records_request():
+    """Test that a tracked request is stored with its measurements"""
+    with stats.track("ollama", "mistral"):
+        stats.mark_first_token()
+        stats.annotate(tokens_in=12, tokens_out=5)
+
+    with pytest.raises(ConnectionError):
+        with stats.track("openai", "gpt-4"):
+            raise ConnectionError("down")
+
+    records = stats.load_records()
+    assert [(r["provider"], r["error"]) for r in records] == [("ollama", None), ("openai", "ConnectionError")]
+    assert records[0]["tokens_out"] == 5
+    assert records[0]["ttft"] is not None
+    assert stats.last_record().provider == "openai"
+    assert stats.load_records(provider="ollama")[0]["model"] == "mistral"
+
+
+def test_summarize_percentiles_and_openmetrics():
+    """Test aggregation per provider/model and the OpenMetrics export"""
+    records = [
+        {"provider": "ollama", "model": "mistral", "latency": float(i), "ttft": 0.1, "tokens_in": 10,
+         "tokens_out": 10, "cache": "miss", "error": None}
+        for i in range(1, 11)
+    ]
+    records.append({"provider": "ollama", "model": "mistral", "latency": 0.2, "ttft": None, "tokens_in": None,
+                    "tokens_out": None, "cache": "miss", "error": "missing_api_key"})
+
+    [summary] = stats.summarize(records)
+    assert summary["requests"] == 11
+    assert summary["errors"] == 1
+    assert summary["latency_p50"] == pytest.approx(5.5)
+    assert summary["latency_p90"] == pytest.approx(9.1)
+    assert summary["tokens_per_second"] == pytest.approx(100 / 55)
+
+    text = stats.to_openmetrics([summary], "24h")
+    assert 'claii_request_latency_seconds{provider="ollama",model="mistral",window="24h",quantile="0.5"} 5.500000' in text
+    assert 'claii_request_errors{provider="ollama",model="mistral",window="24h",error="missing_api_key"} 1' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_parse_window():
+    """Test time window parsing"""
+    assert stats.parse_window("30m") == 1800
+    assert stats.parse_window("7d") == 7 * 86400
+    assert stats.parse_window("all") is None
+    with pytest.raises(ValueError):
+        stats.parse_window("yesterday")
+
+
+def test_gen_reply_records_error_code(mocker):
+    """Test that error replies from a backend are recorded with their code"""
+    from claii import ai
+    mocker.patch("claii.ai.load_config", return_value={})
+    mocker.patch("claii.models.mistral.chat_mistral", return_value=ErrorReply("[red]no key[/red]", "missing_api_key"))
+    assert ai.gen_reply("list files", "mistral") == "[red]no key[/red]"
+    [record] = stats.load_records()
+    assert (record["provider"], record["error"]) == ("mistral", "missing_api_key")
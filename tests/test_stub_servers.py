@@ -0,0 +1,37 @@
+import json
+import requests
+from benchmarks.stub_servers import OllamaStub, OpenAIStub, StubBehavior
+from benchmarks.run import compare
+
+
+def test_ollama_stub_streams_chat():
+    """Test that the Ollama stub streams NDJSON chat chunks and a final summary"""
+    with OllamaStub(StubBehavior(reply="echo hello", latency=0, token_rate=0)) as stub:
+        response = requests.post(f"{stub.url}/api/chat", json={"model": "mistral", "messages": []}, stream=True)
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+        assert "".join(chunk["message"]["content"] for chunk in chunks) == "echo hello"
+        assert chunks[-1]["done"] is True
+        assert chunks[-1]["eval_count"] == 2
+        assert requests.get(f"{stub.url}/api/tags").json()["models"][0]["name"] == "mistral"
+
+
+def test_openai_stub_streaming_and_errors():
+    """Test the OpenAI-compatible stub's SSE stream and error injection"""
+    with OpenAIStub(StubBehavior(reply="ls -la", latency=0, token_rate=0)) as stub:
+        response = requests.post(f"{stub.base_url}/chat/completions",
+                                 json={"model": "m", "messages": [], "stream": True}, stream=True)
+        events = [line[len(b"data: "):] for line in response.iter_lines() if line]
+        assert events[-1] == b"[DONE]"
+        text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+        assert text == "ls -la"
+
+        stub.behavior.error_rate = 1.0
+        response = requests.post(f"{stub.base_url}/chat/completions", json={"model": "m", "messages": []})
+        assert response.status_code == 500
+
+
+def test_compare_flags_regressions_by_direction():
+    """Test that latency increases and throughput drops beyond the threshold are flagged"""
+    baselines = {"a_seconds": 1.0, "b_seconds": 1.0, "c_per_second": 100.0}
+    results = {"a_seconds": 1.2, "b_seconds": 1.5, "c_per_second": 60.0, "d_seconds": 9.0}
+    assert [metric for metric, *_ in compare(results, baselines, 0.25)] == ["b_seconds", "c_per_second"]
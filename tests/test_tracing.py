@@ -0,0 +1,47 @@
+import pytest
+from claii import tracing
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    """Fresh, enabled tracer that does not report at exit"""
+    fresh = tracing.Tracer()
+    fresh.enabled = True
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    return fresh
+
+
+def test_span_disabled_is_noop(monkeypatch):
+    """Test that spans cost nothing when tracing is off"""
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer())
+    assert tracing.span("anything") is tracing.NOOP_SPAN
+    assert tracing.start_span("anything") is tracing.NOOP_SPAN
+
+
+def test_spans_nest_and_export(tracer):
+    """Test nested spans, detached milestones and the trace exports"""
+    with tracing.span("outer", tool="ollama"):
+        first = tracing.start_span("outer.first_token")
+        with tracing.span("inner"):
+            first.finish()
+
+    assert [span.name for span in tracer.roots] == ["outer"]
+    outer = tracer.roots[0]
+    assert [child.name for child in outer.children] == ["outer.first_token", "inner"]
+    assert outer.children[1].children == []
+    assert tracer.current() is None
+
+    events = tracer.to_chrome_trace()["traceEvents"]
+    assert [event["name"] for event in events] == ["outer", "outer.first_token", "inner"]
+    assert events[0]["args"] == {"tool": "ollama"}
+    assert tracer.to_json()[0]["children"][1]["name"] == "inner"
+    assert "inner" in tracer.format_tree()
+
+
+def test_configure_from_argv(monkeypatch):
+    """Test that --profile options are picked up before Typer parses them"""
+    calls = []
+    monkeypatch.setattr(tracing, "enable", lambda path, fmt: calls.append((path, fmt)))
+    tracing.configure_from_argv(["chat", "hi"])
+    tracing.configure_from_argv(["--profile-output", "trace.json", "--profile-format=json", "chat", "hi"])
+    assert calls == [("trace.json", "json")]